@@ -0,0 +1,138 @@
+"""
+Control de admisión para las llamadas al LLM
+
+Un máximo de llamadas simultáneas a chat.completions por proceso, con una cola de espera
+acotada y un tiempo máximo en la cola. Cuando llega un pico (semana de inscripciones), las
+preguntas de más esperan su turno en lugar de salir todas hacia OpenAI, que respondería
+429 y haría más lenta cada petición; si el turno no llega a tiempo (o la cola está llena)
+se levanta SinCapacidad y el endpoint responde 503 con Retry-After.
+
+Solo pasan por aquí las llamadas reales al LLM (rag._completar_async y
+rag._stream_llm_async): las respuestas deterministas (listados, cantidades, códigos) y las
+que salen de las cachés no esperan turno. El límite es por worker: con gunicorn, el total
+hacia OpenAI es workers x LLM_MAX_CONCURRENTES.
+
+Configuración por variables de entorno:
+    LLM_MAX_CONCURRENTES   Llamadas simultáneas al LLM por proceso (16; 0 desactiva el control)
+    LLM_MAX_COLA           Peticiones esperando turno; las siguientes se rechazan sin esperar (64)
+    LLM_ESPERA_MAX         Segundos máximos en la cola antes de responder 503 (10)
+"""
+import os
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+# Esperas y duraciones recientes para las métricas y el Retry-After
+_MUESTRAS = 1000
+
+
+class SinCapacidad(Exception):
+    """No hubo turno para el LLM dentro del tiempo máximo de espera (o la cola estaba llena)"""
+
+    def __init__(self, motivo: str, reintentar_en: int):
+        super().__init__(f"Sin capacidad para llamar al LLM ({motivo}); reintentar en {reintentar_en} s")
+        self.motivo = motivo
+        self.reintentar_en = reintentar_en
+
+
+class ControlAdmision:
+    """Semáforo con cola acotada y plazo de espera, con contadores para /metricas"""
+
+    def __init__(self, max_concurrentes: int, max_cola: int, espera_max: float):
+        self.max_concurrentes = max_concurrentes
+        self.max_cola = max_cola
+        self.espera_max = espera_max
+        self._semaforo = asyncio.Semaphore(max(1, max_concurrentes))
+        self.en_curso = 0
+        self.en_cola = 0
+        self.cola_maxima_observada = 0
+        self.admitidas = 0
+        self.rechazadas = {"cola_llena": 0, "espera_agotada": 0}
+        self._esperas: "deque[float]" = deque(maxlen=_MUESTRAS)
+        self._duraciones: "deque[float]" = deque(maxlen=_MUESTRAS)
+
+    @property
+    def activo(self) -> bool:
+        return self.max_concurrentes > 0
+
+    def reintentar_en(self) -> int:
+        """Segundos sugeridos para Retry-After: lo que tarda en vaciarse la cola actual"""
+        duracion = sum(self._duraciones) / len(self._duraciones) if self._duraciones else self.espera_max
+        tandas = (self.en_cola + 1) / self.max_concurrentes
+        return max(1, math.ceil(tandas * duracion))
+
+    def _rechazar(self, motivo: str) -> SinCapacidad:
+        self.rechazadas[motivo] += 1
+        return SinCapacidad(motivo, self.reintentar_en())
+
+    @asynccontextmanager
+    async def turno(self):
+        """Espera un lugar para llamar al LLM (lo libera al salir, también si el stream se corta)"""
+        if not self.activo:
+            yield
+            return
+
+        inicio = time.perf_counter()
+        if self._semaforo.locked():
+            if self.en_cola >= self.max_cola:
+                raise self._rechazar("cola_llena")
+            self.en_cola += 1
+            self.cola_maxima_observada = max(self.cola_maxima_observada, self.en_cola)
+            try:
+                await asyncio.wait_for(self._semaforo.acquire(), self.espera_max)
+            except asyncio.TimeoutError:
+                raise self._rechazar("espera_agotada") from None
+            finally:
+                self.en_cola -= 1
+        else:
+            await self._semaforo.acquire()
+
+        admitida = time.perf_counter()
+        self._esperas.append(admitida - inicio)
+        self.admitidas += 1
+        self.en_curso += 1
+        try:
+            yield
+        finally:
+            self.en_curso -= 1
+            self._duraciones.append(time.perf_counter() - admitida)
+            self._semaforo.release()
+
+    def resumen(self) -> Dict[str, Any]:
+        esperas = sorted(self._esperas)
+        return {
+            "activo": self.activo,
+            "max_concurrentes": self.max_concurrentes,
+            "max_cola": self.max_cola,
+            "espera_max_s": self.espera_max,
+            "en_curso": self.en_curso,
+            "en_cola": self.en_cola,
+            "cola_maxima_observada": self.cola_maxima_observada,
+            "admitidas": self.admitidas,
+            "rechazadas": dict(self.rechazadas),
+            "espera_media_ms": round(sum(esperas) / len(esperas) * 1000, 1) if esperas else None,
+            "espera_p95_ms": round(esperas[int(len(esperas) * 0.95)] * 1000, 1) if esperas else None,
+            "espera_maxima_ms": round(esperas[-1] * 1000, 1) if esperas else None,
+        }
+
+
+_admision: Optional[ControlAdmision] = None
+_lock = threading.Lock()
+
+
+def obtener_admision() -> ControlAdmision:
+    """Control de admisión del proceso (se crea la primera vez con la configuración del entorno)"""
+    global _admision
+    if _admision is None:
+        with _lock:
+            if _admision is None:
+                _admision = ControlAdmision(
+                    int(os.getenv("LLM_MAX_CONCURRENTES", "16")),
+                    int(os.getenv("LLM_MAX_COLA", "64")),
+                    float(os.getenv("LLM_ESPERA_MAX", "10")),
+                )
+    return _admision
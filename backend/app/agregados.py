@@ -0,0 +1,84 @@
+"""
+Tabla columnar de la malla curricular para consultas de agregación
+Cada atributo se guarda en un array compacto (una posición por materia) y al construir la
+tabla se precalculan los conteos y las sumas de créditos para todas las combinaciones de
+filtros (semestre, tipo, categoría, cada uno opcional). Así "¿cuántas materias/créditos...?"
+se responde con una búsqueda en diccionario, sin números escritos a mano.
+"""
+from array import array
+from itertools import product
+from typing import Dict, List, Optional, Tuple, Iterable
+
+# Comodín para "cualquier valor" en las claves de los agregados precalculados
+TODOS = "*"
+
+# Semestre 0 en la columna = materia sin semestre asignado (optativas)
+SIN_SEMESTRE = 0
+
+Clave = Tuple[object, object, object]
+
+
+class TablaMaterias:
+    """
+    Columnas:
+        semestre   array('H') con el número de semestre (0 = sin semestre)
+        creditos   array('H') con los créditos
+        tipo       array('B') con el código del tipo de tipología (ver `tipos`)
+        categoria  array('B') con el código de la categoría (ver `categorias`)
+    """
+
+    def __init__(self, filas: Iterable[Tuple[Optional[int], Optional[int], str, str]]):
+        self.semestre = array('H')
+        self.creditos = array('H')
+        self.tipo = array('B')
+        self.categoria = array('B')
+        self.tipos: List[str] = []
+        self.categorias: List[str] = []
+        self._codigo_tipo: Dict[str, int] = {}
+        self._codigo_categoria: Dict[str, int] = {}
+
+        for semestre, creditos, tipo, categoria in filas:
+            self.semestre.append(semestre or SIN_SEMESTRE)
+            self.creditos.append(creditos or 0)
+            self.tipo.append(self._codificar(tipo, self.tipos, self._codigo_tipo))
+            self.categoria.append(self._codificar(categoria, self.categorias, self._codigo_categoria))
+
+        self._agregados = self._precalcular()
+        self._semestres = sorted(set(self.semestre), key=lambda s: (s == SIN_SEMESTRE, s))
+
+    @staticmethod
+    def _codificar(valor: str, valores: List[str], codigos: Dict[str, int]) -> int:
+        if valor not in codigos:
+            codigos[valor] = len(valores)
+            valores.append(valor)
+        return codigos[valor]
+
+    def _precalcular(self) -> Dict[Clave, Tuple[int, int]]:
+        """(conteo, suma de créditos) para cada combinación de valores y comodines"""
+        agregados: Dict[Clave, List[int]] = {}
+        for semestre, creditos, tipo, categoria in zip(self.semestre, self.creditos, self.tipo, self.categoria):
+            valores = (semestre, self.tipos[tipo], self.categorias[categoria])
+            for clave in product(*((valor, TODOS) for valor in valores)):
+                acumulado = agregados.setdefault(clave, [0, 0])
+                acumulado[0] += 1
+                acumulado[1] += creditos
+        return {clave: (conteo, suma) for clave, (conteo, suma) in agregados.items()}
+
+    def __len__(self) -> int:
+        return len(self.semestre)
+
+    def consultar(self, semestre: Optional[int] = None, tipo: Optional[str] = None,
+                  categoria: Optional[str] = None) -> Tuple[int, int]:
+        """(número de materias, suma de créditos) que cumplen los filtros. None = sin filtro."""
+        clave = (
+            TODOS if semestre is None else semestre,
+            TODOS if tipo is None else tipo,
+            TODOS if categoria is None else categoria,
+        )
+        return self._agregados.get(clave, (0, 0))
+
+    def por_semestre(self, tipo: Optional[str] = None,
+                     categoria: Optional[str] = None) -> Dict[int, Tuple[int, int]]:
+        """Desglose {semestre: (materias, créditos)} ordenado; la clave 0 (al final) agrupa las que no tienen semestre"""
+        desglose = {s: self.consultar(s, tipo, categoria) for s in self._semestres}
+        return {s: valores for s, valores in desglose.items() if valores[0] > 0}
@@ -0,0 +1,176 @@
+"""
+Calentamiento al arrancar y estado de preparación (/ready)
+
+El lifespan de la app lanza calentar() en segundo plano: crea los clientes de OpenAI, el
+índice curricular, el modelo de embeddings, el vectorstore y las cachés, y opcionalmente
+hace una búsqueda de prueba (embedding de la pregunta + consulta al vectorstore, sin LLM).
+Así la primera pregunta después de un despliegue o de reiniciar un worker no paga la carga.
+
+Mientras tanto /health responde (el proceso está vivo) y /ready responde 503 hasta que
+terminan los componentes obligatorios; ambos casos informan la duración de cada paso.
+
+Con gunicorn (gunicorn.conf.py), precargar() construye antes del fork lo que es de solo
+lectura y no tiene conexiones abiertas; los workers lo heredan copy-on-write y su
+calentamiento solo crea los clientes, las conexiones y las cachés de cada proceso.
+
+Configuración por variables de entorno:
+    ARRANQUE_CONSULTA   Pregunta de la búsqueda de prueba (vacío por defecto: no se hace)
+"""
+import os
+import time
+import asyncio
+import logging
+import importlib
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+Paso = Tuple[str, bool, Callable[[], Union[Any, Awaitable[Any]]]]
+
+# Dependencias que los workers importan de todos modos (ver app/main.py); importadas en el
+# master, su código y sus estructuras se comparten entre los workers
+MODULOS_PESADOS = ("openai", "langchain_openai", "langchain_core.documents", "chromadb")
+
+
+@dataclass
+class Componente:
+    """Resultado de un paso del calentamiento"""
+    nombre: str
+    obligatorio: bool
+    estado: str = "pendiente"  # pendiente | cargando | listo | error
+    duracion_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+class EstadoArranque:
+    """Progreso del calentamiento del proceso (lo consulta /ready)"""
+
+    def __init__(self):
+        self.componentes: Dict[str, Componente] = {}
+        self.terminado = False
+        self._inicio = time.perf_counter()
+        self._duracion_ms: Optional[float] = None
+
+    @property
+    def listo(self) -> bool:
+        """Terminó el calentamiento y ningún componente obligatorio falló"""
+        return self.terminado and all(
+            c.estado == "listo" for c in self.componentes.values() if c.obligatorio
+        )
+
+    def resumen(self) -> Dict[str, Any]:
+        if self.listo:
+            estado = "ready"
+        elif self.terminado:
+            estado = "error"
+        else:
+            estado = "warming_up"
+        duracion = self._duracion_ms
+        if duracion is None:
+            duracion = (time.perf_counter() - self._inicio) * 1000
+        return {
+            "status": estado,
+            "duracion_ms": round(duracion, 1),
+            "componentes": {nombre: {k: v for k, v in asdict(c).items() if k != "nombre"}
+                            for nombre, c in self.componentes.items()},
+        }
+
+    async def ejecutar(self, pasos: List[Paso]):
+        """Ejecuta los pasos en orden; las funciones síncronas van a un hilo"""
+        for nombre, obligatorio, _ in pasos:
+            self.componentes[nombre] = Componente(nombre, obligatorio)
+        try:
+            for nombre, _, funcion in pasos:
+                componente = self.componentes[nombre]
+                componente.estado = "cargando"
+                inicio = time.perf_counter()
+                try:
+                    if asyncio.iscoroutinefunction(funcion):
+                        await funcion()
+                    else:
+                        await asyncio.to_thread(funcion)
+                    componente.estado = "listo"
+                except Exception as e:
+                    componente.estado = "error"
+                    componente.error = f"{type(e).__name__}: {e}"
+                    aviso = "❌" if componente.obligatorio else "⚠️"
+                    logger.error(f"{aviso} Calentamiento de {nombre} falló: {componente.error}")
+                componente.duracion_ms = round((time.perf_counter() - inicio) * 1000, 1)
+        finally:
+            self._duracion_ms = (time.perf_counter() - self._inicio) * 1000
+            self.terminado = True
+
+
+def pasos_calentamiento() -> List[Paso]:
+    """(nombre, obligatorio, función) de cada componente, en el orden en que se cargan"""
+    from app.llm import iniciar_clientes
+    from app.indice_curricular import obtener_indice
+    from app.cache import obtener_cache_respuestas
+    from app.cache_semantica import obtener_cache_semantica
+    from app.rag import obtener_embeddings, obtener_vectorstore, buscar_documentos_async
+
+    def caches():
+        obtener_cache_respuestas()
+        obtener_cache_semantica()
+
+    pasos: List[Paso] = [
+        ("clientes_llm", True, iniciar_clientes),
+        ("indice_curricular", True, obtener_indice),
+        ("embeddings", True, obtener_embeddings),
+        ("vectorstore", True, obtener_vectorstore),
+        ("caches", False, caches),
+    ]
+
+    consulta = os.getenv("ARRANQUE_CONSULTA", "").strip()
+    if consulta:
+        async def consulta_calentamiento():
+            resultado = await buscar_documentos_async(consulta)
+            logger.info(f"🔥 Consulta de calentamiento: {len(resultado)} documentos")
+        pasos.append(("consulta_calentamiento", False, consulta_calentamiento))
+
+    return pasos
+
+
+def precargar() -> Dict[str, float]:
+    """
+    Carga en el proceso master, antes del fork, las estructuras de solo lectura: módulos
+    pesados, índice curricular e índice NumPy (si MOTOR_VECTORIAL=numpy). No crea clientes
+    HTTP, Chroma ni conexiones SQLite, que no se pueden compartir entre procesos.
+    Retorna la duración de cada paso en ms.
+    """
+    from app.indice_curricular import obtener_indice
+    from app.rag import precargar_indice_numpy
+    from cache_paginas import cerrar_cache_paginas
+
+    def modulos():
+        for modulo in MODULOS_PESADOS:
+            try:
+                importlib.import_module(modulo)
+            except ImportError as e:
+                logger.warning(f"⚠️ No se pudo precargar {modulo}: {e}")
+
+    def indice_curricular():
+        obtener_indice()
+        # La construcción abrió la caché de páginas del PDF en este proceso
+        cerrar_cache_paginas()
+
+    duraciones = {}
+    for nombre, funcion in (("modulos", modulos), ("indice_curricular", indice_curricular),
+                            ("indice_numpy", precargar_indice_numpy)):
+        inicio = time.perf_counter()
+        funcion()
+        duraciones[nombre] = round((time.perf_counter() - inicio) * 1000, 1)
+    logger.info(f"📦 Precarga antes del fork: {duraciones}")
+    return duraciones
+
+
+async def calentar(estado: EstadoArranque):
+    """Carga todos los componentes y deja el resultado en `estado`"""
+    await estado.ejecutar(pasos_calentamiento())
+    resumen = estado.resumen()
+    duraciones = ", ".join(f"{n}={c['duracion_ms']}ms" for n, c in resumen["componentes"].items())
+    if estado.listo:
+        logger.info(f"✅ Calentamiento terminado en {resumen['duracion_ms']} ms ({duraciones})")
+    else:
+        logger.error(f"❌ Calentamiento terminado con errores en {resumen['duracion_ms']} ms ({duraciones})")
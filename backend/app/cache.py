@@ -0,0 +1,290 @@
+"""
+Caché de respuestas en dos niveles para responder_con_rag_async
+- Nivel 1: LRU en memoria del proceso (microsegundos)
+- Nivel 2: SQLite en disco, compartido entre workers de uvicorn (WAL, lecturas concurrentes)
+
+La clave es la pregunta normalizada + la versión del corpus (rag.version_corpus: hash de
+los documentos fuente y versión del vectorstore cargado), así que al cambiar los documentos
+o recargar el corpus las entradas anteriores dejan de coincidir solas.
+Ambos niveles expiran por TTL y se limitan por número de entradas.
+
+Configuración por variables de entorno:
+    CACHE_RESPUESTAS           1 para activar (por defecto), 0 para desactivar
+    CACHE_LRU_MAX              Entradas en memoria por proceso (1024)
+    CACHE_TTL_SEGUNDOS         Vida de una respuesta en caché (86400)
+    CACHE_SQLITE_PATH          Archivo SQLite compartido (data/cache/respuestas.sqlite3)
+    CACHE_SQLITE_MAX           Entradas máximas en SQLite (50000)
+"""
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cada cuántas escrituras se limpia SQLite (expirados + exceso de entradas)
+_ESCRITURAS_ENTRE_LIMPIEZAS = 100
+
+# Resolución del orden de uso en SQLite: la hora de acceso de una entrada se actualiza a lo
+# sumo una vez por intervalo, así un hit frecuente no convierte cada lectura en escritura
+_SEGUNDOS_ENTRE_ACCESOS = 300
+
+
+class CacheLRU:
+    """LRU en memoria con TTL, segura entre hilos"""
+
+    def __init__(self, max_entradas: int, ttl_segundos: float):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._datos: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            expira, valor = entrada
+            if expira < time.time():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave: str, valor: Any, ttl_segundos: Optional[float] = None):
+        ttl = self.ttl_segundos if ttl_segundos is None else ttl_segundos
+        with self._lock:
+            self._datos[clave] = (time.time() + ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+
+class CacheSQLite:
+    """
+    Tabla clave -> valor en SQLite con TTL y límite de entradas (se eliminan primero las
+    menos usadas recientemente, con una resolución de _SEGUNDOS_ENTRE_ACCESOS). Una conexión
+    por hilo; WAL permite que varios procesos lean mientras otro escribe.
+    """
+
+    def __init__(self, ruta: str, tabla: str, max_entradas: int, ttl_segundos: Optional[float]):
+        self.ruta = ruta
+        self.tabla = tabla
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        self._local = threading.local()
+        self._escrituras = 0
+        self._lock_escrituras = threading.Lock()
+        Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+        self._conexion().execute(
+            f"CREATE TABLE IF NOT EXISTS {tabla} ("
+            " clave TEXT PRIMARY KEY, valor BLOB NOT NULL,"
+            " expira REAL, accedido REAL NOT NULL)"
+        )
+        self._conexion().execute(f"CREATE INDEX IF NOT EXISTS {tabla}_accedido ON {tabla}(accedido)")
+
+    def _conexion(self) -> sqlite3.Connection:
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        conexion = self._conexion()
+        fila = conexion.execute(
+            f"SELECT valor, expira, accedido FROM {self.tabla} WHERE clave = ?", (clave,)
+        ).fetchone()
+        if fila is None:
+            return None
+        valor, expira, accedido = fila
+        ahora = time.time()
+        if expira is not None and expira < ahora:
+            conexion.execute(f"DELETE FROM {self.tabla} WHERE clave = ?", (clave,))
+            return None
+        if ahora - accedido >= _SEGUNDOS_ENTRE_ACCESOS:
+            conexion.execute(f"UPDATE {self.tabla} SET accedido = ? WHERE clave = ?", (ahora, clave))
+        return valor
+
+    def obtener_varios(self, claves: list) -> Dict[str, Any]:
+        """Lectura en bloque para lotes grandes (el orden de uso se actualiza en un solo executemany)"""
+        encontrados: Dict[str, Any] = {}
+        accedidos = []
+        ahora = time.time()
+        conexion = self._conexion()
+        for inicio in range(0, len(claves), 500):
+            bloque = claves[inicio:inicio + 500]
+            marcadores = ",".join("?" * len(bloque))
+            for clave, valor, expira, accedido in conexion.execute(
+                f"SELECT clave, valor, expira, accedido FROM {self.tabla} WHERE clave IN ({marcadores})", bloque
+            ):
+                if expira is None or expira >= ahora:
+                    encontrados[clave] = valor
+                    if ahora - accedido >= _SEGUNDOS_ENTRE_ACCESOS:
+                        accedidos.append((ahora, clave))
+        if accedidos:
+            conexion.executemany(f"UPDATE {self.tabla} SET accedido = ? WHERE clave = ?", accedidos)
+        return encontrados
+
+    def guardar(self, clave: str, valor: Any):
+        self.guardar_varios([(clave, valor)])
+
+    def guardar_varios(self, pares: list):
+        ahora = time.time()
+        expira = ahora + self.ttl_segundos if self.ttl_segundos else None
+        self._conexion().executemany(
+            f"INSERT OR REPLACE INTO {self.tabla} (clave, valor, expira, accedido) VALUES (?, ?, ?, ?)",
+            [(clave, valor, expira, ahora) for clave, valor in pares]
+        )
+        # El contador se comparte entre los hilos del threadpool
+        with self._lock_escrituras:
+            self._escrituras += len(pares)
+            limpiar = self._escrituras >= _ESCRITURAS_ENTRE_LIMPIEZAS
+            if limpiar:
+                self._escrituras = 0
+        if limpiar:
+            self.limpiar_expirados()
+
+    def limpiar_expirados(self):
+        """Elimina entradas expiradas y las menos usadas si se supera max_entradas"""
+        conexion = self._conexion()
+        conexion.execute(f"DELETE FROM {self.tabla} WHERE expira IS NOT NULL AND expira < ?", (time.time(),))
+        total = conexion.execute(f"SELECT COUNT(*) FROM {self.tabla}").fetchone()[0]
+        exceso = total - self.max_entradas
+        if exceso > 0:
+            conexion.execute(
+                f"DELETE FROM {self.tabla} WHERE clave IN "
+                f"(SELECT clave FROM {self.tabla} ORDER BY accedido ASC LIMIT ?)", (exceso,)
+            )
+
+    def __len__(self) -> int:
+        return self._conexion().execute(f"SELECT COUNT(*) FROM {self.tabla}").fetchone()[0]
+
+
+def clave_pregunta(pregunta: str, version_corpus: str) -> str:
+    """Clave estable: pregunta normalizada (sin tildes, mayúsculas ni espacios extra) + versión"""
+    from app.indice_curricular import normalizar_texto
+    texto = f"{version_corpus}\n{normalizar_texto(pregunta)}"
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+class CacheRespuestas:
+    """Caché de respuestas completas: LRU del proceso delante de SQLite compartido"""
+
+    def __init__(self, lru: CacheLRU, sqlite: Optional[CacheSQLite]):
+        self.lru = lru
+        self.sqlite = sqlite
+        self.estadisticas = {"hits_lru": 0, "hits_sqlite": 0, "misses": 0, "guardadas": 0}
+        # Las lecturas de SQLite cuentan desde hilos (asyncio.to_thread): los contadores se
+        # suman bajo el lock
+        self._lock = threading.Lock()
+
+    def _contar(self, campo: str):
+        with self._lock:
+            self.estadisticas[campo] += 1
+
+    def _obtener_lru(self, clave: str) -> Optional[str]:
+        respuesta = self.lru.obtener(clave)
+        if respuesta is not None:
+            self._contar("hits_lru")
+        return respuesta
+
+    def _obtener_sqlite(self, clave: str) -> Optional[str]:
+        valor = None
+        if self.sqlite is not None:
+            try:
+                valor = self.sqlite.obtener(clave)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Error leyendo caché SQLite: {e}")
+        if valor is None:
+            self._contar("misses")
+            return None
+        respuesta = valor.decode('utf-8') if isinstance(valor, bytes) else valor
+        self.lru.guardar(clave, respuesta)
+        self._contar("hits_sqlite")
+        return respuesta
+
+    def _guardar_sqlite(self, clave: str, respuesta: str):
+        if self.sqlite is not None:
+            try:
+                self.sqlite.guardar(clave, respuesta)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Error escribiendo caché SQLite: {e}")
+
+    def obtener(self, clave: str) -> Optional[str]:
+        respuesta = self._obtener_lru(clave)
+        if respuesta is not None:
+            return respuesta
+        return self._obtener_sqlite(clave)
+
+    async def obtener_async(self, clave: str) -> Optional[str]:
+        """Igual que obtener, pero la lectura de SQLite se hace en un hilo"""
+        respuesta = self._obtener_lru(clave)
+        if respuesta is not None:
+            return respuesta
+        return await asyncio.to_thread(self._obtener_sqlite, clave)
+
+    def guardar(self, clave: str, respuesta: str):
+        self.lru.guardar(clave, respuesta)
+        self._guardar_sqlite(clave, respuesta)
+        self._contar("guardadas")
+
+    async def guardar_async(self, clave: str, respuesta: str):
+        """Igual que guardar, pero la escritura en SQLite se hace en un hilo"""
+        self.lru.guardar(clave, respuesta)
+        await asyncio.to_thread(self._guardar_sqlite, clave, respuesta)
+        self._contar("guardadas")
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            estadisticas = dict(self.estadisticas)
+        return {
+            **estadisticas,
+            "entradas_lru": len(self.lru),
+            "entradas_sqlite": len(self.sqlite) if self.sqlite is not None else None,
+        }
+
+
+_cache_respuestas: Optional[CacheRespuestas] = None
+_lock = threading.Lock()
+
+
+def cache_respuestas_activa() -> bool:
+    return os.getenv("CACHE_RESPUESTAS", "1") != "0"
+
+
+def obtener_cache_respuestas() -> CacheRespuestas:
+    """Caché de respuestas del proceso (se crea la primera vez)"""
+    global _cache_respuestas
+    if _cache_respuestas is None:
+        with _lock:
+            if _cache_respuestas is None:
+                ttl = float(os.getenv("CACHE_TTL_SEGUNDOS", "86400"))
+                lru = CacheLRU(int(os.getenv("CACHE_LRU_MAX", "1024")), ttl)
+                try:
+                    sqlite = CacheSQLite(
+                        os.getenv("CACHE_SQLITE_PATH", "data/cache/respuestas.sqlite3"),
+                        "respuestas",
+                        int(os.getenv("CACHE_SQLITE_MAX", "50000")),
+                        ttl
+                    )
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ Caché SQLite no disponible, solo se usará la LRU: {e}")
+                    sqlite = None
+                _cache_respuestas = CacheRespuestas(lru, sqlite)
+    return _cache_respuestas
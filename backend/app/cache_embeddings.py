@@ -0,0 +1,208 @@
+"""
+Caché persistente de embeddings
+Envuelve un modelo de embeddings de LangChain (OpenAIEmbeddings) para que cada texto se
+envíe a la API una sola vez: la pregunta de similarity_search y los documentos de
+cargar_chroma.py se buscan primero en la caché.
+
+- Nivel 1: LRU en memoria del proceso
+- Nivel 2: SQLite compartido entre workers y con cargar_chroma.py (sin TTL: el embedding
+  de un texto no cambia mientras no cambie el modelo)
+
+La clave es el nombre del modelo + el texto normalizado (Unicode NFC y espacios colapsados).
+Los vectores se guardan como float32 (4 bytes por dimensión).
+
+Configuración por variables de entorno:
+    CACHE_EMBEDDINGS           1 para activar (por defecto), 0 para desactivar
+    CACHE_EMBEDDINGS_LRU_MAX   Embeddings en memoria por proceso (4096)
+    CACHE_EMBEDDINGS_PATH      Archivo SQLite compartido (data/cache/embeddings.sqlite3)
+    CACHE_EMBEDDINGS_MAX       Entradas máximas en SQLite (200000)
+"""
+import os
+import re
+import asyncio
+import sqlite3
+import threading
+import hashlib
+import logging
+import unicodedata
+from array import array
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from app.cache import CacheLRU, CacheSQLite
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_para_embedding(texto: str) -> str:
+    """Normalización que no cambia el significado del texto (no quita tildes ni mayúsculas)"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', texto)).strip()
+
+
+def clave_embedding(modelo: str, texto: str) -> str:
+    return hashlib.sha256(f"{modelo}\n{normalizar_para_embedding(texto)}".encode('utf-8')).hexdigest()
+
+
+def _a_bytes(vector: List[float]) -> bytes:
+    return array('f', vector).tobytes()
+
+
+def _desde_bytes(valor: bytes) -> List[float]:
+    vector = array('f')
+    vector.frombytes(valor)
+    return vector.tolist()
+
+
+class EmbeddingsConCache(Embeddings):
+    """Embeddings de LangChain con caché LRU + SQLite delante del modelo real"""
+
+    def __init__(self, modelo: Embeddings, nombre_modelo: str, lru: CacheLRU, sqlite: Optional[CacheSQLite]):
+        self.modelo = modelo
+        self.nombre_modelo = nombre_modelo
+        self.lru = lru
+        self.sqlite = sqlite
+        self.estadisticas = {"hits_lru": 0, "hits_sqlite": 0, "misses": 0}
+        # Se llama desde hilos (asyncio.to_thread, lotes concurrentes de la ingesta): los
+        # contadores se suman bajo el lock
+        self._lock = threading.Lock()
+
+    def _contar(self, campo: str, cantidad: int = 1):
+        if cantidad:
+            with self._lock:
+                self.estadisticas[campo] += cantidad
+
+    def _buscar(self, claves: List[str]) -> Dict[str, List[float]]:
+        """Vectores ya calculados para las claves dadas (primero LRU, luego SQLite)"""
+        encontrados: Dict[str, List[float]] = {}
+        pendientes = []
+        for clave in claves:
+            vector = self.lru.obtener(clave)
+            if vector is not None:
+                encontrados[clave] = vector
+            else:
+                pendientes.append(clave)
+        self._contar("hits_lru", len(encontrados))
+
+        if pendientes and self.sqlite is not None:
+            try:
+                en_sqlite = self.sqlite.obtener_varios(pendientes)
+                for clave, valor in en_sqlite.items():
+                    vector = _desde_bytes(valor)
+                    encontrados[clave] = vector
+                    self.lru.guardar(clave, vector)
+                self._contar("hits_sqlite", len(en_sqlite))
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Error leyendo caché de embeddings: {e}")
+        return encontrados
+
+    def _guardar(self, nuevos: Dict[str, List[float]]):
+        for clave, vector in nuevos.items():
+            self.lru.guardar(clave, vector)
+        if nuevos and self.sqlite is not None:
+            try:
+                self.sqlite.guardar_varios([(clave, _a_bytes(vector)) for clave, vector in nuevos.items()])
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Error escribiendo caché de embeddings: {e}")
+
+    def _faltantes(self, textos: List[str], claves: List[str], encontrados: Dict[str, List[float]]) -> Dict[str, str]:
+        """clave -> texto de los que hay que calcular (sin repetir textos iguales)"""
+        faltantes: Dict[str, str] = {}
+        for texto, clave in zip(textos, claves):
+            if clave not in encontrados and clave not in faltantes:
+                faltantes[clave] = texto
+        self._contar("misses", len(faltantes))
+        return faltantes
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        claves = [clave_embedding(self.nombre_modelo, t) for t in texts]
+        encontrados = self._buscar(claves)
+        faltantes = self._faltantes(texts, claves, encontrados)
+        if faltantes:
+            nuevos = dict(zip(faltantes, self.modelo.embed_documents(list(faltantes.values()))))
+            self._guardar(nuevos)
+            encontrados.update(nuevos)
+        return [encontrados[clave] for clave in claves]
+
+    def embed_query(self, text: str) -> List[float]:
+        clave = clave_embedding(self.nombre_modelo, text)
+        encontrado = self._buscar([clave]).get(clave)
+        if encontrado is not None:
+            return encontrado
+        self._contar("misses")
+        vector = self.modelo.embed_query(text)
+        self._guardar({clave: vector})
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        claves = [clave_embedding(self.nombre_modelo, t) for t in texts]
+        encontrados = await asyncio.to_thread(self._buscar, claves)
+        faltantes = self._faltantes(texts, claves, encontrados)
+        if faltantes:
+            nuevos = dict(zip(faltantes, await self.modelo.aembed_documents(list(faltantes.values()))))
+            await asyncio.to_thread(self._guardar, nuevos)
+            encontrados.update(nuevos)
+        return [encontrados[clave] for clave in claves]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        clave = clave_embedding(self.nombre_modelo, text)
+        # La LRU se consulta en línea; solo SQLite va a un hilo
+        encontrado = self.lru.obtener(clave)
+        if encontrado is not None:
+            self._contar("hits_lru")
+            return encontrado
+        encontrado = (await asyncio.to_thread(self._buscar, [clave])).get(clave)
+        if encontrado is not None:
+            return encontrado
+        self._contar("misses")
+        vector = await self.modelo.aembed_query(text)
+        await asyncio.to_thread(self._guardar, {clave: vector})
+        return vector
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            estadisticas = dict(self.estadisticas)
+        return {
+            **estadisticas,
+            "modelo": self.nombre_modelo,
+            "entradas_lru": len(self.lru),
+            "entradas_sqlite": len(self.sqlite) if self.sqlite is not None else None,
+        }
+
+
+# Cachés por proceso (una por nombre de modelo)
+_caches: Dict[str, EmbeddingsConCache] = {}
+
+
+def cache_embeddings_activa() -> bool:
+    return os.getenv("CACHE_EMBEDDINGS", "1") != "0"
+
+
+def con_cache(modelo: Embeddings, nombre_modelo: str) -> Embeddings:
+    """
+    Envuelve `modelo` con la caché de embeddings (o lo devuelve tal cual si está desactivada).
+    `nombre_modelo` forma parte de la clave para no mezclar vectores de modelos distintos.
+    """
+    if not cache_embeddings_activa():
+        return modelo
+
+    lru = CacheLRU(int(os.getenv("CACHE_EMBEDDINGS_LRU_MAX", "4096")), float("inf"))
+    try:
+        sqlite = CacheSQLite(
+            os.getenv("CACHE_EMBEDDINGS_PATH", "data/cache/embeddings.sqlite3"),
+            "embeddings",
+            int(os.getenv("CACHE_EMBEDDINGS_MAX", "200000")),
+            None
+        )
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ Caché SQLite de embeddings no disponible, solo se usará la LRU: {e}")
+        sqlite = None
+
+    envuelto = EmbeddingsConCache(modelo, nombre_modelo, lru, sqlite)
+    _caches[nombre_modelo] = envuelto
+    return envuelto
+
+
+def estadisticas_embeddings() -> Dict[str, Any]:
+    """Hits/misses de las cachés de embeddings creadas en este proceso"""
+    return {nombre: cache.resumen() for nombre, cache in _caches.items()}
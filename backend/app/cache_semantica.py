@@ -0,0 +1,133 @@
+"""
+Caché semántica de respuestas del LLM
+Encuentra preguntas ya respondidas que son paráfrasis de la actual ("qué materias hay en
+3er semestre" ~ "materias del tercer semestre") comparando embeddings por similitud coseno.
+
+- Los vectores se guardan normalizados en una matriz float32 preasignada (memoria acotada:
+  max_entradas x dimensión) y la búsqueda es un único producto matriz-vector.
+- Las entradas pertenecen a una versión del corpus; si la versión cambia la caché se vacía.
+- Cada entrada lleva una "huella" con la intención determinista de la pregunta (filtros de
+  semestre/tipología, materia mencionada). Un vecino por encima del umbral con huella distinta
+  se descarta y se cuenta como falso hit (p. ej. "materias del 3er semestre" vs "del 4to").
+- Al llenarse se reemplaza la entrada usada hace más tiempo.
+
+Configuración por variables de entorno:
+    CACHE_SEMANTICA         1 para activar (por defecto), 0 para desactivar
+    CACHE_SEMANTICA_UMBRAL  Similitud coseno mínima para considerar un hit (0.95)
+    CACHE_SEMANTICA_MAX     Entradas máximas por proceso (2000)
+"""
+import os
+import time
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class CacheSemantica:
+    """Vecino más cercano por similitud coseno sobre las preguntas ya respondidas"""
+
+    def __init__(self, umbral: float, max_entradas: int):
+        self.umbral = umbral
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._vectores: Optional[np.ndarray] = None  # Se asigna con el primer vector (dimensión)
+        self._huellas: List[str] = []
+        self._respuestas: List[str] = []
+        self._ultimo_uso = np.zeros(max_entradas, dtype=np.float64)
+        self._version: Optional[str] = None
+        self.estadisticas = {"hits": 0, "misses": 0, "falsos_hits": 0, "guardadas": 0, "desalojadas": 0}
+
+    def _normalizar(self, vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norma = float(np.linalg.norm(v))
+        return v / norma if norma > 0 else v
+
+    def _asegurar_version(self, version: str):
+        """Vacía la caché si cambió la versión del corpus (llamar con el lock tomado)"""
+        if version != self._version:
+            self._version = version
+            self._huellas.clear()
+            self._respuestas.clear()
+            self._ultimo_uso[:] = 0
+
+    def buscar(self, vector: Sequence[float], version: str, huella: str) -> Optional[str]:
+        """Respuesta de la pregunta más parecida si supera el umbral y tiene la misma huella"""
+        consulta = self._normalizar(vector)
+        with self._lock:
+            self._asegurar_version(version)
+            n = len(self._respuestas)
+            if n == 0 or self._vectores is None or self._vectores.shape[1] != consulta.shape[0]:
+                self.estadisticas["misses"] += 1
+                return None
+
+            similitudes = self._vectores[:n] @ consulta
+            mejor = int(np.argmax(similitudes))
+            if similitudes[mejor] < self.umbral:
+                self.estadisticas["misses"] += 1
+                return None
+
+            if self._huellas[mejor] != huella:
+                # Muy parecida en el espacio de embeddings pero con otra intención
+                self.estadisticas["falsos_hits"] += 1
+                self.estadisticas["misses"] += 1
+                return None
+
+            self._ultimo_uso[mejor] = time.monotonic()
+            self.estadisticas["hits"] += 1
+            return self._respuestas[mejor]
+
+    def guardar(self, vector: Sequence[float], version: str, huella: str, respuesta: str):
+        v = self._normalizar(vector)
+        with self._lock:
+            self._asegurar_version(version)
+            if self._vectores is None or self._vectores.shape[1] != v.shape[0]:
+                self._vectores = np.zeros((self.max_entradas, v.shape[0]), dtype=np.float32)
+                self._huellas.clear()
+                self._respuestas.clear()
+
+            n = len(self._respuestas)
+            if n < self.max_entradas:
+                posicion = n
+                self._huellas.append(huella)
+                self._respuestas.append(respuesta)
+            else:
+                posicion = int(np.argmin(self._ultimo_uso))
+                self._huellas[posicion] = huella
+                self._respuestas[posicion] = respuesta
+                self.estadisticas["desalojadas"] += 1
+
+            self._vectores[posicion] = v
+            self._ultimo_uso[posicion] = time.monotonic()
+            self.estadisticas["guardadas"] += 1
+
+    def resumen(self) -> Dict[str, Any]:
+        consultas = self.estadisticas["hits"] + self.estadisticas["misses"]
+        return {
+            **self.estadisticas,
+            "entradas": len(self._respuestas),
+            "max_entradas": self.max_entradas,
+            "umbral": self.umbral,
+            "tasa_hits": round(self.estadisticas["hits"] / consultas, 4) if consultas else 0.0,
+        }
+
+
+_cache_semantica: Optional[CacheSemantica] = None
+_lock = threading.Lock()
+
+
+def cache_semantica_activa() -> bool:
+    return os.getenv("CACHE_SEMANTICA", "1") != "0"
+
+
+def obtener_cache_semantica() -> CacheSemantica:
+    """Caché semántica del proceso (se crea la primera vez)"""
+    global _cache_semantica
+    if _cache_semantica is None:
+        with _lock:
+            if _cache_semantica is None:
+                _cache_semantica = CacheSemantica(
+                    umbral=float(os.getenv("CACHE_SEMANTICA_UMBRAL", "0.95")),
+                    max_entradas=int(os.getenv("CACHE_SEMANTICA_MAX", "2000"))
+                )
+    return _cache_semantica
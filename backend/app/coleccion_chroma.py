@@ -0,0 +1,313 @@
+"""
+Acceso directo a la colección de Chroma (sin langchain_community)
+
+La app solo necesita de Chroma una consulta por vector y un get(where=...). Hacerlo con el
+cliente de chromadb evita importar el wrapper de langchain_community (~0.7 s por worker,
+que arrastra langchain_core.retrievers, tracers y langsmith) y abre la misma colección que
+escribe cargar_chroma.py ("langchain", distancia L2), con los mismos resultados.
+
+ColeccionChroma expone la misma parte de la interfaz que IndiceVectorial (`embeddings`,
+`get` y `similarity_search_by_vector[_with_relevance_scores]`), así rag.py no distingue
+entre los motores.
+
+Modo cliente/servidor: con CHROMA_HOST, la app y cargar_chroma.py usan un servidor de
+Chroma (`chroma run --path data/vectorstore --port 8001`) en lugar de abrir cada proceso su
+copia embebida de los archivos SQLite. Los workers comparten así un solo store, y la carga
+de documentos lo actualiza mientras la API sigue respondiendo. Cada worker mantiene un pool
+de conexiones HTTP keep-alive hacia el servidor y una caché LRU de resultados (consultas y
+listados) con TTL, para no repetir la ida y vuelta en preguntas frecuentes; el TTL acota
+cuánto tarda un worker en ver lo que cargó cargar_chroma.py. Si el servidor no responde al
+abrir, la app usa el modo embebido (cargar_chroma.py, en cambio, se detiene). Si deja de
+responder después, cada consulta se reintenta una vez con la caché de resultados vacía y,
+si vuelve a fallar, el worker pasa al modo embebido. En ambos casos, en cada revisión de la
+versión del corpus se intenta volver al servidor.
+
+Versión del corpus: al terminar una carga, cargar_chroma.py guarda en la metadata de la
+colección la versión del manifiesto de ingesta (guardar_version_corpus). Cada worker la
+vuelve a leer cada CHROMA_REVISION_SEGUNDOS; si cambió, vacía su caché de resultados y
+rag.py la usa en las claves de las cachés de respuestas, así una recarga del corpus no
+sigue respondiendo con lo que había antes.
+
+Configuración por variables de entorno:
+    CHROMA_HOST               Servidor de Chroma (vacío por defecto: modo embebido)
+    CHROMA_PUERTO             Puerto del servidor (8000)
+    CHROMA_SSL                1 para conectarse por HTTPS (0)
+    CHROMA_MAX_CONEXIONES     Conexiones simultáneas por worker hacia el servidor (32)
+    CHROMA_MAX_KEEPALIVE      Conexiones inactivas que se mantienen abiertas (8)
+    CHROMA_CACHE_MAX          Resultados en la caché de cada worker (2048; 0 la desactiva)
+    CHROMA_CACHE_TTL          Segundos que un resultado sigue vigente en la caché (60)
+    CHROMA_REVISION_SEGUNDOS  Segundos entre lecturas de la versión del corpus (10)
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+import time
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.cache import CacheLRU
+
+logger = logging.getLogger(__name__)
+
+# Nombre con que el wrapper de LangChain (cargar_chroma.py) crea la colección
+COLECCION = "langchain"
+
+# Campo de la metadata de la colección con la versión del corpus cargado
+CAMPO_VERSION = "version_corpus"
+
+
+def servidor_chroma() -> Optional[Tuple[str, int]]:
+    """(host, puerto) del servidor de Chroma configurado, o None para el modo embebido"""
+    host = os.getenv("CHROMA_HOST", "").strip()
+    if not host:
+        return None
+    return host, int(os.getenv("CHROMA_PUERTO", "8000"))
+
+
+def crear_cliente_chroma(directorio: str, respaldo_embebido: bool = True):
+    """
+    Cliente de chromadb: HTTP si hay CHROMA_HOST (con pool de conexiones), si no embebido
+    sobre `directorio`. Si el servidor no responde y `respaldo_embebido`, abre el embebido.
+    Retorna (cliente, modo) con modo "servidor" o "embebido".
+    """
+    import chromadb
+    from chromadb.config import Settings
+
+    servidor = servidor_chroma()
+    if servidor is not None:
+        host, puerto = servidor
+        ajustes = Settings(
+            chroma_http_max_connections=int(os.getenv("CHROMA_MAX_CONEXIONES", "32")),
+            chroma_http_max_keepalive_connections=int(os.getenv("CHROMA_MAX_KEEPALIVE", "8")),
+            anonymized_telemetry=False,
+        )
+        try:
+            cliente = chromadb.HttpClient(host=host, port=puerto, ssl=os.getenv("CHROMA_SSL", "0") == "1",
+                                          settings=ajustes)
+            cliente.heartbeat()
+            logger.info(f"🛰️ Conectado al servidor de Chroma en {host}:{puerto}")
+            return cliente, "servidor"
+        # chromadb informa el servidor caído con ValueError o con errores de httpx según la versión
+        except Exception as e:
+            if not respaldo_embebido:
+                raise
+            logger.warning(f"⚠️ Servidor de Chroma {host}:{puerto} no disponible ({e}), "
+                           f"usando el modo embebido en {directorio}")
+
+    return chromadb.Client(Settings(is_persistent=True, persist_directory=directorio)), "embebido"
+
+
+def _es_error_de_conexion(error: Exception) -> bool:
+    """El servidor de Chroma no respondió (conexión rechazada, cortada o vencida)"""
+    import httpx
+    return isinstance(error, (httpx.TransportError, ConnectionError))
+
+
+def guardar_version_corpus(cliente, version: str, nombre: str = COLECCION):
+    """Deja la versión del corpus cargado en la metadata de la colección (la leen los workers)"""
+    coleccion = cliente.get_collection(name=nombre, embedding_function=None)
+    # La configuración HNSW no se puede modificar: no se reenvía
+    metadata = {campo: valor for campo, valor in (coleccion.metadata or {}).items() if not campo.startswith("hnsw:")}
+    coleccion.modify(metadata={**metadata, CAMPO_VERSION: version})
+
+
+def _version(coleccion) -> str:
+    return str((coleccion.metadata or {}).get(CAMPO_VERSION, ""))
+
+
+def _clave(*partes: Any) -> str:
+    h = hashlib.sha256()
+    for parte in partes:
+        if isinstance(parte, (list, tuple)) and parte and isinstance(parte[0], float):
+            h.update(array('f', parte).tobytes())
+        else:
+            h.update(json.dumps(parte, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+class ColeccionChroma:
+    """Colección de Chroma con la interfaz de vectorstore que usa rag.py"""
+
+    def __init__(self, coleccion, embeddings=None, modo: str = "embebido", cache: Optional[CacheLRU] = None,
+                 cliente=None, revision_segundos: float = 10, directorio: Optional[str] = None):
+        self.coleccion = coleccion
+        self.embeddings = embeddings
+        self.modo = modo
+        # Resultados ya pedidos al servidor (solo en modo servidor)
+        self.cache = cache
+        self.estadisticas = {"hits": 0, "misses": 0}
+        # rag.py consulta desde varios hilos (asyncio.to_thread): los contadores se suman bajo el lock
+        self._lock = threading.Lock()
+        # Versión del corpus que dejó cargar_chroma.py (sin cliente no se vuelve a leer)
+        self.cliente = cliente
+        self.version = _version(coleccion)
+        self.revision_segundos = revision_segundos
+        self._ultima_revision = time.monotonic()
+        # Con servidor configurado y modo embebido, el worker está usando el respaldo en
+        # `directorio` porque el servidor no respondió
+        self.directorio = directorio
+        self._lock_modo = threading.Lock()
+
+    @property
+    def en_respaldo(self) -> bool:
+        return self.modo == "embebido" and self.directorio is not None and servidor_chroma() is not None
+
+    @classmethod
+    def abrir(cls, directorio: str, embeddings=None, nombre: str = COLECCION) -> "ColeccionChroma":
+        """Abre (o crea vacía) la colección en el servidor configurado o en `directorio`"""
+        cliente, modo = crear_cliente_chroma(directorio)
+        cache = None
+        maximo = int(os.getenv("CHROMA_CACHE_MAX", "2048"))
+        # También si se abrió el respaldo embebido: se usa al volver al servidor
+        if servidor_chroma() is not None and maximo > 0:
+            cache = CacheLRU(maximo, float(os.getenv("CHROMA_CACHE_TTL", "60")))
+        return cls(cliente.get_or_create_collection(name=nombre, embedding_function=None), embeddings, modo, cache,
+                   cliente, float(os.getenv("CHROMA_REVISION_SEGUNDOS", "10")), directorio)
+
+    def _ejecutar(self, operacion: Callable[[], Any]) -> Any:
+        """
+        Ejecuta una operación sobre la colección. En modo servidor, si el servidor no responde
+        se vacía la caché de resultados y se reintenta una vez (p. ej. una conexión keep-alive
+        que el servidor cerró); si vuelve a fallar, el worker pasa al respaldo embebido.
+        """
+        for intento in range(2):
+            modo = self.modo
+            try:
+                return operacion()
+            except Exception as e:
+                if modo != "servidor" or not _es_error_de_conexion(e):
+                    raise
+                if self.cache is not None:
+                    self.cache.limpiar()
+                if intento == 0:
+                    logger.warning(f"⚠️ El servidor de Chroma no respondió ({e}), reintentando")
+                else:
+                    self._pasar_a_respaldo(e)
+        return operacion()
+
+    def _pasar_a_respaldo(self, error: Exception):
+        """Cambia al modo embebido en `directorio` (sin directorio, el error se propaga)"""
+        if self.directorio is None:
+            raise error
+        with self._lock_modo:
+            if self.modo != "servidor":
+                return
+            logger.warning(f"⚠️ Servidor de Chroma no disponible ({error}), usando el modo embebido "
+                           f"en {self.directorio} hasta que vuelva a responder")
+            import chromadb
+            from chromadb.config import Settings
+            cliente = chromadb.Client(Settings(is_persistent=True, persist_directory=self.directorio))
+            self.coleccion = cliente.get_or_create_collection(name=self.coleccion.name, embedding_function=None)
+            self.cliente = cliente
+            self.version = _version(self.coleccion)
+            self.modo = "embebido"
+
+    def _volver_al_servidor(self) -> bool:
+        """Si el servidor responde de nuevo, las consultas siguientes vuelven a él"""
+        try:
+            cliente, _ = crear_cliente_chroma(self.directorio, respaldo_embebido=False)
+            coleccion = cliente.get_or_create_collection(name=self.coleccion.name, embedding_function=None)
+        except Exception:
+            return False
+        with self._lock_modo:
+            self.coleccion = coleccion
+            self.cliente = cliente
+            self.version = _version(coleccion)
+            self.modo = "servidor"
+            if self.cache is not None:
+                self.cache.limpiar()
+        return True
+
+    def version_vencida(self) -> bool:
+        """
+        Si toca volver a leer la versión del corpus. Solo quien recibe True la lee: las demás
+        peticiones del intervalo siguen con la versión actual.
+        """
+        if self.cliente is None:
+            return False
+        ahora = time.monotonic()
+        with self._lock:
+            if ahora - self._ultima_revision < self.revision_segundos:
+                return False
+            self._ultima_revision = ahora
+        return True
+
+    def revisar_version(self):
+        """
+        Vuelve a leer la colección; si cambió la versión del corpus, vacía la caché de
+        resultados. En el respaldo embebido, primero intenta volver al servidor.
+        """
+        if self.en_respaldo and self._volver_al_servidor():
+            return
+        try:
+            coleccion = self.cliente.get_collection(name=self.coleccion.name, embedding_function=None)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo revisar la versión de la colección de Chroma: {e}")
+            return
+        version = _version(coleccion)
+        if version != self.version:
+            # Una colección recreada tiene otro id: las consultas siguientes van a la nueva
+            self.coleccion = coleccion
+            self.version = version
+            if self.cache is not None:
+                self.cache.limpiar()
+            logger.info(f"🔄 Corpus de Chroma actualizado (versión {version})")
+
+    def __len__(self) -> int:
+        return self._ejecutar(lambda: self.coleccion.count())
+
+    def _leer(self, clave: str, consultar):
+        """Read-through: el resultado en caché o el del servidor (que queda guardado)"""
+        if self.cache is None or self.modo != "servidor":
+            return self._ejecutar(consultar)
+        resultado = self.cache.obtener(clave)
+        with self._lock:
+            self.estadisticas["hits" if resultado is not None else "misses"] += 1
+        if resultado is not None:
+            return resultado
+        resultado = self._ejecutar(consultar)
+        self.cache.guardar(clave, resultado)
+        return resultado
+
+    def get(self, where: Optional[Dict[str, Any]] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"where": where}
+        if include is not None:
+            kwargs["include"] = include
+        resultado = self._leer(_clave("get", where, include), lambda: dict(self.coleccion.get(**kwargs)))
+        # Copia de las listas: quien llama puede modificarlas sin tocar la caché
+        return {campo: list(valor) if isinstance(valor, list) else valor for campo, valor in resultado.items()}
+
+    def _consultar(self, embedding: List[float], k: int, filtro: Optional[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any], float]]:
+        resultado = self.coleccion.query(
+            query_embeddings=[embedding],
+            n_results=k,
+            where=filtro,
+            include=["documents", "metadatas", "distances"],
+        )
+        return list(zip(resultado["documents"][0], resultado["metadatas"][0], resultado["distances"][0]))
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding: Sequence[float], k: int = 4,
+                                                          filter: Optional[Dict[str, Any]] = None, **kwargs):
+        from langchain_core.documents import Document
+        embedding = [float(x) for x in embedding]
+        filas = self._leer(_clave("query", embedding, k, filter), lambda: self._consultar(embedding, k, filter))
+        return [
+            (Document(page_content=contenido, metadata=dict(metadata or {})), distancia)
+            for contenido, metadata, distancia in filas
+        ]
+
+    def similarity_search_by_vector(self, embedding: Sequence[float], k: int = 4,
+                                    filter: Optional[Dict[str, Any]] = None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_relevance_scores(embedding, k, filter)]
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            estadisticas = dict(self.estadisticas)
+        return {
+            "modo": self.modo,
+            "respaldo": self.en_respaldo,
+            "cache": {**estadisticas, "entradas": len(self.cache)} if self.cache is not None else None,
+        }
@@ -0,0 +1,399 @@
+"""
+Índice en memoria de la malla curricular
+Responde consultas estructuradas (código, créditos, semestre, tipología, prerrequisitos,
+listados por semestre/tipología) con búsquedas en diccionarios, sin embeddings ni Chroma.
+
+Se construye al arrancar a partir de los mismos procesadores que alimentan el vectorstore:
+- JSON: fuente principal (código, nombre, semestre, créditos, tipología, prerrequisitos)
+- PDF: nombres alternativos y materias que no estén en el JSON
+- CSV: grupos con profesores, horarios y salones
+
+Los nombres (principal y alternativos) también se indexan por trigramas de caracteres
+para resolver nombres con errores de escritura o truncados ("calclo diferencial").
+
+Cuando se actualizan los documentos (y se recarga el corpus con cargar_chroma.py), el
+índice se reconstruye solo: obtener_indice_async revisa cada pocos segundos la fecha de
+modificación y el tamaño de los documentos fuente y, si cambiaron, lo reconstruye en un
+hilo mientras las peticiones siguen usando el anterior.
+"""
+import os
+import re
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple, Any
+from app.agregados import TablaMaterias
+
+logger = logging.getLogger(__name__)
+
+# Rutas de los documentos fuente (relativas a backend/, igual que el vectorstore)
+JSON_PATH = "data/documents/malla_curricular_administracion_sistemas_informaticos.json"
+PDF_PATH = "data/documents/Contenido_de_las_asignaturas.pdf"
+CSV_PATH = "data/documents/asignaturas_formato.csv"
+
+# Segundos entre revisiones de los documentos fuente (si cambiaron, el índice se reconstruye)
+_SEGUNDOS_ENTRE_REVISIONES = 5
+
+# Similitud mínima (coeficiente de Dice sobre trigramas) para aceptar un nombre aproximado
+UMBRAL_SIMILITUD = 0.5
+
+# Códigos de la malla: 7 dígitos, con sufijo opcional de sede/grupo ('1000004-Z')
+_PATRON_CODIGO = re.compile(r'\b\d{7}(?:-[A-Za-z0-9]+)?\b')
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sin tildes y con espacios colapsados (para comparar nombres)"""
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', sin_tildes.lower()).strip(' .,;:¿?¡!"\'')
+
+
+def codigo_base(codigo: str) -> str:
+    """Código sin sufijo de sede/grupo: '1000004-Z' -> '1000004'"""
+    return codigo.strip().upper().split('-')[0].strip()
+
+
+def trigramas(texto: str) -> frozenset:
+    """Trigramas de caracteres del texto normalizado, con un espacio de relleno en los extremos"""
+    relleno = f" {texto} "
+    return frozenset(relleno[i:i + 3] for i in range(len(relleno) - 2))
+
+
+@dataclass(frozen=True)
+class Grupo:
+    """Grupo de una materia según el CSV de horarios"""
+    grupo: str
+    profesores: str = ""
+    horarios: str = ""
+    salones: str = ""
+
+
+@dataclass(frozen=True)
+class Materia:
+    """Materia de la malla curricular"""
+    codigo: str
+    nombre: str
+    semestre: Optional[int]
+    creditos: Optional[int]
+    tipologia: str
+    tipologia_tipo: str
+    tipologia_categoria: str
+    prerequisitos: str = 'Ninguno'
+    grupos: Tuple[Grupo, ...] = ()
+    nombres_alternativos: Tuple[str, ...] = ()
+
+    def como_dict(self) -> Dict[str, str]:
+        """Mismo formato que DocumentoRecuperado.como_materia (para reutilizar el formateo)"""
+        return {
+            'nombre': self.nombre,
+            'codigo': self.codigo,
+            'semestre': str(self.semestre) if self.semestre is not None else 'No disponible',
+            'creditos': str(self.creditos) if self.creditos is not None else 'No disponible',
+            'tipologia': self.tipologia or 'No disponible',
+            'prerequisitos': self.prerequisitos
+        }
+
+
+@dataclass
+class IndiceCurricular:
+    """
+    Índice principal por código y por nombre normalizado, con índices secundarios
+    por semestre, tipo y categoría de tipología. Las listas conservan el orden del JSON.
+    `tabla` contiene los agregados (conteos y créditos) de las mismas materias,
+    `por_trigrama` lleva cada trigrama a los nombres normalizados que lo contienen y
+    `version` identifica el contenido de los documentos con que se construyó.
+    """
+    materias: List[Materia] = field(default_factory=list)
+    por_codigo: Dict[str, Materia] = field(default_factory=dict)
+    por_nombre: Dict[str, Materia] = field(default_factory=dict)
+    por_semestre: Dict[int, List[Materia]] = field(default_factory=dict)
+    por_tipo: Dict[str, List[Materia]] = field(default_factory=dict)
+    por_categoria: Dict[str, List[Materia]] = field(default_factory=dict)
+    por_trigrama: Dict[str, List[str]] = field(default_factory=dict)
+    _num_trigramas: Dict[str, int] = field(default_factory=dict, repr=False)
+    tabla: TablaMaterias = field(default_factory=lambda: TablaMaterias([]))
+    version: str = ""
+
+    @classmethod
+    def desde_materias(cls, materias: List[Materia], version: str = "") -> "IndiceCurricular":
+        indice = cls(materias=list(materias), version=version)
+        for materia in indice.materias:
+            indice.por_codigo[materia.codigo] = materia
+            for nombre in (materia.nombre, *materia.nombres_alternativos):
+                indice.por_nombre.setdefault(normalizar_texto(nombre), materia)
+            if materia.semestre is not None:
+                indice.por_semestre.setdefault(materia.semestre, []).append(materia)
+            indice.por_tipo.setdefault(materia.tipologia_tipo, []).append(materia)
+            indice.por_categoria.setdefault(materia.tipologia_categoria, []).append(materia)
+        for nombre in indice.por_nombre:
+            grams = trigramas(nombre)
+            indice._num_trigramas[nombre] = len(grams)
+            for gram in grams:
+                indice.por_trigrama.setdefault(gram, []).append(nombre)
+        # La tabla columnar de agregados se reconstruye junto con el índice
+        indice.tabla = TablaMaterias(
+            (m.semestre, m.creditos, m.tipologia_tipo, m.tipologia_categoria) for m in indice.materias
+        )
+        return indice
+
+    def __len__(self) -> int:
+        return len(self.materias)
+
+    def buscar_codigo(self, codigo: str) -> Optional[Materia]:
+        """Busca por código exacto o por código base ('1000004-Z' -> '1000004')"""
+        return self.por_codigo.get(codigo.strip().upper()) or self.por_codigo.get(codigo_base(codigo))
+
+    def buscar_nombre(self, nombre: str) -> Optional[Materia]:
+        """
+        Busca por nombre normalizado (sin tildes ni mayúsculas).
+        Si no hay coincidencia exacta, usa contención en ambos sentidos:
+        primero el nombre más largo contenido en la búsqueda, luego el más corto que la contiene.
+        """
+        buscado = normalizar_texto(nombre)
+        if not buscado:
+            return None
+
+        exacta = self.por_nombre.get(buscado)
+        if exacta is not None:
+            return exacta
+
+        contenidos = [n for n in self.por_nombre if n in buscado]
+        if contenidos:
+            return self.por_nombre[max(contenidos, key=len)]
+
+        contienen = [n for n in self.por_nombre if buscado in n]
+        if contienen:
+            return self.por_nombre[min(contienen, key=len)]
+
+        return None
+
+    def buscar_aproximado(self, nombre: str, umbral: float = UMBRAL_SIMILITUD) -> Optional[Materia]:
+        """
+        Busca el nombre más parecido por trigramas de caracteres (tolera letras cambiadas,
+        faltantes o sobrantes). Solo se cuentan los nombres que comparten algún trigrama
+        con la búsqueda; se acepta el de mayor coeficiente de Dice si alcanza el umbral.
+        """
+        buscados = trigramas(normalizar_texto(nombre))
+        if len(buscados) < 3:
+            return None
+
+        compartidos: Counter = Counter()
+        for gram in buscados:
+            compartidos.update(self.por_trigrama.get(gram, ()))
+        if not compartidos:
+            return None
+
+        mejor, similitud = max(
+            ((n, 2 * c / (len(buscados) + self._num_trigramas[n])) for n, c in compartidos.items()),
+            key=lambda par: (par[1], -len(par[0]))
+        )
+        return self.por_nombre[mejor] if similitud >= umbral else None
+
+    def buscar_codigo_en_texto(self, texto: str) -> Optional[Materia]:
+        """Primera materia cuyo código (con o sin sufijo) aparece en el texto"""
+        for coincidencia in _PATRON_CODIGO.finditer(texto):
+            materia = self.buscar_codigo(coincidencia.group(0))
+            if materia is not None:
+                return materia
+        return None
+
+    def resolver(self, texto: str) -> Optional[Materia]:
+        """
+        Resuelve la materia que menciona el texto: por código, por nombre exacto o por
+        contención (buscar_nombre) y, si nada coincide, por nombre aproximado.
+        """
+        return self.buscar_codigo_en_texto(texto) or self.buscar_nombre(texto) or self.buscar_aproximado(texto)
+
+    def filtrar(self, semestre: Optional[int] = None, tipo: Optional[str] = None,
+                categoria: Optional[str] = None) -> List[Materia]:
+        """Materias que cumplen todos los filtros dados, en el orden de la malla"""
+        candidatos = []
+        if semestre is not None:
+            candidatos.append(self.por_semestre.get(semestre, []))
+        if tipo is not None:
+            candidatos.append(self.por_tipo.get(tipo, []))
+        if categoria is not None:
+            candidatos.append(self.por_categoria.get(categoria, []))
+
+        if not candidatos:
+            return list(self.materias)
+
+        # Recorrer la lista más corta y comprobar pertenencia en las demás
+        candidatos.sort(key=len)
+        resto = [set(id(m) for m in lista) for lista in candidatos[1:]]
+        return [m for m in candidatos[0] if all(id(m) in ids for ids in resto)]
+
+
+def _entero_o_none(valor: Any) -> Optional[int]:
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def version_documentos(*rutas: str) -> str:
+    """Hash corto del contenido de los documentos fuente (cambia si cambia cualquiera)"""
+    hash_total = hashlib.sha256()
+    for ruta in rutas:
+        archivo = Path(ruta)
+        if archivo.exists():
+            hash_total.update(archivo.name.encode('utf-8'))
+            hash_total.update(hashlib.sha256(archivo.read_bytes()).digest())
+    return hash_total.hexdigest()[:16]
+
+
+def firma_documentos(*rutas: str) -> Tuple[Tuple[str, Optional[int], Optional[int]], ...]:
+    """(ruta, fecha de modificación, tamaño) de cada documento: detecta cambios sin leerlos"""
+    firma = []
+    for ruta in rutas:
+        try:
+            estado = os.stat(ruta)
+            firma.append((ruta, estado.st_mtime_ns, estado.st_size))
+        except OSError:
+            firma.append((ruta, None, None))
+    return tuple(firma)
+
+
+def construir_indice(json_path: str = JSON_PATH, pdf_path: str = PDF_PATH,
+                     csv_path: str = CSV_PATH) -> IndiceCurricular:
+    """Construye el índice a partir de los procesadores de JSON, PDF y CSV"""
+    from procesar_json import procesar_malla_curricular
+    from procesar_pdf import procesar_pdf_materias
+    from procesar_csv import procesar_csv_horarios
+
+    base: Dict[str, Dict[str, Any]] = {}
+    alternativos: Dict[str, List[str]] = {}
+    grupos: Dict[str, List[Grupo]] = {}
+
+    if Path(json_path).exists():
+        _, metadatas = procesar_malla_curricular(json_path)
+        for meta in metadatas:
+            codigo = meta['codigo'].strip()
+            base[codigo] = {
+                'codigo': codigo,
+                'nombre': meta['nombre'].strip(),
+                'semestre': _entero_o_none(meta.get('semestre')),
+                'creditos': _entero_o_none(meta.get('creditos')),
+                'tipologia': meta.get('tipologia', ''),
+                'tipologia_tipo': meta.get('tipologia_tipo', 'OTRO'),
+                'tipologia_categoria': meta.get('tipologia_categoria', 'OTRO'),
+                'prerequisitos': meta.get('prerequisitos', 'Ninguno'),
+            }
+    else:
+        logger.warning(f"⚠️ JSON no encontrado para el índice: {json_path}")
+
+    if Path(pdf_path).exists():
+        _, metadatas = procesar_pdf_materias(pdf_path)
+        for meta in metadatas:
+            codigo = codigo_base(meta['codigo'])
+            if codigo in base:
+                alternativos.setdefault(codigo, []).append(meta['nombre'].strip())
+            else:
+                # Materia que solo aparece en el PDF: se indexa con los campos disponibles
+                base[codigo] = {
+                    'codigo': codigo,
+                    'nombre': meta['nombre'].strip(),
+                    'semestre': _entero_o_none(meta.get('semestre')),
+                    'creditos': None,
+                    'tipologia': '',
+                    'tipologia_tipo': 'OTRO',
+                    'tipologia_categoria': 'OTRO',
+                }
+
+    if Path(csv_path).exists():
+        _, metadatas = procesar_csv_horarios(csv_path)
+        for meta in metadatas:
+            codigo = codigo_base(meta['codigo'])
+            grupos.setdefault(codigo, []).append(Grupo(
+                grupo=meta.get('grupo', ''),
+                profesores=meta.get('profesores', ''),
+                horarios=meta.get('horarios', ''),
+                salones=meta.get('salones', ''),
+            ))
+            if codigo in base:
+                alternativos.setdefault(codigo, []).append(meta['nombre'].strip())
+
+    materias = [
+        Materia(
+            **campos,
+            grupos=tuple(grupos.get(codigo, ())),
+            nombres_alternativos=tuple(dict.fromkeys(alternativos.get(codigo, ()))),
+        )
+        for codigo, campos in base.items()
+    ]
+    return IndiceCurricular.desde_materias(materias, version_documentos(json_path, pdf_path, csv_path))
+
+
+# Índice global (se construye una vez por proceso y se reconstruye si cambian los documentos)
+_indice_cache: Optional[IndiceCurricular] = None
+_firma_cache: Optional[Tuple] = None
+_ultima_revision = 0.0
+_lock = threading.Lock()
+_lock_recarga = threading.Lock()
+
+
+def obtener_indice() -> IndiceCurricular:
+    """Devuelve el índice curricular (con caché)"""
+    global _indice_cache, _firma_cache
+
+    if _indice_cache is None:
+        with _lock:
+            if _indice_cache is None:
+                # La firma se toma antes de leer: un cambio durante la construcción se detecta después
+                _firma_cache = firma_documentos(JSON_PATH, PDF_PATH, CSV_PATH)
+                _indice_cache = construir_indice()
+                logger.info(f"🗂️ Índice curricular cargado: {len(_indice_cache)} materias")
+
+    return _indice_cache
+
+
+async def obtener_indice_async() -> IndiceCurricular:
+    """
+    Igual que obtener_indice, para el event loop: si el índice todavía no existe (la primera
+    petición llega antes de que termine el calentamiento), se construye en un hilo y las
+    demás peticiones del worker siguen atendiéndose mientras tanto.
+    Si los documentos fuente cambiaron, lanza la reconstrucción en un hilo y devuelve el
+    índice actual hasta que el nuevo esté listo.
+    """
+    if _indice_cache is None:
+        return await asyncio.to_thread(obtener_indice)
+    if _documentos_cambiaron():
+        asyncio.get_running_loop().run_in_executor(None, _recargar_en_segundo_plano)
+    return _indice_cache
+
+
+def _documentos_cambiaron() -> bool:
+    """Si los documentos cambiaron desde la última construcción (revisa cada pocos segundos)"""
+    global _ultima_revision
+    ahora = time.monotonic()
+    if ahora - _ultima_revision < _SEGUNDOS_ENTRE_REVISIONES or _lock_recarga.locked():
+        return False
+    _ultima_revision = ahora
+    return firma_documentos(JSON_PATH, PDF_PATH, CSV_PATH) != _firma_cache
+
+
+def _recargar_en_segundo_plano():
+    try:
+        recargar_indice()
+    except Exception as e:
+        # Documentos a medio copiar o inválidos: se sigue con el índice anterior y se
+        # reintenta en la próxima revisión
+        logger.error(f"❌ No se pudo recargar el índice curricular: {type(e).__name__}: {e}")
+
+
+def recargar_indice() -> IndiceCurricular:
+    """Reconstruye el índice (por ejemplo, después de actualizar los documentos)"""
+    global _indice_cache, _firma_cache
+    with _lock_recarga:
+        firma = firma_documentos(JSON_PATH, PDF_PATH, CSV_PATH)
+        nuevo = construir_indice()
+        with _lock:
+            _indice_cache, _firma_cache = nuevo, firma
+    logger.info(f"🔄 Índice curricular recargado: {len(nuevo)} materias (versión {nuevo.version})")
+    return nuevo
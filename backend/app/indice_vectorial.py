@@ -0,0 +1,388 @@
+"""
+Índice vectorial en NumPy (alternativa a Chroma para la búsqueda)
+
+El corpus es de unos cientos de vectores: una búsqueda exhaustiva con un producto
+matriz-vector es más rápida que la consulta a Chroma/SQLite y no necesita cargar su stack
+en cada proceso.
+
+Formato en disco (un directorio, por defecto data/vectorstore/numpy):
+- vectores-<gen>.npy  matriz contigua (documentos x dimensión) en float32, float16 o int8
+- escalas-<gen>.npy   escala float32 de cada fila (solo int8: vector ≈ fila * escala)
+- documentos.json     ids, textos y metadata de cada fila, en el mismo orden, el formato y
+                      los nombres de los archivos .npy de esa generación
+
+Cada exportación escribe sus .npy con nombres nuevos y publica todo junto al reemplazar
+documentos.json (os.replace, atómico): un lector que abre el índice durante una exportación
+ve la generación anterior completa o la nueva completa, nunca vectores de una con documentos
+de la otra. Se conservan los archivos de la generación anterior para los lectores que ya
+leyeron su documentos.json; los más viejos se borran.
+
+Representación compacta (opcional, al exportar): los embeddings text-embedding-3 admiten
+menos dimensiones tomando las primeras y volviendo a normalizar (es lo que hace el
+parámetro `dimensions` de la API), así que el índice puede guardar 256 o 512 dimensiones a
+partir de los vectores completos de Chroma, sin volver a calcular embeddings. La consulta
+se recorta igual. Además la matriz se puede cuantizar a float16 o a int8 con una escala por
+vector; las distancias se calculan sobre la forma compacta, por bloques de filas.
+
+Lo escribe cargar_chroma.py después de cada carga (exportar_desde_chroma). La app abre la
+matriz con np.load(mmap_mode='r'): todos los workers de uvicorn comparten las mismas páginas
+a través de la caché del sistema operativo. La distancia es L2 al cuadrado (la misma que
+usa Chroma por defecto) y los filtros `where` se evalúan como máscaras booleanas sobre
+columnas de metadata codificadas como enteros.
+
+Configuración por variables de entorno:
+    MOTOR_VECTORIAL       chroma (por defecto) o numpy
+    VECTORES_NUMPY_PATH   Directorio del índice exportado (data/vectorstore/numpy)
+    VECTORES_DIMENSIONES  Dimensiones del índice exportado (todas las del modelo)
+    VECTORES_FORMATO      float32 (por defecto), float16 o int8
+"""
+import os
+import json
+import uuid
+import logging
+import threading
+from functools import reduce
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_DOCUMENTOS = "documentos.json"
+# Nombres de los .npy en índices exportados antes de las generaciones
+ARCHIVO_VECTORES = "vectores.npy"
+ARCHIVO_ESCALAS = "escalas.npy"
+
+FORMATOS = ("float32", "float16", "int8")
+
+# Veces que cargar() vuelve a leer documentos.json si la generación leída ya se borró
+_INTENTOS_CARGA = 5
+
+# Filas que se convierten a float32 a la vez al puntuar una matriz compacta
+# (256 x 1536 en float32 son 1.5 MB: el bloque sigue en caché durante el producto)
+_FILAS_POR_BLOQUE = 256
+
+
+def motor_vectorial() -> str:
+    return os.getenv("MOTOR_VECTORIAL", "chroma").strip().lower()
+
+
+def ruta_vectores_numpy() -> Path:
+    return Path(os.getenv("VECTORES_NUMPY_PATH", "data/vectorstore/numpy"))
+
+
+def reducir_dimensiones(vectores: np.ndarray, dimensiones: Optional[int]) -> np.ndarray:
+    """Primeras `dimensiones` columnas de cada vector, normalizadas de nuevo (norma 1)"""
+    vectores = np.asarray(vectores, dtype=np.float32)
+    if not dimensiones or dimensiones >= vectores.shape[-1]:
+        return vectores
+    recortados = vectores[..., :dimensiones]
+    normas = np.linalg.norm(recortados, axis=-1, keepdims=True)
+    return recortados / np.where(normas > 0, normas, 1)
+
+
+def cuantizar(vectores: np.ndarray, formato: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(matriz en el formato pedido, escala por fila para int8 o None)"""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de vectores desconocido: {formato} (usa {', '.join(FORMATOS)})")
+    vectores = np.asarray(vectores, dtype=np.float32)
+    if formato == "float32":
+        return np.ascontiguousarray(vectores), None
+    if formato == "float16":
+        return np.ascontiguousarray(vectores.astype(np.float16)), None
+    # int8 simétrico: el valor absoluto máximo de cada fila va a 127
+    maximos = np.abs(vectores).max(axis=1) if len(vectores) else np.zeros(0, dtype=np.float32)
+    escalas = np.where(maximos > 0, maximos / 127, 1).astype(np.float32)
+    matriz = np.clip(np.rint(vectores / escalas[:, None]), -127, 127).astype(np.int8)
+    return np.ascontiguousarray(matriz), escalas
+
+
+class IndiceVectorial:
+    """
+    Búsqueda exhaustiva top-k sobre una matriz de embeddings (en memoria o mapeada).
+    Expone la parte de la interfaz de Chroma que usa rag.py (`embeddings`, `get(where=...)`
+    y `similarity_search_by_vector*`), así puede reemplazarlo sin cambiar el flujo.
+    """
+
+    def __init__(self, vectores: np.ndarray, ids: List[str], documentos: List[str],
+                 metadatas: List[Dict[str, Any]], embeddings=None, escalas: Optional[np.ndarray] = None,
+                 recortar_consulta: bool = False, version: str = ""):
+        if not (len(vectores) == len(ids) == len(documentos) == len(metadatas)):
+            raise ValueError("El número de vectores no coincide con el de documentos")
+        if (vectores.dtype == np.int8) != (escalas is not None):
+            raise ValueError("Las matrices int8 necesitan una escala por fila (y solo ellas)")
+        self.vectores = vectores
+        self.escalas = escalas
+        self.ids = ids
+        self.documentos = documentos
+        self.metadatas = metadatas
+        self.embeddings = embeddings
+        # Índice con menos dimensiones que el modelo: la consulta se recorta y renormaliza
+        self.recortar_consulta = recortar_consulta
+        # Generación exportada (entra en las claves de las cachés de respuestas)
+        self.version = version
+        # ||x||² de cada fila: la distancia L2 se arma con un solo producto matriz-vector
+        self._normas = self._normas_filas()
+        # Columnas de metadata codificadas (campo -> (código de cada valor, código por fila))
+        self._columnas: Dict[str, Tuple[Dict[Any, int], np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def cargar(cls, directorio: Path, embeddings=None, mmap: bool = True) -> "IndiceVectorial":
+        """Abre un índice exportado; la matriz se mapea en memoria (solo lectura) por defecto"""
+        directorio = Path(directorio)
+        modo = 'r' if mmap else None
+        for intento in range(_INTENTOS_CARGA):
+            # documentos.json dice qué archivos forman la generación publicada
+            datos = json.loads((directorio / ARCHIVO_DOCUMENTOS).read_text(encoding='utf-8'))
+            try:
+                vectores = np.load(directorio / datos.get("archivo_vectores", ARCHIVO_VECTORES), mmap_mode=modo)
+                escalas = None
+                if vectores.dtype == np.int8:
+                    escalas = np.load(directorio / datos.get("archivo_escalas", ARCHIVO_ESCALAS), mmap_mode=modo)
+                break
+            except FileNotFoundError:
+                # Entre leer documentos.json y abrir los .npy se publicaron dos generaciones
+                # más y la leída ya se borró: se vuelve a leer la actual
+                if intento == _INTENTOS_CARGA - 1:
+                    raise
+        recortar = datos.get("dimensiones_modelo", vectores.shape[1]) > vectores.shape[1]
+        return cls(vectores, datos["ids"], datos["documentos"], datos["metadatas"], embeddings,
+                   escalas, recortar, datos.get("generacion", ""))
+
+    @property
+    def dimension(self) -> int:
+        return self.vectores.shape[1]
+
+    @property
+    def formato(self) -> str:
+        return str(self.vectores.dtype)
+
+    @property
+    def bytes_vectores(self) -> int:
+        """Memoria de la matriz (y de las escalas) tal como está en disco / en la caché de páginas"""
+        return self.vectores.nbytes + (self.escalas.nbytes if self.escalas is not None else 0)
+
+    def _bloques(self, filas: Optional[np.ndarray]):
+        """(posición en la salida, filas en float32) por bloques, sin convertir toda la matriz"""
+        total = len(self.vectores) if filas is None else len(filas)
+        for inicio in range(0, total, _FILAS_POR_BLOQUE):
+            indices = slice(inicio, inicio + _FILAS_POR_BLOQUE)
+            bloque = self.vectores[indices] if filas is None else self.vectores[filas[indices]]
+            yield indices, bloque.astype(np.float32)
+
+    def _normas_filas(self) -> np.ndarray:
+        if self.vectores.dtype == np.float32:
+            return np.einsum('ij,ij->i', self.vectores, self.vectores, dtype=np.float32)
+        normas = np.empty(len(self.vectores), dtype=np.float32)
+        for indices, bloque in self._bloques(None):
+            normas[indices] = np.einsum('ij,ij->i', bloque, bloque)
+        if self.escalas is not None:
+            normas *= np.square(self.escalas)
+        return normas
+
+    def _productos(self, consulta: np.ndarray, filas: Optional[np.ndarray]) -> np.ndarray:
+        """x·q de cada fila (o de `filas`), sobre la forma compacta"""
+        if self.vectores.dtype == np.float32:
+            return (self.vectores if filas is None else self.vectores[filas]) @ consulta
+        productos = np.empty(len(self.vectores) if filas is None else len(filas), dtype=np.float32)
+        for indices, bloque in self._bloques(filas):
+            productos[indices] = bloque @ consulta
+        if self.escalas is not None:
+            productos *= self.escalas if filas is None else self.escalas[filas]
+        return productos
+
+    def _preparar_consulta(self, embedding: Sequence[float]) -> np.ndarray:
+        consulta = np.asarray(embedding, dtype=np.float32)
+        if self.recortar_consulta and consulta.ndim == 1 and consulta.shape[0] > self.dimension:
+            consulta = reducir_dimensiones(consulta, self.dimension)
+        if consulta.shape != (self.dimension,):
+            raise ValueError(f"La consulta tiene dimensión {consulta.shape}, el índice {self.dimension}")
+        return consulta
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _columna(self, campo: str) -> Tuple[Dict[Any, int], np.ndarray]:
+        columna = self._columnas.get(campo)
+        if columna is None:
+            with self._lock:
+                columna = self._columnas.get(campo)
+                if columna is None:
+                    valores: Dict[Any, int] = {}
+                    codigos = np.fromiter(
+                        (valores.setdefault(meta.get(campo), len(valores)) for meta in self.metadatas),
+                        dtype=np.int32, count=len(self.metadatas)
+                    )
+                    columna = self._columnas[campo] = (valores, codigos)
+        return columna
+
+    def _mascara_campo(self, campo: str, condicion: Any) -> np.ndarray:
+        valores, codigos = self._columna(campo)
+        if not isinstance(condicion, dict):
+            condicion = {"$eq": condicion}
+        (operador, valor), = condicion.items()
+        if operador in ("$eq", "$ne"):
+            codigo = valores.get(valor, -1)
+            return codigos == codigo if operador == "$eq" else codigos != codigo
+        if operador in ("$in", "$nin"):
+            mascara = np.isin(codigos, [valores[v] for v in valor if v in valores])
+            return mascara if operador == "$in" else ~mascara
+        raise ValueError(f"Operador no soportado en el filtro: {operador}")
+
+    def mascara(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Filas que cumplen el filtro (sintaxis `where` de Chroma: $and, $or, $eq, $ne, $in, $nin)"""
+        if not where:
+            return np.ones(len(self), dtype=bool)
+        partes = []
+        for clave, condicion in where.items():
+            if clave == "$and":
+                partes.append(reduce(np.logical_and, (self.mascara(c) for c in condicion)))
+            elif clave == "$or":
+                partes.append(reduce(np.logical_or, (self.mascara(c) for c in condicion)))
+            else:
+                partes.append(self._mascara_campo(clave, condicion))
+        return reduce(np.logical_and, partes)
+
+    def buscar(self, embedding: Sequence[float], k: int,
+               where: Optional[Dict[str, Any]] = None) -> List[Tuple[int, float]]:
+        """(fila, distancia L2²) de los k vectores más cercanos que cumplen el filtro"""
+        if len(self) == 0:
+            return []
+        consulta = self._preparar_consulta(embedding)
+
+        if where:
+            filas = np.flatnonzero(self.mascara(where))
+            distancias = self._normas[filas] - 2 * self._productos(consulta, filas)
+        else:
+            filas = None
+            distancias = self._normas - 2 * self._productos(consulta, None)
+
+        k = min(k, len(distancias))
+        if k <= 0:
+            return []
+        mejores = np.argpartition(distancias, k - 1)[:k] if k < len(distancias) else np.arange(len(distancias))
+        mejores = mejores[np.argsort(distancias[mejores], kind='stable')]
+        norma_consulta = float(consulta @ consulta)
+        return [
+            (int(filas[i]) if filas is not None else int(i), max(0.0, float(distancias[i]) + norma_consulta))
+            for i in mejores
+        ]
+
+    # Interfaz compatible con Chroma (la parte que usa rag.py)
+    def get(self, where: Optional[Dict[str, Any]] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        filas = np.flatnonzero(self.mascara(where)) if where else range(len(self))
+        include = ["documents", "metadatas"] if include is None else include
+        return {
+            "ids": [self.ids[i] for i in filas],
+            "documents": [self.documentos[i] for i in filas] if "documents" in include else None,
+            "metadatas": [self.metadatas[i] for i in filas] if "metadatas" in include else None,
+        }
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding: Sequence[float], k: int = 4,
+                                                          filter: Optional[Dict[str, Any]] = None, **kwargs):
+        from langchain_core.documents import Document
+        return [
+            (Document(page_content=self.documentos[fila], metadata=self.metadatas[fila]), distancia)
+            for fila, distancia in self.buscar(embedding, k, filter)
+        ]
+
+    def similarity_search_by_vector(self, embedding: Sequence[float], k: int = 4,
+                                    filter: Optional[Dict[str, Any]] = None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_relevance_scores(embedding, k, filter)]
+
+
+def _reemplazar(ruta: Path, escribir):
+    """Escribe en un temporal y lo mueve encima (nadie ve el archivo a medio escribir)"""
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+
+def _guardar_npy(matriz: np.ndarray):
+    def escribir(ruta: Path):
+        with open(ruta, 'wb') as f:
+            np.save(f, matriz)
+    return escribir
+
+
+def exportar(directorio: Path, vectores: np.ndarray, ids: List[str], documentos: List[str],
+             metadatas: List[Dict[str, Any]], dimensiones: Optional[int] = None,
+             formato: str = "float32") -> Path:
+    """
+    Escribe una generación nueva del índice en `directorio`: matriz contigua (con
+    `dimensiones` columnas y en `formato`), escalas si es int8 y la tabla de documentos,
+    que se reemplaza al final y publica la generación completa
+    """
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    completos = np.asarray(vectores, dtype=np.float32)
+    if completos.ndim != 2:
+        completos = completos.reshape(len(ids), -1)
+    matriz, escalas = cuantizar(reducir_dimensiones(completos, dimensiones), formato)
+
+    generacion = uuid.uuid4().hex[:12]
+    archivos = {"archivo_vectores": f"vectores-{generacion}.npy"}
+    if escalas is not None:
+        archivos["archivo_escalas"] = f"escalas-{generacion}.npy"
+
+    def escribir_documentos(ruta: Path):
+        ruta.write_text(json.dumps({
+            "formato": formato,
+            "dimensiones": matriz.shape[1],
+            "dimensiones_modelo": completos.shape[1],
+            "generacion": generacion,
+            **archivos,
+            "ids": ids, "documentos": documentos, "metadatas": metadatas,
+        }, ensure_ascii=False), encoding='utf-8')
+
+    anteriores = _archivos_publicados(directorio)
+    _reemplazar(directorio / archivos["archivo_vectores"], _guardar_npy(matriz))
+    if escalas is not None:
+        _reemplazar(directorio / archivos["archivo_escalas"], _guardar_npy(escalas))
+    _reemplazar(directorio / ARCHIVO_DOCUMENTOS, escribir_documentos)
+    _borrar_generaciones(directorio, conservar=anteriores | set(archivos.values()))
+    return directorio
+
+
+def _archivos_publicados(directorio: Path) -> set:
+    """Archivos .npy de la generación que publica ahora documentos.json (vacío si no hay)"""
+    try:
+        datos = json.loads((directorio / ARCHIVO_DOCUMENTOS).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return set()
+    return {datos.get("archivo_vectores", ARCHIVO_VECTORES), datos.get("archivo_escalas", ARCHIVO_ESCALAS)}
+
+
+def _borrar_generaciones(directorio: Path, conservar: set):
+    """Borra los .npy de generaciones viejas (los workers que los mapearon siguen leyéndolos)"""
+    for ruta in directorio.glob("*.npy"):
+        if ruta.name not in conservar:
+            try:
+                ruta.unlink()
+            except OSError as e:
+                # En Windows un archivo mapeado no se puede borrar: queda para la próxima exportación
+                logger.warning(f"⚠️ No se pudo borrar {ruta}: {e}")
+
+
+def exportar_desde_chroma(vectorstore, directorio: Optional[Path] = None,
+                          dimensiones: Optional[int] = None, formato: Optional[str] = None) -> int:
+    """
+    Exporta todos los documentos y embeddings del vectorstore de Chroma; retorna cuántos.
+    Dimensiones y formato por defecto: VECTORES_DIMENSIONES y VECTORES_FORMATO.
+    """
+    dimensiones = dimensiones or int(os.getenv("VECTORES_DIMENSIONES", "0")) or None
+    formato = formato or os.getenv("VECTORES_FORMATO", "float32").strip().lower()
+    datos = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+    ids = list(datos["ids"])
+    exportar(
+        directorio or ruta_vectores_numpy(),
+        np.asarray(datos["embeddings"] if ids else np.zeros((0, 0)), dtype=np.float32),
+        ids,
+        list(datos["documents"]),
+        [meta or {} for meta in datos["metadatas"]],
+        dimensiones,
+        formato,
+    )
+    return len(ids)
@@ -0,0 +1,343 @@
+"""
+Clasificador de intención de las preguntas
+Todas las listas de palabras clave (identidad, saludos, palabras académicas, cantidad,
+tipología, semestre, consultas específicas, listados...) se compilan en una sola expresión
+regular con forma de trie que no distingue tildes (cada vocal acepta sus variantes). Una pasada por la
+pregunta produce todas las palabras clave presentes y de ahí sale una IntencionConsulta
+inmutable (ruta, filtros, semestre, nombre de materia, k) que se reutiliza en todo el flujo
+de rag.py en lugar de volver a recorrer las listas en cada paso.
+
+Las palabras clave se comparan como subcadenas, igual que las comprobaciones `in` que
+reemplaza; al quitar las tildes, "que materias" y "qué materias" cuentan igual.
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Texto de semestre -> número (el orden define la prioridad si aparecen varios)
+SEMESTRES_TEXTO = {
+    "primer": 1, "primero": 1, "1er": 1, "1ro": 1,
+    "segundo": 2, "segunda": 2, "2do": 2, "2da": 2,
+    "tercer": 3, "tercero": 3, "3er": 3, "3ro": 3,
+    "cuarto": 4, "4to": 4,
+    "quinto": 5, "5to": 5,
+    "sexto": 6, "6to": 6,
+    "séptimo": 7, "septimo": 7, "7mo": 7,
+    "octavo": 8, "8vo": 8,
+    "noveno": 9, "9no": 9,
+    "décimo": 10, "decimo": 10, "10mo": 10
+}
+
+# Etiqueta -> palabras clave (cada lista es la que usaban las funciones de rag.py)
+PALABRAS_CLAVE: Dict[str, Tuple[str, ...]] = {
+    "identidad": (
+        "quién eres", "quien eres", "quien sos", "quién sos",
+        "qué eres", "que eres", "que sos", "qué sos",
+        "cuál es tu nombre", "cual es tu nombre",
+        "de dónde eres", "de donde eres",
+        "de qué universidad", "de que universidad",
+        "qué universidad", "que universidad",
+        "de qué sede", "de que sede",
+        "qué sede", "que sede",
+        "presentate", "preséntate",
+        "dime quién eres", "dime quien eres"
+    ),
+    "saludo": (
+        "hola", "hi", "hello", "buenos días", "buenas tardes", "buenas noches",
+        "buen día", "qué tal", "que tal", "cómo estás", "como estas"
+    ),
+    "academica": (
+        "materia", "materias", "curso", "cursos", "asignatura", "asignaturas",
+        "semestre", "semestres", "carrera", "malla", "curricular", "curriculum",
+        "prerequisito", "prerequisitos", "requisito", "requisitos", "crédito", "créditos",
+        "credito", "creditos", "tipología", "tipologia", "obligatoria", "optativa",
+        "disciplinar", "fundamental", "código", "codigo"
+    ),
+    # Preguntas sobre un dato de una materia: no son consultas de cantidad
+    "no_cantidad": (
+        "créditos tiene", "creditos tiene", "créditos de", "creditos de",
+        "código de", "codigo de", "código tiene", "codigo tiene",
+        "semestre de", "semestre tiene", "tipología de", "tipologia de",
+        "prerequisito de", "prerequisitos de"
+    ),
+    "cantidad": (
+        "cuántas", "cuantas", "cuántos", "cuantos",
+        "cuántas materias", "cuantas materias", "cuántos cursos", "cuantos cursos",
+        "cuántas asignaturas", "cuantas asignaturas", "total de materias"
+    ),
+    "obligatoria": ("obligatoria", "obligatorias", "obligatorio", "obligatorios"),
+    "optativa": ("optativa", "optativas", "optativo", "optativos", "electiva", "electivas"),
+    "fundamental": ("fundamental", "fundamentales", "fund.", "fundamentación"),
+    "disciplinar": ("disciplinar", "disciplinares", "disciplina"),
+    "lengua_extranjera": ("lengua extranjera", "lengua", "idioma"),
+    "trabajo_de_grado": ("trabajo de grado", "trabajo grado"),
+    "medida_creditos": ("crédito", "créditos", "credito", "creditos"),
+    "desglose_semestre": ("por semestre", "cada semestre", "en cada semestre"),
+    "especifica": (
+        "código", "codigo",
+        "cuántos créditos", "cuantos creditos", "cuántos creditos", "cuantos creditos",
+        "qué créditos", "que creditos", "qué creditos", "que creditos",
+        "créditos tiene", "creditos tiene", "créditos de", "creditos de",
+        "semestre de", "semestre tiene",
+        "tipología de", "tipologia de", "tipología tiene", "tipologia tiene",
+        "prerequisito de", "prerequisitos de", "prerequisito tiene", "prerequisitos tiene"
+    ),
+    "listado": (
+        "qué materias", "que materias", "cuáles materias", "cuales materias",
+        "cuáles son las materias", "cuales son las materias", "cuáles son", "cuales son",
+        "lista", "listar", "materias del", "materias de", "materias en",
+        "materias que hay", "materias que tiene", "materias que son"
+    ),
+    # Qué dato de la materia se pide (en orden de prioridad, ver CAMPOS)
+    "campo_codigo": ("código", "codigo"),
+    "campo_creditos": ("créditos", "creditos"),
+    "campo_semestre": ("semestre",),
+    "campo_tipologia": ("tipología", "tipologia"),
+    "campo_prerequisitos": ("prerequisito",),
+}
+
+# Campo de la materia por etiqueta, en orden de prioridad
+CAMPOS = (
+    ("campo_codigo", "codigo"),
+    ("campo_creditos", "creditos"),
+    ("campo_semestre", "semestre"),
+    ("campo_tipologia", "tipologia"),
+    ("campo_prerequisitos", "prerequisitos"),
+)
+
+# Patrones para extraer el nombre de la materia: "código de X", "créditos tiene X", etc.
+_PATRONES_NOMBRE = tuple(re.compile(patron, re.IGNORECASE) for patron in (
+    r'(?:código|codigo|créditos|creditos|semestre|tipología|tipologia|prerequisito|prerequisitos)\s+(?:de|del|de la|del la)\s+(.+?)(?:\?|$|\.)',
+    r'(?:cuál|cuál es|que|qué es)\s+(?:el|la)\s+(?:código|codigo|créditos|creditos)\s+(?:de|del|de la)\s+(.+?)(?:\?|$|\.)',
+    r'(?:cuántos|cuantos|cuántas|cuantas)\s+(?:créditos|creditos)\s+(?:tiene|tienen)\s+(?:la\s+)?(?:materia|asignatura|curso)?\s*(.+?)(?:\?|$|\.)',
+    r'(?:créditos|creditos)\s+(?:tiene|tienen)\s+(?:la\s+)?(?:materia|asignatura|curso)?\s*(.+?)(?:\?|$|\.)',
+))
+_SUFIJO_NOMBRE = re.compile(r'\s+(materia|asignatura|curso)$', re.IGNORECASE)
+_SEMESTRE_NUMERO = re.compile(r'semestre\s+(\d+)')
+
+# Letras sin tilde -> variantes que se aceptan en la pregunta
+_VARIANTES = {"a": "aáàâä", "e": "eéèêë", "i": "iíìîï", "o": "oóòôö", "u": "uúùûü", "n": "nñ"}
+_SIN_TILDES = str.maketrans({
+    variante: letra for letra, variantes in _VARIANTES.items() for variante in variantes[1:]
+})
+
+
+def plegar(texto: str) -> str:
+    """Minúsculas y sin tildes (forma de las palabras clave compiladas)"""
+    return texto.lower().translate(_SIN_TILDES)
+
+
+def _regex_trie(palabras: Iterable[str]) -> str:
+    """
+    Alternativa de todas las palabras en forma de trie (prefijos comunes factorizados).
+    Los opcionales son codiciosos, así que en cada posición coincide la palabra más larga.
+    Cada vocal acepta sus variantes con tilde: la pregunta solo se pasa a minúsculas.
+    """
+    trie: Dict[str, Any] = {}
+    for palabra in palabras:
+        nodo = trie
+        for caracter in palabra:
+            nodo = nodo.setdefault(caracter, {})
+        nodo[""] = {}
+
+    def construir(nodo: Dict[str, Any]) -> str:
+        ramas = [
+            (f"[{_VARIANTES[c]}]" if c in _VARIANTES else re.escape(c)) + construir(hijo)
+            for c, hijo in sorted(nodo.items()) if c
+        ]
+        if not ramas:
+            return ""
+        cuerpo = ramas[0] if len(ramas) == 1 else "(?:" + "|".join(ramas) + ")"
+        return f"(?:{cuerpo})?" if "" in nodo else cuerpo
+
+    return construir(trie)
+
+
+def _compilar():
+    """
+    Expresión única y tabla palabra -> etiquetas.
+    Todas las palabras que empiezan en una misma posición son prefijos de la más larga,
+    así que las etiquetas de cada palabra incluyen las de sus prefijos: la búsqueda solo
+    necesita la coincidencia más larga en cada posición.
+    """
+    etiquetas: Dict[str, set] = {}
+    for etiqueta, palabras in PALABRAS_CLAVE.items():
+        for palabra in palabras:
+            etiquetas.setdefault(plegar(palabra), set()).add(etiqueta)
+    for prioridad, (palabra, numero) in enumerate(SEMESTRES_TEXTO.items()):
+        etiquetas.setdefault(plegar(palabra), set()).add(("semestre", prioridad, numero))
+
+    con_prefijos = {
+        palabra: frozenset().union(*(
+            etiquetas[palabra[:i]] for i in range(1, len(palabra) + 1) if palabra[:i] in etiquetas
+        ))
+        for palabra in etiquetas
+    }
+    # Lookahead: encuentra también palabras que se solapan con la anterior
+    regex = re.compile(f"(?=({_regex_trie(etiquetas)}))")
+    return regex, con_prefijos
+
+
+_REGEX_PALABRAS, _ETIQUETAS = _compilar()
+
+
+def etiquetas_presentes(query: str) -> FrozenSet[Any]:
+    """Etiquetas de todas las palabras clave que aparecen en el texto en minúsculas (una pasada)"""
+    encontradas: set = set()
+    for coincidencia in _REGEX_PALABRAS.finditer(query):
+        palabra = coincidencia.group(1)
+        etiquetas = _ETIQUETAS.get(palabra)
+        encontradas |= etiquetas if etiquetas is not None else _ETIQUETAS[plegar(palabra)]
+    return frozenset(encontradas)
+
+
+def _semestre(etiquetas: FrozenSet[Any], query: str) -> Optional[int]:
+    candidatos = [etiqueta for etiqueta in etiquetas if isinstance(etiqueta, tuple)]
+    if candidatos:
+        return min(candidatos)[2]
+    match = _SEMESTRE_NUMERO.search(query)
+    return int(match.group(1)) if match else None
+
+
+def extraer_nombre_materia_de_pregunta(pregunta: str) -> Optional[str]:
+    """
+    Intenta extraer el nombre de una materia de la pregunta.
+    Busca patrones como "código de X", "créditos de X", "créditos tiene X", etc.
+    """
+    for patron in _PATRONES_NOMBRE:
+        match = patron.search(pregunta)
+        if match:
+            nombre = match.group(1).strip()
+            # Limpiar el nombre (quitar palabras comunes al final)
+            nombre = _SUFIJO_NOMBRE.sub('', nombre)
+            if len(nombre) > 3:  # Asegurar que tiene sentido
+                return nombre
+    return None
+
+
+@dataclass(frozen=True)
+class IntencionConsulta:
+    """
+    Intención de una pregunta. `ruta` es el primer camino que prueba el flujo:
+        saludo      identidad, saludo o sin palabras académicas (LLM sin contexto)
+        cantidad    cuántas materias/créditos (tabla de agregados)
+        especifica  un dato de una materia (código, créditos, semestre...)
+        listado     materias de un semestre o tipología
+        general     búsqueda semántica + LLM
+    """
+    pregunta: str
+    ruta: str
+    es_identidad: bool
+    es_academica: bool
+    es_cantidad: bool
+    es_especifica: bool
+    es_listado: bool
+    semestre: Optional[int]
+    tipo: Optional[str]
+    categoria: Optional[str]
+    medida: Optional[str]
+    desglose: Optional[str]
+    campo: Optional[str]
+    nombre_materia: Optional[str]
+    k: int
+
+    @property
+    def filtro_metadata(self) -> Optional[Dict[str, Any]]:
+        """Filtro `where` de Chroma (semestre y tipología); dict nuevo en cada llamada"""
+        condiciones: List[Dict[str, str]] = []
+        if self.tipo:
+            condiciones.append({"tipologia_tipo": self.tipo})
+        if self.categoria in ("FUNDAMENTAL", "DISCIPLINAR"):
+            condiciones.append({"tipologia_categoria": self.categoria})
+        if self.semestre is not None:
+            condiciones.append({"semestre": str(self.semestre)})
+
+        if len(condiciones) == 0:
+            return None
+        elif len(condiciones) == 1:
+            return condiciones[0]
+        else:
+            return {"$and": condiciones}
+
+    @property
+    def filtros_cantidad(self) -> Optional[Dict[str, Any]]:
+        """Filtros de responder_cantidad_materias (None si no es consulta de cantidad)"""
+        if not self.es_cantidad:
+            return None
+        filtros: Dict[str, Any] = {}
+        if self.tipo:
+            filtros['tipo'] = self.tipo
+        if self.categoria:
+            filtros['categoria'] = self.categoria
+        if self.semestre is not None:
+            filtros['semestre'] = self.semestre
+        if self.medida:
+            filtros['medida'] = self.medida
+        if self.desglose:
+            filtros['desglose'] = self.desglose
+        return filtros
+
+
+def clasificar_pregunta(pregunta: str) -> IntencionConsulta:
+    """Clasifica la pregunta con una sola pasada de la expresión compilada"""
+    query = pregunta.lower().strip()
+    etiquetas = etiquetas_presentes(query)
+
+    es_identidad = "identidad" in etiquetas
+    es_saludo = "saludo" in etiquetas and len(query) < 20
+    es_academica = not es_identidad and not es_saludo and "academica" in etiquetas
+    es_cantidad = "cantidad" in etiquetas and "no_cantidad" not in etiquetas
+    es_especifica = "especifica" in etiquetas
+    es_listado = "listado" in etiquetas
+
+    if "obligatoria" in etiquetas:
+        tipo = "OBLIGATORIA"
+    elif "optativa" in etiquetas:
+        tipo = "OPTATIVA"
+    else:
+        tipo = None
+
+    if "fundamental" in etiquetas:
+        categoria = "FUNDAMENTAL"
+    elif "disciplinar" in etiquetas:
+        categoria = "DISCIPLINAR"
+    elif "lengua_extranjera" in etiquetas:
+        # Solo para cantidad: estas categorías no van en el filtro de metadata
+        categoria = "LENGUA EXTRANJERA"
+    elif "trabajo_de_grado" in etiquetas:
+        categoria = "TRABAJO DE GRADO"
+    else:
+        categoria = None
+
+    campo = next((nombre for etiqueta, nombre in CAMPOS if etiqueta in etiquetas), None)
+    nombre_materia = extraer_nombre_materia_de_pregunta(pregunta) if es_especifica else None
+
+    if not es_academica:
+        ruta = "saludo"
+    elif es_cantidad:
+        ruta = "cantidad"
+    elif es_especifica:
+        ruta = "especifica"
+    elif es_listado:
+        ruta = "listado"
+    else:
+        ruta = "general"
+
+    return IntencionConsulta(
+        pregunta=pregunta,
+        ruta=ruta,
+        es_identidad=es_identidad,
+        es_academica=es_academica,
+        es_cantidad=es_cantidad,
+        es_especifica=es_especifica,
+        es_listado=es_listado,
+        semestre=_semestre(etiquetas, query),
+        tipo=tipo,
+        categoria=categoria,
+        medida="creditos" if "medida_creditos" in etiquetas else None,
+        desglose="semestre" if "desglose_semestre" in etiquetas else None,
+        campo=campo,
+        nombre_materia=nombre_materia,
+        # Consultas específicas: 2 documentos si se sabe la materia, 3 si no; generales: 10
+        k=(2 if nombre_materia else 3) if es_especifica else 10,
+    )
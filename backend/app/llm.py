@@ -0,0 +1,182 @@
+"""
+Clientes de OpenAI compartidos por todo el proceso
+Un cliente síncrono y uno asíncrono, creados al arrancar la app, con pool de conexiones
+HTTP keep-alive: cada pregunta reutiliza conexiones TLS ya abiertas en lugar de crear un
+cliente nuevo (y un handshake nuevo) por request.
+
+Configuración por variables de entorno:
+    OPENAI_MAX_CONEXIONES      Máximo de conexiones simultáneas por cliente (100)
+    OPENAI_MAX_KEEPALIVE       Conexiones inactivas que se mantienen abiertas (20)
+    OPENAI_KEEPALIVE_SEGUNDOS  Tiempo que una conexión inactiva sigue abierta (60)
+    OPENAI_TIMEOUT             Timeout de lectura/escritura en segundos (60)
+    OPENAI_TIMEOUT_CONEXION    Timeout para abrir la conexión en segundos (5)
+    OPENAI_MAX_REINTENTOS      Reintentos del SDK ante errores transitorios (2)
+"""
+import os
+import threading
+import logging
+from typing import TYPE_CHECKING, Dict, Any, Optional
+
+# El SDK de OpenAI tarda ~0.9 s en importarse: se carga al crear el primer cliente
+if TYPE_CHECKING:
+    import openai
+
+logger = logging.getLogger(__name__)
+
+_cliente: Optional["openai.OpenAI"] = None
+_cliente_async: Optional["openai.AsyncOpenAI"] = None
+_lock = threading.Lock()
+
+# Peticiones HTTP enviadas por cada cliente (para las estadísticas del pool); el cliente
+# síncrono cuenta desde varios hilos, así que se suman bajo el lock
+_peticiones = {"sync": 0, "async": 0}
+_lock_peticiones = threading.Lock()
+
+
+def _leer_config() -> Dict[str, Any]:
+    """Lee la configuración del pool desde variables de entorno"""
+    return {
+        "max_conexiones": int(os.getenv("OPENAI_MAX_CONEXIONES", "100")),
+        "max_keepalive": int(os.getenv("OPENAI_MAX_KEEPALIVE", "20")),
+        "keepalive_segundos": float(os.getenv("OPENAI_KEEPALIVE_SEGUNDOS", "60")),
+        "timeout": float(os.getenv("OPENAI_TIMEOUT", "60")),
+        "timeout_conexion": float(os.getenv("OPENAI_TIMEOUT_CONEXION", "5")),
+        "max_reintentos": int(os.getenv("OPENAI_MAX_REINTENTOS", "2")),
+    }
+
+
+def _limites_y_timeout(config: Dict[str, Any]):
+    import openai
+    # Limits del mismo paquete HTTP que usa internamente el SDK de OpenAI
+    limites = type(openai.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=config["max_conexiones"],
+        max_keepalive_connections=config["max_keepalive"],
+        keepalive_expiry=config["keepalive_segundos"],
+    )
+    timeout = openai.Timeout(config["timeout"], connect=config["timeout_conexion"])
+    return limites, timeout
+
+
+def _contar(cliente: str):
+    with _lock_peticiones:
+        _peticiones[cliente] += 1
+
+
+def _contar_sync(request):
+    _contar("sync")
+
+
+async def _contar_async(request):
+    _contar("async")
+
+
+def _crear_cliente() -> "openai.OpenAI":
+    import openai
+    config = _leer_config()
+    limites, timeout = _limites_y_timeout(config)
+    http_client = openai.DefaultHttpxClient(
+        limits=limites,
+        timeout=timeout,
+        event_hooks={"request": [_contar_sync]},
+    )
+    return openai.OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        timeout=timeout,
+        max_retries=config["max_reintentos"],
+        http_client=http_client,
+    )
+
+
+def _crear_cliente_async() -> "openai.AsyncOpenAI":
+    import openai
+    config = _leer_config()
+    limites, timeout = _limites_y_timeout(config)
+    http_client = openai.DefaultAsyncHttpxClient(
+        limits=limites,
+        timeout=timeout,
+        event_hooks={"request": [_contar_async]},
+    )
+    return openai.AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        timeout=timeout,
+        max_retries=config["max_reintentos"],
+        http_client=http_client,
+    )
+
+
+def iniciar_clientes():
+    """Crea los clientes compartidos (se llama al arrancar la app)"""
+    obtener_cliente()
+    obtener_cliente_async()
+    logger.info(f"🔌 Clientes de OpenAI listos con pool de conexiones: {_leer_config()}")
+
+
+def obtener_cliente() -> "openai.OpenAI":
+    """Cliente síncrono compartido (se crea la primera vez si la app no lo inició)"""
+    global _cliente
+    if _cliente is None:
+        with _lock:
+            if _cliente is None:
+                _cliente = _crear_cliente()
+    return _cliente
+
+
+def obtener_cliente_async() -> "openai.AsyncOpenAI":
+    """Cliente asíncrono compartido (se crea la primera vez si la app no lo inició)"""
+    global _cliente_async
+    if _cliente_async is None:
+        with _lock:
+            if _cliente_async is None:
+                _cliente_async = _crear_cliente_async()
+    return _cliente_async
+
+
+async def cerrar_clientes():
+    """Cierra las conexiones abiertas (se llama al apagar la app)"""
+    global _cliente, _cliente_async
+    if _cliente is not None:
+        _cliente.close()
+        _cliente = None
+    if _cliente_async is not None:
+        await _cliente_async.close()
+        _cliente_async = None
+
+
+def _estadisticas_pool(cliente) -> Optional[Dict[str, Any]]:
+    """
+    Conexiones abiertas/activas/inactivas del pool HTTP de un cliente. El pool vive en
+    atributos privados de openai, httpx y httpcore (cliente._client._transport._pool): si la
+    versión instalada cambia esa estructura, se reporta "no disponible" en lugar de fallar.
+    """
+    if cliente is None:
+        return None
+    transporte = getattr(getattr(cliente, "_client", None), "_transport", None)
+    conexiones = getattr(getattr(transporte, "_pool", None), "connections", None)
+    try:
+        conexiones = list(conexiones)
+        activas = sum(1 for c in conexiones if not c.is_idle() and not c.is_closed())
+        inactivas = sum(1 for c in conexiones if c.is_idle())
+    except (TypeError, AttributeError):
+        return {"conexiones": "no disponible"}
+    return {
+        "conexiones_abiertas": activas + inactivas,
+        "conexiones_activas": activas,
+        "conexiones_inactivas": inactivas,
+    }
+
+
+def estadisticas_clientes() -> Dict[str, Any]:
+    """Estadísticas de uso del pool de conexiones hacia OpenAI"""
+    sync = _estadisticas_pool(_cliente)
+    asincrono = _estadisticas_pool(_cliente_async)
+    with _lock_peticiones:
+        peticiones = dict(_peticiones)
+    if sync is not None:
+        sync["peticiones"] = peticiones["sync"]
+    if asincrono is not None:
+        asincrono["peticiones"] = peticiones["async"]
+    return {
+        "config": _leer_config(),
+        "sync": sync,
+        "async": asincrono,
+    }
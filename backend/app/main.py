@@ -1,17 +1,56 @@
 """
 Aplicación principal FastAPI
+
+Importar este módulo es barato: el SDK de OpenAI, langchain_openai y chromadb se cargan la
+primera vez que se usan (en el calentamiento del arranque o en la primera pregunta que los
+necesita), y el .env y el logging se configuran en el lifespan, no al importar.
 """
+from contextlib import asynccontextmanager, suppress
+from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
-from app.rag import responder_con_rag, responder_con_rag_stream
+from app.rag import responder_con_rag_async, responder_con_rag_stream_async, estadisticas_vectorstore
+from app.llm import cerrar_clientes, estadisticas_clientes
+from app.arranque import EstadoArranque, calentar
+from app.admision import SinCapacidad, obtener_admision
+from app.cache import obtener_cache_respuestas
+from app.cache_semantica import obtener_cache_semantica
+import asyncio
 import json
+import logging
+
+
+def configurar_proceso():
+    """Variables de entorno del .env y logging a INFO (si el servidor no configuró otro)"""
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Calienta los recursos compartidos en segundo plano al arrancar (clientes de OpenAI,
+    índice curricular, embeddings, vectorstore, cachés) y los libera al apagar.
+    /ready responde 503 hasta que el calentamiento termina.
+    """
+    configurar_proceso()
+    app.state.arranque = EstadoArranque()
+    calentamiento = asyncio.create_task(calentar(app.state.arranque))
+    yield
+    if not calentamiento.done():
+        calentamiento.cancel()
+        with suppress(asyncio.CancelledError):
+            await calentamiento
+    await cerrar_clientes()
+
 
 app = FastAPI(
     title="Asistente Académico Universitario",
     description="Chatbot universitario especializado con RAG",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Configurar CORS para permitir peticiones del frontend
@@ -38,19 +77,57 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """Health check"""
+    """Health check (el proceso está vivo; para saber si ya puede responder, usar /ready)"""
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def ready():
+    """
+    Readiness: 200 cuando terminó el calentamiento, 503 mientras carga o si algo falló.
+    Con el servidor de Chroma caído el worker sigue listo (responde desde el respaldo
+    embebido); `vectorstore.respaldo` lo indica.
+    """
+    arranque = app.state.arranque
+    return JSONResponse({**arranque.resumen(), "vectorstore": estadisticas_vectorstore()},
+                        status_code=200 if arranque.listo else 503)
+
+
+@app.get("/metricas")
+async def metricas():
+    """Métricas internas del proceso (pool hacia OpenAI, cola del LLM, cachés, vectorstore)"""
+    # cache_embeddings importa langchain_core: se carga cuando se piden las métricas
+    from app.cache_embeddings import estadisticas_embeddings
+    return {
+        "llm": estadisticas_clientes(),
+        "admision": obtener_admision().resumen(),
+        "cache_respuestas": obtener_cache_respuestas().resumen(),
+        "cache_semantica": obtener_cache_semantica().resumen(),
+        "cache_embeddings": estadisticas_embeddings(),
+        "vectorstore": estadisticas_vectorstore()
+    }
+
+
+def _respuesta_sin_capacidad(e: SinCapacidad) -> JSONResponse:
+    """503 con Retry-After cuando el LLM no tiene turno libre (ver app/admision.py)"""
+    return JSONResponse(
+        {"error": str(e), "mensaje": "El asistente está atendiendo muchas consultas, intenta de nuevo en unos segundos"},
+        status_code=503,
+        headers={"Retry-After": str(e.reintentar_en)}
+    )
+
+
 @app.post("/chat")
 async def chat(pregunta: Pregunta):
     """Endpoint para hacer preguntas usando RAG"""
     try:
-        respuesta = responder_con_rag(pregunta.pregunta)
+        respuesta = await responder_con_rag_async(pregunta.pregunta)
         return {
             "pregunta": pregunta.pregunta,
             "respuesta": respuesta
         }
+    except SinCapacidad as e:
+        return _respuesta_sin_capacidad(e)
     except Exception as e:
         return {
             "error": str(e),
@@ -61,9 +138,24 @@ async def chat(pregunta: Pregunta):
 @app.post("/chat/stream")
 async def chat_stream(pregunta: Pregunta):
     """Endpoint para hacer preguntas usando RAG con streaming (Server-Sent Events)"""
-    def generate():
+    fragmentos = responder_con_rag_stream_async(pregunta.pregunta)
+    # El primer fragmento se pide antes de responder: si el LLM no tiene turno, todavía se
+    # puede contestar 503 con Retry-After en lugar de un 200 con el error dentro del stream
+    error = None
+    try:
+        primero = await anext(fragmentos, None)
+    except SinCapacidad as e:
+        return _respuesta_sin_capacidad(e)
+    except Exception as e:
+        primero, error = None, e
+    
+    async def generate():
         try:
-            for chunk in responder_con_rag_stream(pregunta.pregunta):
+            if error is not None:
+                raise error
+            if primero is not None:
+                yield f"data: {json.dumps({'content': primero})}\n\n"
+            async for chunk in fragmentos:
                 # Formato SSE: data: {chunk}\n\n
                 yield f"data: {json.dumps({'content': chunk})}\n\n"
             # Señal de finalización
@@ -71,6 +163,10 @@ async def chat_stream(pregunta: Pregunta):
         except Exception as e:
             error_msg = json.dumps({'error': str(e), 'mensaje': 'Error procesando la pregunta'})
             yield f"data: {error_msg}\n\n"
+        finally:
+            # Si el cliente se desconecta, cierra toda la cadena de generadores (cada nivel
+            # usa aclosing): la respuesta de OpenAI se cierra y el turno se libera aquí mismo
+            await fragmentos.aclose()
     
     return StreamingResponse(
         generate(),
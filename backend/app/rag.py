@@ -2,298 +2,314 @@
 Módulo simple para RAG: búsqueda en Chroma + generación con OpenAI
 Enfoque híbrido: extracción programática para consultas estructuradas + LLM para razonamiento
 """
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import Chroma
-import openai
-import os
-import re
+import asyncio
+import json
 import logging
+import threading
+from contextlib import aclosing
 from typing import List, Dict, Optional, Tuple, Any
-from dotenv import load_dotenv
+from app.llm import obtener_cliente_async
+from app.admision import obtener_admision
+from app.indice_curricular import Materia, obtener_indice, obtener_indice_async, normalizar_texto, codigo_base
+from app.recuperacion import ResultadoBusqueda
+from app.indice_vectorial import IndiceVectorial, motor_vectorial, ruta_vectores_numpy
+from app.coleccion_chroma import ColeccionChroma
+from app.intencion import (
+    SEMESTRES_TEXTO, IntencionConsulta, clasificar_pregunta, extraer_nombre_materia_de_pregunta
+)
+from app.cache import obtener_cache_respuestas, cache_respuestas_activa, clave_pregunta
+from app.cache_semantica import obtener_cache_semantica, cache_semantica_activa
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Cargar variables de entorno
-load_dotenv()
-
 # Caché global del vectorstore para evitar recrearlo en cada llamada
 _vectorstore_cache = None
+_embeddings_cache = None
+_lock_embeddings = threading.Lock()
+_lock_vectorstore = threading.Lock()
+# Índice NumPy abierto por el proceso master de gunicorn antes del fork (ver precargar_indice_numpy)
+_indice_numpy_precargado: Optional[IndiceVectorial] = None
+
+MODELO_EMBEDDINGS = "text-embedding-3-small"
+
+
+def obtener_embeddings():
+    """
+    Modelo de embeddings compartido por el vectorstore y la caché semántica.
+    Va envuelto en la caché persistente de embeddings: una pregunta repetida no vuelve a la API.
+    langchain_openai se importa aquí (~1.5 s): las rutas que no buscan en el vectorstore no lo cargan.
+    """
+    global _embeddings_cache
+    
+    if _embeddings_cache is None:
+        with _lock_embeddings:
+            if _embeddings_cache is None:
+                from langchain_openai import OpenAIEmbeddings
+                from app.cache_embeddings import con_cache
+                _embeddings_cache = con_cache(
+                    OpenAIEmbeddings(model=MODELO_EMBEDDINGS),
+                    MODELO_EMBEDDINGS
+                )
+    
+    return _embeddings_cache
 
 
 def obtener_vectorstore():
-    """Carga el vector store de Chroma (con caché)"""
+    """
+    Carga el vector store (con caché): la colección de Chroma (con el cliente de chromadb,
+    sin el wrapper de langchain_community; embebida o en el servidor de CHROMA_HOST), o el
+    índice NumPy exportado por cargar_chroma.py si MOTOR_VECTORIAL=numpy (si no está, se usa Chroma)
+    """
     global _vectorstore_cache
     
-    if _vectorstore_cache is None:
-        embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small"
-        )
+    if _vectorstore_cache is not None:
+        return _vectorstore_cache
+    
+    # El calentamiento del arranque y la primera petición pueden llegar a la vez
+    with _lock_vectorstore:
+        if _vectorstore_cache is None and motor_vectorial() == "numpy":
+            try:
+                indice = _indice_numpy_precargado or IndiceVectorial.cargar(ruta_vectores_numpy())
+                indice.embeddings = obtener_embeddings()
+                _vectorstore_cache = indice
+                logger.info(f"🧮 Índice vectorial NumPy cargado: {len(_vectorstore_cache)} documentos "
+                            f"({_vectorstore_cache.dimension} dimensiones, {_vectorstore_cache.formato}, mapeado en memoria)")
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"⚠️ No se pudo abrir el índice NumPy en {ruta_vectores_numpy()} ({e}), usando Chroma")
         
-        _vectorstore_cache = Chroma(
-            persist_directory="data/vectorstore",
-            embedding_function=embeddings
-        )
+        if _vectorstore_cache is None:
+            _vectorstore_cache = ColeccionChroma.abrir("data/vectorstore", obtener_embeddings())
     
     return _vectorstore_cache
 
 
-def construir_filtro_metadata(pregunta: str) -> Optional[Dict[str, Any]]:
+def precargar_indice_numpy() -> Optional[IndiceVectorial]:
     """
-    Analiza la pregunta y construye filtros de metadata dinámicamente.
+    Abre el índice NumPy sin modelo de embeddings (que abre conexiones HTTP y SQLite) para
+    que el master de gunicorn lo construya antes del fork: la tabla de documentos y las
+    normas de las filas quedan compartidas copy-on-write entre los workers.
     """
-    query = pregunta.lower()
-    condiciones = []
-    
-    # Detectar tipo de tipología (OBLIGATORIA, OPTATIVA)
-    if any(palabra in query for palabra in ["obligatoria", "obligatorias", "obligatorio", "obligatorios"]):
-        condiciones.append({"tipologia_tipo": "OBLIGATORIA"})
-    elif any(palabra in query for palabra in ["optativa", "optativas", "optativo", "optativos", "electiva", "electivas"]):
-        condiciones.append({"tipologia_tipo": "OPTATIVA"})
-    
-    # Detectar categoría de tipología (FUNDAMENTAL, DISCIPLINAR)
-    if any(palabra in query for palabra in ["fundamental", "fundamentales", "fund.", "fundamentación"]):
-        condiciones.append({"tipologia_categoria": "FUNDAMENTAL"})
-    elif any(palabra in query for palabra in ["disciplinar", "disciplinares", "disciplina"]):
-        condiciones.append({"tipologia_categoria": "DISCIPLINAR"})
-    
-    # Detectar semestre
-    semestre_buscado = None
-    semestres_texto = {
-        "primer": 1, "primero": 1, "1er": 1, "1ro": 1,
-        "segundo": 2, "segunda": 2, "2do": 2, "2da": 2,
-        "tercer": 3, "tercero": 3, "3er": 3, "3ro": 3,
-        "cuarto": 4, "4to": 4,
-        "quinto": 5, "5to": 5,
-        "sexto": 6, "6to": 6,
-        "séptimo": 7, "septimo": 7, "7mo": 7,
-        "octavo": 8, "8vo": 8,
-        "noveno": 9, "9no": 9,
-        "décimo": 10, "decimo": 10, "10mo": 10
-    }
-    
-    for palabra, num in semestres_texto.items():
-        if palabra in query:
-            semestre_buscado = num
-            break
-    
-    if semestre_buscado is None:
-        match = re.search(r'semestre\s+(\d+)', query)
-        if match:
-            semestre_buscado = int(match.group(1))
-    
-    if semestre_buscado is not None:
-        condiciones.append({"semestre": str(semestre_buscado)})
-    
-    # Construir el filtro según el número de condiciones
-    if len(condiciones) == 0:
+    global _indice_numpy_precargado
+    if motor_vectorial() == "numpy" and _indice_numpy_precargado is None:
+        try:
+            _indice_numpy_precargado = IndiceVectorial.cargar(ruta_vectores_numpy())
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ No se pudo precargar el índice NumPy en {ruta_vectores_numpy()} ({e})")
+    return _indice_numpy_precargado
+
+
+def estadisticas_vectorstore() -> Optional[Dict[str, Any]]:
+    """Modo y caché de resultados del vectorstore (None si todavía no se abrió)"""
+    if _vectorstore_cache is None:
         return None
-    elif len(condiciones) == 1:
-        return condiciones[0]
-    else:
-        return {"$and": condiciones}
+    if isinstance(_vectorstore_cache, IndiceVectorial):
+        return {"modo": "numpy", "documentos": len(_vectorstore_cache)}
+    return _vectorstore_cache.resumen()
 
 
-def es_consulta_especifica_materia(pregunta: str) -> bool:
+# Las funciones de detección de intención son atajos sobre el clasificador compilado
+# (app/intencion.py); el flujo de respuesta clasifica una sola vez y pasa la IntencionConsulta
+
+def detectar_semestre(query: str) -> Optional[int]:
+    """Detecta el semestre mencionado en la pregunta"""
+    return clasificar_pregunta(query).semestre
+
+
+def construir_filtro_metadata(pregunta: str) -> Optional[Dict[str, Any]]:
     """
-    Detecta si la pregunta es sobre una materia específica (código, créditos, etc.)
+    Analiza la pregunta y construye filtros de metadata dinámicamente.
     """
-    query = pregunta.lower()
-    palabras_especificas = [
-        "código", "codigo", 
-        "cuántos créditos", "cuantos creditos", "cuántos creditos", "cuantos creditos",
-        "qué créditos", "que creditos", "qué creditos", "que creditos",
-        "créditos tiene", "creditos tiene", "créditos de", "creditos de",
-        "semestre de", "semestre tiene",
-        "tipología de", "tipologia de", "tipología tiene", "tipologia tiene",
-        "prerequisito de", "prerequisitos de", "prerequisito tiene", "prerequisitos tiene"
-    ]
-    return any(palabra in query for palabra in palabras_especificas)
+    return clasificar_pregunta(pregunta).filtro_metadata
 
 
-def extraer_nombre_materia_de_pregunta(pregunta: str) -> Optional[str]:
+def es_consulta_especifica_materia(pregunta: str) -> bool:
     """
-    Intenta extraer el nombre de una materia de la pregunta.
-    Busca patrones como "código de X", "créditos de X", "créditos tiene X", etc.
+    Detecta si la pregunta es sobre una materia específica (código, créditos, etc.)
     """
-    # Patrones comunes: "código de [MATERIA]", "créditos de [MATERIA]", "créditos tiene [MATERIA]", etc.
-    patrones = [
-        r'(?:código|codigo|créditos|creditos|semestre|tipología|tipologia|prerequisito|prerequisitos)\s+(?:de|del|de la|del la)\s+(.+?)(?:\?|$|\.)',
-        r'(?:cuál|cuál es|que|qué es)\s+(?:el|la)\s+(?:código|codigo|créditos|creditos)\s+(?:de|del|de la)\s+(.+?)(?:\?|$|\.)',
-        r'(?:cuántos|cuantos|cuántas|cuantas)\s+(?:créditos|creditos)\s+(?:tiene|tienen)\s+(?:la\s+)?(?:materia|asignatura|curso)?\s*(.+?)(?:\?|$|\.)',
-        r'(?:créditos|creditos)\s+(?:tiene|tienen)\s+(?:la\s+)?(?:materia|asignatura|curso)?\s*(.+?)(?:\?|$|\.)',
-    ]
-    
-    for patron in patrones:
-        match = re.search(patron, pregunta, re.IGNORECASE)
-        if match:
-            nombre = match.group(1).strip()
-            # Limpiar el nombre (quitar palabras comunes al final)
-            nombre = re.sub(r'\s+(materia|asignatura|curso)$', '', nombre, flags=re.IGNORECASE)
-            if len(nombre) > 3:  # Asegurar que tiene sentido
-                return nombre
-    
-    return None
+    return clasificar_pregunta(pregunta).es_especifica
 
 
-def extraer_info_especifica_del_contexto(contexto: str, pregunta: str) -> Optional[str]:
+def extraer_info_especifica(resultado: ResultadoBusqueda, intencion: IntencionConsulta) -> Optional[str]:
     """
-    Extrae información específica (código, créditos) del contexto sin usar LLM.
+    Extrae información específica (código, créditos) de las materias recuperadas sin usar LLM.
     Retorna None si no puede extraer programáticamente.
     """
-    query = pregunta.lower()
-    
-    # Extraer materias del contexto
-    materias = extraer_materias_del_contexto(contexto)
-    logger.info(f"📝 Materias extraídas del contexto: {len(materias)}")
+    materias = resultado.materias
+    logger.info(f"📝 Materias en los documentos recuperados: {len(materias)}")
     
     if not materias:
-        logger.warning("⚠️ No se pudieron extraer materias del contexto")
+        logger.warning("⚠️ Ningún documento recuperado es una materia de la malla")
         return None
     
-    # Si hay solo una materia, usar esa
-    if len(materias) == 1:
+    # Si el índice resolvió la materia mencionada, elegirla por código
+    materia_buscada = _materia_mencionada(intencion)
+    if materia_buscada is not None:
+        materia = next((m for m in materias if codigo_base(m['codigo']) == materia_buscada.codigo), None)
+        if materia is None:
+            logger.info(f"⚠️ {materia_buscada.nombre} ({materia_buscada.codigo}) no está entre los documentos recuperados")
+            return None
+    elif len(materias) == 1 or not intencion.nombre_materia:
         materia = materias[0]
     else:
-        # Intentar encontrar la materia por nombre
-        nombre_buscado = extraer_nombre_materia_de_pregunta(pregunta)
-        if nombre_buscado:
-            # Buscar materia que coincida con el nombre
-            for m in materias:
-                if nombre_buscado.lower() in m['nombre'].lower() or m['nombre'].lower() in nombre_buscado.lower():
-                    materia = m
-                    break
-            else:
-                # Si no se encuentra, usar la primera
-                materia = materias[0]
-        else:
-            materia = materias[0]
-    
-    # Extraer la información solicitada
-    if "código" in query or "codigo" in query:
-        codigo = materia.get('codigo', 'No disponible')
-        logger.info(f"✅ Código extraído: {codigo} de materia: {materia.get('nombre', 'N/A')}")
-        return codigo
-    elif "créditos" in query or "creditos" in query:
-        creditos = materia.get('creditos', 'No disponible')
-        logger.info(f"✅ Créditos extraídos: {creditos} de materia: {materia.get('nombre', 'N/A')}")
-        return creditos
-    elif "semestre" in query:
-        semestre = materia.get('semestre', 'No disponible')
-        logger.info(f"✅ Semestre extraído: {semestre} de materia: {materia.get('nombre', 'N/A')}")
-        return semestre
-    elif "tipología" in query or "tipologia" in query:
-        tipologia = materia.get('tipologia', 'No disponible')
-        logger.info(f"✅ Tipología extraída: {tipologia} de materia: {materia.get('nombre', 'N/A')}")
-        return tipologia
-    elif "prerequisito" in query:
-        prerequisitos = materia.get('prerequisitos', 'Ninguno')
-        logger.info(f"✅ Prerequisitos extraídos: {prerequisitos} de materia: {materia.get('nombre', 'N/A')}")
-        return prerequisitos
-    
-    logger.warning("⚠️ No se pudo determinar qué información extraer de la pregunta")
-    return None
+        # Nombre que el índice no conoce: buscarlo entre las materias recuperadas
+        nombre_buscado = normalizar_texto(intencion.nombre_materia)
+        materia = next((m for m in materias
+                        if nombre_buscado in normalizar_texto(m['nombre'])
+                        or normalizar_texto(m['nombre']) in nombre_buscado), None)
+        if materia is None:
+            logger.info(f"⚠️ Ninguna materia recuperada coincide con '{intencion.nombre_materia}'")
+            return None
+    
+    return _extraer_campo_materia(materia, intencion.campo)
 
 
-def buscar_contexto(pregunta: str, k: Optional[int] = None):
+def _materia_mencionada(intencion: IntencionConsulta) -> Optional[Materia]:
     """
-    Busca documentos relevantes en Chroma usando filtros de metadata cuando sea posible.
-    Optimizado para reducir tiempo de respuesta.
+    Materia a la que se refiere una consulta específica, resuelta con el índice curricular
+    (código, nombre sin tildes ni mayúsculas o nombre aproximado). None si no se identifica.
     """
-    vectorstore = obtener_vectorstore()
-    
-    # Detectar si es una consulta de listado (necesita todos los resultados)
-    es_listado, _ = es_consulta_de_listado(pregunta)
-    
-    # Determinar k óptimo según el tipo de consulta
-    if k is None:
-        if es_consulta_especifica_materia(pregunta):
-            # Si hay un nombre de materia específico, usar k=1 o k=2
-            nombre_materia = extraer_nombre_materia_de_pregunta(pregunta)
-            if nombre_materia:
-                k = 2  # Para consultas muy específicas con nombre de materia
-                logger.info(f"🎯 Consulta específica detectada con materia '{nombre_materia}', usando k=2")
-            else:
-                k = 3  # Para consultas específicas sin nombre claro
-                logger.info("🎯 Consulta específica detectada sin nombre claro, usando k=3")
-        else:
-            k = 10  # Para consultas generales, usar 10
-            logger.info("📋 Consulta general detectada, usando k=10")
+    if not intencion.es_especifica:
+        return None
+    indice = obtener_indice()
+    if intencion.nombre_materia:
+        return indice.resolver(intencion.nombre_materia)
+    return indice.buscar_codigo_en_texto(intencion.pregunta)
+
+
+def _extraer_campo_materia(materia: Dict[str, str], campo: Optional[str]) -> Optional[str]:
+    """
+    Devuelve el campo de la materia que pide la pregunta (código, créditos, semestre,
+    tipología o prerrequisitos). Retorna None si no se puede determinar.
+    """
+    if campo is None:
+        logger.warning("⚠️ No se pudo determinar qué información extraer de la pregunta")
+        return None
     
-    # Construir filtros de metadata dinámicamente
-    filtro_metadata = construir_filtro_metadata(pregunta)
+    valor = materia.get(campo, 'Ninguno' if campo == 'prerequisitos' else 'No disponible')
+    logger.info(f"✅ Campo '{campo}' extraído: {valor} de materia: {materia.get('nombre', 'N/A')}")
+    return valor
+
+
+def _resolver_k(intencion: IntencionConsulta, k: Optional[int]) -> int:
+    """Determina el k óptimo según el tipo de consulta"""
+    if k is not None:
+        return k
     
-    # Si hay filtros de metadata, usarlos
+    if intencion.es_especifica:
+        if intencion.nombre_materia:
+            logger.info(f"🎯 Consulta específica detectada con materia '{intencion.nombre_materia}', usando k={intencion.k}")
+        else:
+            logger.info(f"🎯 Consulta específica detectada sin nombre claro, usando k={intencion.k}")
+    else:
+        logger.info(f"📋 Consulta general detectada, usando k={intencion.k}")
+    return intencion.k
+
+
+def _obtener_documentos_filtrados(vectorstore, filtro_metadata: Dict[str, Any]) -> Optional[ResultadoBusqueda]:
+    """
+    Obtiene todos los documentos que cumplen el filtro de metadata (consultas de listado).
+    Retorna None si no hay resultados o hay un error, para usar búsqueda semántica como fallback.
+    """
+    try:
+        # Obtener documentos filtrados por metadata
+        docs_filtrados = vectorstore.get(where=filtro_metadata)
+        
+        if not (docs_filtrados and docs_filtrados.get('ids') and len(docs_filtrados['ids']) > 0):
+            logger.warning("⚠️ No se encontraron documentos con el filtro de metadata, usando búsqueda semántica")
+            return None
+        
+        resultado = ResultadoBusqueda.desde_get(docs_filtrados)
+        logger.info(f"📊 Consulta de listado detectada: devolviendo TODOS los {len(resultado)} documentos filtrados")
+        return resultado
+    except Exception as e:
+        logger.error(f"❌ Error al filtrar por metadata: {e}, usando búsqueda semántica")
+        return None
+
+
+def _busqueda_por_vector(vectorstore, embedding: List[float], k: int,
+                         filtro_metadata: Optional[Dict[str, Any]]) -> ResultadoBusqueda:
+    """
+    Top-k por similitud, con la distancia de cada documento. Con filtro, Chroma ordena solo
+    los documentos que cumplen el `where` y materializa únicamente esos k; si el filtro no
+    deja ninguno (o falla), se repite sin filtro con el mismo embedding.
+    """
     if filtro_metadata:
         try:
-            # Obtener documentos filtrados por metadata
-            docs_filtrados = vectorstore.get(where=filtro_metadata)
-            
-            if docs_filtrados and docs_filtrados.get('ids') and len(docs_filtrados['ids']) > 0:
-                # Si hay documentos filtrados, obtener sus textos
-                documentos_filtrados = docs_filtrados.get('documents', [])
-                metadatas_filtradas = docs_filtrados.get('metadatas', [])
-                
-                # Crear documentos LangChain
-                from langchain_core.documents import Document
-                resultados = [
-                    Document(page_content=doc, metadata=meta if meta else {})
-                    for doc, meta in zip(documentos_filtrados, metadatas_filtradas)
-                ]
-                
-                # Si es una consulta de listado, devolver TODOS los documentos filtrados
-                # Si no, limitar a k documentos
-                if not es_listado and len(resultados) > k:
-                    logger.info(f"📊 Limitando resultados de {len(resultados)} a {k} documentos (no es listado)")
-                    resultados = resultados[:k]
-                else:
-                    logger.info(f"📊 Consulta de listado detectada: devolviendo TODOS los {len(resultados)} documentos filtrados")
-            else:
-                # Si no hay documentos, usar búsqueda semántica como fallback
-                logger.warning("⚠️ No se encontraron documentos con el filtro de metadata, usando búsqueda semántica")
-                resultados = vectorstore.similarity_search(pregunta, k=k)
+            pares = vectorstore.similarity_search_by_vector_with_relevance_scores(embedding, k, filter=filtro_metadata)
+            if pares:
+                logger.info(f"📊 Búsqueda semántica dentro del filtro: {len(pares)} documentos (k={k})")
+                return ResultadoBusqueda.desde_consulta(pares)
+            logger.warning("⚠️ No se encontraron documentos con el filtro de metadata, usando búsqueda semántica")
         except Exception as e:
             logger.error(f"❌ Error al filtrar por metadata: {e}, usando búsqueda semántica")
-            # Si hay error, usar búsqueda semántica como fallback
-            resultados = vectorstore.similarity_search(pregunta, k=k)
-    else:
-        # Si no hay filtros, usar búsqueda semántica normal
-        resultados = vectorstore.similarity_search(pregunta, k=k)
-    
-    # Combinar los resultados en un solo contexto
-    contexto = "\n\n".join([doc.page_content for doc in resultados])
-    return contexto
+    return ResultadoBusqueda.desde_consulta(vectorstore.similarity_search_by_vector_with_relevance_scores(embedding, k))
 
 
-def extraer_materias_del_contexto(contexto: str) -> List[Dict[str, str]]:
+def buscar_documentos(pregunta: str, k: Optional[int] = None,
+                      intencion: Optional[IntencionConsulta] = None) -> ResultadoBusqueda:
     """
-    Extrae programáticamente todas las materias del contexto estructurado.
-    Esto es más confiable que depender del LLM para extraer información estructurada.
+    Busca documentos relevantes en Chroma usando filtros de metadata cuando sea posible:
+    los listados traen todos los documentos del filtro; el resto de consultas, los k más
+    similares dentro del filtro.
+    """
+    vectorstore = obtener_vectorstore()
+    intencion = intencion or clasificar_pregunta(pregunta)
     
-    Returns:
-        Lista de diccionarios con información de cada materia
+    # Las consultas de listado necesitan todos los resultados
+    k = _resolver_k(intencion, k)
+    
+    # Filtros de metadata detectados en la pregunta
+    filtro_metadata = intencion.filtro_metadata
+    
+    resultado = None
+    if filtro_metadata and intencion.es_listado:
+        resultado = _obtener_documentos_filtrados(vectorstore, filtro_metadata)
+        # Si el filtro no dio resultados, la búsqueda semántica va sin filtro
+        filtro_metadata = None
+    
+    if resultado is None:
+        # Búsqueda semántica, restringida al filtro si lo hay
+        embedding = vectorstore.embeddings.embed_query(pregunta)
+        resultado = _busqueda_por_vector(vectorstore, embedding, k, filtro_metadata)
+    
+    return resultado
+
+
+async def buscar_documentos_async(pregunta: str, k: Optional[int] = None,
+                                  intencion: Optional[IntencionConsulta] = None) -> ResultadoBusqueda:
+    """
+    Versión asíncrona de buscar_documentos.
+    El embedding de la pregunta se pide a OpenAI sin bloquear el event loop y las
+    consultas a Chroma (SQLite local) se ejecutan en un hilo.
     """
-    materias = []
+    vectorstore = await asyncio.to_thread(obtener_vectorstore)
+    intencion = intencion or clasificar_pregunta(pregunta)
     
-    # Patrón para extraer cada materia completa
-    # Busca bloques que empiecen con "Materia:" y capture todos los campos
-    patron = r'Materia: ([^\n]+)\nCódigo: ([^\n]+)\nSemestre: ([^\n]+)\nCréditos: ([^\n]+)\nTipología: ([^\n]+)(?:\nPrerrequisitos: ([^\n]+))?'
+    k = _resolver_k(intencion, k)
+    filtro_metadata = intencion.filtro_metadata
     
-    matches = re.finditer(patron, contexto)
+    resultado = None
+    if filtro_metadata and intencion.es_listado:
+        resultado = await asyncio.to_thread(_obtener_documentos_filtrados, vectorstore, filtro_metadata)
+        filtro_metadata = None
     
-    for match in matches:
-        materia = {
-            'nombre': match.group(1).strip(),
-            'codigo': match.group(2).strip(),
-            'semestre': match.group(3).strip(),
-            'creditos': match.group(4).strip(),
-            'tipologia': match.group(5).strip(),
-            'prerequisitos': match.group(6).strip() if match.group(6) else 'Ninguno'
-        }
-        materias.append(materia)
+    if resultado is None:
+        embedding = await vectorstore.embeddings.aembed_query(pregunta)
+        resultado = await asyncio.to_thread(_busqueda_por_vector, vectorstore, embedding, k, filtro_metadata)
     
-    return materias
+    return resultado
+
+
+def buscar_contexto(pregunta: str, k: Optional[int] = None,
+                    intencion: Optional[IntencionConsulta] = None) -> str:
+    """Texto de los documentos relevantes, separados por una línea en blanco"""
+    return buscar_documentos(pregunta, k, intencion).contexto
+
+
+async def buscar_contexto_async(pregunta: str, k: Optional[int] = None,
+                                intencion: Optional[IntencionConsulta] = None) -> str:
+    """Versión asíncrona de buscar_contexto"""
+    return (await buscar_documentos_async(pregunta, k, intencion)).contexto
 
 
 def formatear_lista_materias(materias: List[Dict[str, str]]) -> str:
@@ -321,23 +337,7 @@ def es_pregunta_sobre_identidad(pregunta: str) -> bool:
     """
     Detecta si la pregunta es sobre la identidad del chatbot.
     """
-    query = pregunta.lower().strip()
-    
-    # Patrones que indican pregunta sobre identidad
-    patrones_identidad = [
-        "quién eres", "quien eres", "quien sos", "quién sos",
-        "qué eres", "que eres", "que sos", "qué sos",
-        "cuál es tu nombre", "cual es tu nombre",
-        "de dónde eres", "de donde eres",
-        "de qué universidad", "de que universidad",
-        "qué universidad", "que universidad",
-        "de qué sede", "de que sede",
-        "qué sede", "que sede",
-        "presentate", "preséntate",
-        "dime quién eres", "dime quien eres"
-    ]
-    
-    return any(patron in query for patron in patrones_identidad)
+    return clasificar_pregunta(pregunta).es_identidad
 
 
 def es_pregunta_academica(pregunta: str) -> bool:
@@ -345,29 +345,7 @@ def es_pregunta_academica(pregunta: str) -> bool:
     Detecta si la pregunta es sobre temas académicos (materias, carrera, etc.)
     o es un saludo/pregunta general.
     """
-    query = pregunta.lower().strip()
-    
-    # Si es pregunta sobre identidad, no es académica
-    if es_pregunta_sobre_identidad(pregunta):
-        return False
-    
-    # Saludos comunes
-    saludos = ["hola", "hi", "hello", "buenos días", "buenas tardes", "buenas noches", 
-               "buen día", "qué tal", "que tal", "cómo estás", "como estas"]
-    
-    if query in saludos or any(saludo in query for saludo in saludos if len(query) < 20):
-        return False
-    
-    # Palabras clave que indican pregunta académica
-    palabras_academicas = [
-        "materia", "materias", "curso", "cursos", "asignatura", "asignaturas",
-        "semestre", "semestres", "carrera", "malla", "curricular", "curriculum",
-        "prerequisito", "prerequisitos", "requisito", "requisitos", "crédito", "créditos",
-        "credito", "creditos", "tipología", "tipologia", "obligatoria", "optativa",
-        "disciplinar", "fundamental", "código", "codigo"
-    ]
-    
-    return any(palabra in query for palabra in palabras_academicas)
+    return clasificar_pregunta(pregunta).es_academica
 
 
 def es_consulta_sobre_cantidad(pregunta: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
@@ -375,100 +353,91 @@ def es_consulta_sobre_cantidad(pregunta: str) -> Tuple[bool, Optional[Dict[str,
     Detecta si la pregunta es sobre la cantidad de materias.
     Retorna (es_consulta_cantidad, filtros) donde filtros contiene el tipo de materias buscadas.
     """
-    query = pregunta.lower()
-    
-    # EXCLUIR: Si la pregunta es sobre créditos/código/semestre/etc. de una materia específica,
-    # NO es una consulta sobre cantidad de materias
-    palabras_excluir = [
-        "créditos tiene", "creditos tiene", "créditos de", "creditos de",
-        "código de", "codigo de", "código tiene", "codigo tiene",
-        "semestre de", "semestre tiene", "tipología de", "tipologia de",
-        "prerequisito de", "prerequisitos de"
-    ]
-    
-    # Si contiene alguna de estas palabras, NO es consulta sobre cantidad
-    if any(palabra in query for palabra in palabras_excluir):
-        return False, None
-    
-    # Palabras clave que indican pregunta sobre cantidad
-    palabras_cantidad = [
-        "cuántas", "cuantas", "cuántos", "cuantos",
-        "cuántas materias", "cuantas materias", "cuántos cursos", "cuantos cursos",
-        "cuántas asignaturas", "cuantas asignaturas", "total de materias"
-    ]
-    
-    es_cantidad = any(palabra in query for palabra in palabras_cantidad)
-    
-    if not es_cantidad:
-        return False, None
-    
-    # Detectar filtros
-    filtros = {}
-    
-    # Tipo de tipología
-    if any(palabra in query for palabra in ["obligatoria", "obligatorias", "obligatorio", "obligatorios"]):
-        filtros['tipo'] = "OBLIGATORIA"
-    elif any(palabra in query for palabra in ["optativa", "optativas", "optativo", "optativos", "electiva", "electivas"]):
-        filtros['tipo'] = "OPTATIVA"
-    
-    # Categoría de tipología
-    if any(palabra in query for palabra in ["fundamental", "fundamentales", "fund.", "fundamentación"]):
-        filtros['categoria'] = "FUNDAMENTAL"
-    elif any(palabra in query for palabra in ["disciplinar", "disciplinares", "disciplina"]):
-        filtros['categoria'] = "DISCIPLINAR"
-    elif any(palabra in query for palabra in ["lengua extranjera", "lengua", "idioma"]):
-        filtros['categoria'] = "LENGUA EXTRANJERA"
-    elif any(palabra in query for palabra in ["trabajo de grado", "trabajo grado"]):
-        filtros['categoria'] = "TRABAJO DE GRADO"
-    
-    return True, filtros
+    intencion = clasificar_pregunta(pregunta)
+    return intencion.es_cantidad, intencion.filtros_cantidad
+
+
+# Cómo se nombra cada valor de tipología en las respuestas
+_NOMBRE_TIPO = {"OBLIGATORIA": "obligatorias", "OPTATIVA": "optativas"}
+_NOMBRE_CATEGORIA = {
+    "FUNDAMENTAL": "fundamentales",
+    "DISCIPLINAR": "disciplinares",
+    "LENGUA EXTRANJERA": "de lengua extranjera",
+    "TRABAJO DE GRADO": "de trabajo de grado"
+}
+
+
+def _materias_texto(n: int) -> str:
+    return "materia" if n == 1 else "materias"
 
 
 def responder_cantidad_materias(filtros: Dict[str, Any]) -> str:
     """
-    Responde con la cantidad de materias según los filtros proporcionados.
-    Usa números predefinidos para mayor precisión.
+    Responde con la cantidad de materias (o la suma de créditos) según los filtros.
+    Los números salen de la tabla de agregados del índice curricular, así que siempre
+    reflejan los documentos cargados.
+    
+    filtros: 'tipo', 'categoria', 'semestre' (opcionales), 'medida' ('creditos' para sumar
+    créditos) y 'desglose' ('semestre' para responder por semestre).
     """
-    # Números predefinidos
-    total_materias = 54  # Sin contar electivas (aunque esto incluye todo)
-    fundamentales_obligatorias = 15
-    fundamentales_optativas = 6
-    disciplinares_obligatorias = 21
-    disciplinares_optativas = 7
-    lengua_extranjera = 4
-    trabajo_grado = 1
+    tabla = obtener_indice().tabla
     
     tipo = filtros.get('tipo')
     categoria = filtros.get('categoria')
+    semestre = filtros.get('semestre')
+    
+    # Lengua extranjera y trabajo de grado no son obligatorias ni optativas en la malla
+    if categoria in ("LENGUA EXTRANJERA", "TRABAJO DE GRADO"):
+        tipo = None
     
-    # Casos específicos
-    if categoria == "FUNDAMENTAL" and tipo == "OBLIGATORIA":
-        return f"Hay {fundamentales_obligatorias} materias fundamentales obligatorias."
-    elif categoria == "FUNDAMENTAL" and tipo == "OPTATIVA":
-        return f"Hay {fundamentales_optativas} materias fundamentales optativas."
-    elif categoria == "DISCIPLINAR" and tipo == "OBLIGATORIA":
-        return f"Hay {disciplinares_obligatorias} materias disciplinares obligatorias."
-    elif categoria == "DISCIPLINAR" and tipo == "OPTATIVA":
-        return f"Hay {disciplinares_optativas} materias disciplinares optativas."
-    elif categoria == "LENGUA EXTRANJERA":
-        return f"Hay {lengua_extranjera} materias de lengua extranjera."
-    elif categoria == "TRABAJO DE GRADO":
-        return f"Hay {trabajo_grado} materia de trabajo de grado."
-    elif categoria == "FUNDAMENTAL":
-        total = fundamentales_obligatorias + fundamentales_optativas
-        return f"Hay {total} materias fundamentales en total ({fundamentales_obligatorias} obligatorias y {fundamentales_optativas} optativas)."
-    elif categoria == "DISCIPLINAR":
-        total = disciplinares_obligatorias + disciplinares_optativas
-        return f"Hay {total} materias disciplinares en total ({disciplinares_obligatorias} obligatorias y {disciplinares_optativas} optativas)."
-    elif tipo == "OBLIGATORIA":
-        total = fundamentales_obligatorias + disciplinares_obligatorias
-        return f"Hay {total} materias obligatorias en total ({fundamentales_obligatorias} fundamentales y {disciplinares_obligatorias} disciplinares)."
-    elif tipo == "OPTATIVA":
-        total = fundamentales_optativas + disciplinares_optativas
-        return f"Hay {total} materias optativas en total ({fundamentales_optativas} fundamentales y {disciplinares_optativas} disciplinares)."
+    adjetivos = " ".join(
+        nombre for nombre in (_NOMBRE_CATEGORIA.get(categoria), _NOMBRE_TIPO.get(tipo)) if nombre
+    )
+    sufijo_semestre = f" en el semestre {semestre}" if semestre is not None else ""
+    
+    # Desglose por semestre
+    if filtros.get('desglose') == "semestre" and semestre is None:
+        desglose = tabla.por_semestre(tipo, categoria)
+        if not desglose:
+            return "No encontré materias con esos criterios."
+        titulo = f"Materias {adjetivos} por semestre:" if adjetivos else "Materias por semestre:"
+        lineas = [titulo]
+        for sem, (conteo, creditos) in desglose.items():
+            etiqueta = f"Semestre {sem}" if sem else "Sin semestre asignado"
+            lineas.append(f"- {etiqueta}: {conteo} {_materias_texto(conteo)} ({creditos} créditos)")
+        return "\n".join(lineas)
+    
+    conteo, creditos = tabla.consultar(semestre, tipo, categoria)
+    
+    # Suma de créditos
+    if filtros.get('medida') == "creditos":
+        if adjetivos:
+            sujeto = f"Las materias {adjetivos}"
+        elif semestre is not None:
+            sujeto = "Las materias"
+        else:
+            sujeto = "Las materias de la malla curricular"
+        return f"{sujeto}{sufijo_semestre} suman {creditos} créditos ({conteo} {_materias_texto(conteo)})."
+    
+    # Conteo de materias
+    if conteo == 0:
+        descripcion = " ".join(parte for parte in ("materias", adjetivos) if parte)
+        return f"No encontré {descripcion}{sufijo_semestre}."
+    
+    if tipo and categoria or categoria in ("LENGUA EXTRANJERA", "TRABAJO DE GRADO"):
+        return f"Hay {conteo} {_materias_texto(conteo)} {adjetivos}{sufijo_semestre}."
+    elif categoria:
+        obligatorias = tabla.consultar(semestre, "OBLIGATORIA", categoria)[0]
+        optativas = tabla.consultar(semestre, "OPTATIVA", categoria)[0]
+        return f"Hay {conteo} {_materias_texto(conteo)} {adjetivos}{sufijo_semestre} en total ({obligatorias} obligatorias y {optativas} optativas)."
+    elif tipo:
+        fundamentales = tabla.consultar(semestre, tipo, "FUNDAMENTAL")[0]
+        disciplinares = tabla.consultar(semestre, tipo, "DISCIPLINAR")[0]
+        return f"Hay {conteo} {_materias_texto(conteo)} {adjetivos}{sufijo_semestre} en total ({fundamentales} fundamentales y {disciplinares} disciplinares)."
+    elif semestre is not None:
+        return f"Hay {conteo} {_materias_texto(conteo)}{sufijo_semestre}."
     else:
-        # Total general (sin contar electivas según el usuario, pero el total es 54)
-        return f"Hay {total_materias} materias en total en la malla curricular (sin contar electivas)."
+        return f"Hay {conteo} {_materias_texto(conteo)} en total en la malla curricular."
 
 
 def es_consulta_de_listado(pregunta: str) -> Tuple[bool, Optional[int]]:
@@ -478,99 +447,116 @@ def es_consulta_de_listado(pregunta: str) -> Tuple[bool, Optional[int]]:
     Returns:
         Tupla (es_listado, semestre) donde semestre es None si no se detecta un semestre específico
     """
-    query = pregunta.lower()
-    
-    # Palabras clave que indican listado
-    palabras_listado = [
-        "qué materias", "que materias", "cuáles materias", "cuales materias",
-        "cuáles son las materias", "cuales son las materias", "cuáles son", "cuales son",
-        "lista", "listar", "materias del", "materias de", "materias en",
-        "materias que hay", "materias que tiene", "materias que son"
+    intencion = clasificar_pregunta(pregunta)
+    return intencion.es_listado, intencion.semestre
+
+
+# Configuración del LLM
+MODELO_LLM = "gpt-5-mini"  # Modelo válido de OpenAI
+
+PROMPT_SISTEMA_SALUDO = 'Eres prismaUNAL, un asistente virtual de la carrera de Administración de Sistemas Informáticos de la Universidad Nacional de Colombia, sede Manizales. Eres amigable, entusiasta y servicial. Tu objetivo es ayudar a los estudiantes con información sobre la malla curricular, materias, horarios, profesores y cualquier consulta relacionada con el programa académico. Responde de manera conversacional, cálida y natural, como si fueras un compañero de carrera que está ayudando. Sé claro y preciso, pero mantén un tono amigable.'
+
+PROMPT_SISTEMA_RAG = 'Eres prismaUNAL, un asistente virtual amigable y servicial de la carrera de Administración de Sistemas Informáticos de la UNAL Manizales. Responde de manera clara, precisa y con un tono conversacional. Sé directo pero amigable, como si estuvieras ayudando a un compañero de carrera.'
+
+
+def _mensajes_saludo(pregunta: str) -> List[Dict[str, str]]:
+    """Mensajes para saludos: se responde sin contexto mencionando la universidad"""
+    return [
+        {'role': 'system', 'content': PROMPT_SISTEMA_SALUDO},
+        {'role': 'user', 'content': pregunta}
     ]
-    
-    es_listado = any(palabra in query for palabra in palabras_listado)
-    
-    # Detectar semestre
-    semestre_buscado = None
-    semestres_texto = {
-        "primer": 1, "primero": 1, "1er": 1, "1ro": 1,
-        "segundo": 2, "segunda": 2, "2do": 2, "2da": 2,
-        "tercer": 3, "tercero": 3, "3er": 3, "3ro": 3,
-        "cuarto": 4, "4to": 4,
-        "quinto": 5, "5to": 5,
-        "sexto": 6, "6to": 6,
-        "séptimo": 7, "septimo": 7, "7mo": 7,
-        "octavo": 8, "8vo": 8,
-        "noveno": 9, "9no": 9,
-        "décimo": 10, "decimo": 10, "10mo": 10
-    }
-    
-    for palabra, num in semestres_texto.items():
-        if palabra in query:
-            semestre_buscado = num
-            break
-    
-    if semestre_buscado is None:
-        match = re.search(r'semestre\s+(\d+)', query)
-        if match:
-            semestre_buscado = int(match.group(1))
-    
-    return es_listado, semestre_buscado
 
 
-def responder_con_rag(pregunta: str):
-    """
-    Genera respuesta usando RAG con enfoque híbrido:
-    - Extracción programática para consultas estructuradas (más confiable)
-    - LLM para consultas que requieren razonamiento
-    """
-    # Inicializar el cliente de OpenAI
-    client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    model_name = "gpt-5-mini"  # Modelo válido de OpenAI
-    
-    # 0. Detectar si es un saludo simple - si es así, no buscar contexto
-    if not es_pregunta_academica(pregunta):
-        # Para saludos, responder sin contexto de manera natural pero mencionando la universidad
-        respuesta = client.chat.completions.create(
-            model=model_name,
-            messages=[{
-                'role': 'system', 
-                'content': 'Eres prismaUNAL, un asistente virtual de la carrera de Administración de Sistemas Informáticos de la Universidad Nacional de Colombia, sede Manizales. Eres amigable, entusiasta y servicial. Tu objetivo es ayudar a los estudiantes con información sobre la malla curricular, materias, horarios, profesores y cualquier consulta relacionada con el programa académico. Responde de manera conversacional, cálida y natural, como si fueras un compañero de carrera que está ayudando. Sé claro y preciso, pero mantén un tono amigable.'
-            }, {
-                'role': 'user', 
-                'content': pregunta
-            }]
-        )
-        return respuesta.choices[0].message.content
+def _mensajes_rag(pregunta: str, contexto: str) -> List[Dict[str, str]]:
+    """Mensajes para consultas académicas con el contexto recuperado (prompt optimizado)"""
+    prompt_content = f"""Información disponible: {contexto}
+
+Pregunta del estudiante: {pregunta}
+
+Usa la información proporcionada para responder de manera clara y amigable. Responde directamente lo que se pregunta, pero hazlo con un tono conversacional y servicial."""
     
-    # 1. Detectar si es una pregunta sobre cantidad de materias
-    es_cantidad, filtros_cantidad = es_consulta_sobre_cantidad(pregunta)
-    if es_cantidad and filtros_cantidad is not None:
+    return [
+        {'role': 'system', 'content': PROMPT_SISTEMA_RAG},
+        {'role': 'user', 'content': prompt_content}
+    ]
+
+
+def _respuesta_cantidad(intencion: IntencionConsulta) -> Optional[str]:
+    """Responde preguntas sobre cantidad de materias sin buscar contexto. None si no aplica."""
+    filtros_cantidad = intencion.filtros_cantidad
+    if filtros_cantidad is not None:
         logger.info(f"🔢 Consulta sobre cantidad detectada con filtros: {filtros_cantidad}")
         respuesta = responder_cantidad_materias(filtros_cantidad)
         logger.info(f"✅ Respuesta predefinida: {respuesta}")
         return respuesta
+    return None
+
+
+def _respuesta_desde_indice(intencion: IntencionConsulta) -> Optional[str]:
+    """
+    Responde con el índice curricular en memoria, sin embeddings ni Chroma:
+    - Consultas específicas con nombre de materia (código, créditos, semestre, ...)
+    - Listados filtrados por semestre y/o tipología
+    Retorna None si la consulta no se puede resolver con el índice.
+    """
+    indice = obtener_indice()
+    
+    if intencion.es_especifica:
+        materia = _materia_mencionada(intencion)
+        if materia is not None:
+            info = _extraer_campo_materia(materia.como_dict(), intencion.campo)
+            if info and info != 'No disponible':
+                logger.info(f"⚡ Respuesta desde el índice curricular (sin búsqueda): {info}")
+                return info
+    
+    semestre = intencion.semestre
+    if intencion.es_listado:
+        if intencion.filtro_metadata:
+            categoria = intencion.categoria
+            materias = indice.filtrar(
+                semestre=semestre,
+                tipo=intencion.tipo,
+                categoria=categoria if categoria in ("FUNDAMENTAL", "DISCIPLINAR") else None
+            )
+            if materias:
+                logger.info(f"⚡ Listado desde el índice curricular: {len(materias)} materias")
+                return formatear_lista_materias([m.como_dict() for m in materias])
+            if semestre is not None:
+                return f"Lo siento, no encontré materias para el semestre {semestre}. ¿Quieres que busque en otro semestre?"
     
-    # 2. Buscar contexto relevante (k se calcula automáticamente según el tipo de consulta)
-    contexto = buscar_contexto(pregunta)
-    logger.info(f"📚 Contexto obtenido: {len(contexto)} caracteres")
-    
-    # 2.5. Intentar extracción programática directa para consultas específicas (evita LLM)
-    if es_consulta_especifica_materia(pregunta):
+    return None
+
+
+def _respuesta_sin_busqueda(intencion: IntencionConsulta) -> Optional[str]:
+    """Rutas deterministas que no necesitan buscar contexto: cantidad e índice curricular"""
+    respuesta = _respuesta_cantidad(intencion)
+    if respuesta is not None:
+        return respuesta
+    return _respuesta_desde_indice(intencion)
+
+
+def _respuesta_programatica(intencion: IntencionConsulta, resultado: ResultadoBusqueda) -> Optional[str]:
+    """
+    Intenta responder sin LLM a partir de la metadata de los documentos recuperados:
+    consultas específicas (código, créditos...) y listados de materias.
+    Retorna None si la consulta necesita el LLM.
+    """
+    # Intentar extracción programática directa para consultas específicas (evita LLM)
+    if intencion.es_especifica:
         logger.info("🔍 Detectada consulta específica, intentando extracción programática...")
-        info_extraida = extraer_info_especifica_del_contexto(contexto, pregunta)
+        info_extraida = extraer_info_especifica(resultado, intencion)
         if info_extraida and info_extraida != 'No disponible':
             logger.info(f"✅ Extracción programática exitosa (sin LLM): {info_extraida}")
             return info_extraida
         else:
             logger.info("⚠️ Extracción programática falló, usando LLM como fallback")
     
-    # 2. Detectar si es una consulta de listado simple
-    es_listado, semestre = es_consulta_de_listado(pregunta)
+    # Consulta de listado simple
+    semestre = intencion.semestre
     
-    if es_listado:
-        # Extraer programáticamente las materias (más confiable que el LLM)
-        materias = extraer_materias_del_contexto(contexto)
+    if intencion.es_listado:
+        # Materias leídas de la metadata (más confiable que el LLM)
+        materias = resultado.materias
         
         if materias:
             # Si se detectó un semestre específico, filtrar por ese semestre
@@ -586,155 +572,273 @@ def responder_con_rag(pregunta: str):
             
             # Si no hay filtro de semestre, devolver todas las materias encontradas
             return formatear_lista_materias(materias)
-        else:
-            # Si no se pudieron extraer materias, usar LLM como fallback
-            pass  # Continuar con el flujo del LLM
+        # Si no se pudieron extraer materias, continuar con el flujo del LLM
     
-    # 2. Para consultas complejas o si la extracción falló, usar LLM con prompt optimizado
-    logger.info("🤖 Usando LLM para generar respuesta...")
-    # Prompt optimizado con tono amigable
-    prompt_content = f"""Información disponible: {contexto}
+    return None
 
-Pregunta del estudiante: {pregunta}
 
-Usa la información proporcionada para responder de manera clara y amigable. Responde directamente lo que se pregunta, pero hazlo con un tono conversacional y servicial."""
-    
-    respuesta = client.chat.completions.create(
-        model=model_name,
-        messages=[
-            {
-                'role': 'system',
-                'content': 'Eres prismaUNAL, un asistente virtual amigable y servicial de la carrera de Administración de Sistemas Informáticos de la UNAL Manizales. Responde de manera clara, precisa y con un tono conversacional. Sé directo pero amigable, como si estuvieras ayudando a un compañero de carrera.'
-            },
-            {
-                'role': 'user',
-                'content': prompt_content
-            }
-        ]
+def _simular_stream(respuesta: str):
+    """Simula streaming palabra por palabra para respuestas calculadas sin LLM"""
+    for palabra in respuesta.split(' '):
+        yield palabra + ' '
+
+
+def _huella_semantica(intencion: IntencionConsulta) -> str:
+    """
+    Intención determinista de la pregunta (saludo, filtros de semestre/tipología y materia
+    mencionada). Dos preguntas solo comparten respuesta en la caché semántica si coincide.
+    """
+    if not intencion.es_academica:
+        return "saludo"
+    # La materia se identifica por código si el índice la resuelve (así "calclo diferencial"
+    # y "Cálculo Diferencial" comparten huella)
+    materia = _materia_mencionada(intencion)
+    nombre_materia = intencion.nombre_materia
+    return json.dumps(
+        [intencion.filtro_metadata,
+         materia.codigo if materia else normalizar_texto(nombre_materia) if nombre_materia else None],
+        sort_keys=True, ensure_ascii=False
     )
-    
+
+
+def _buscar_semantica(intencion: IntencionConsulta, vector: Optional[List[float]]) -> Tuple[Optional[str], Optional[tuple]]:
+    """
+    Busca una pregunta equivalente ya respondida por el LLM.
+    Retorna (respuesta en caché o None, entrada para guardar la respuesta nueva o None).
+    """
+    if vector is None:
+        return None, None
+    entrada = (vector, version_corpus(), _huella_semantica(intencion))
+    return obtener_cache_semantica().buscar(*entrada), entrada
+
+
+async def _embedding_pregunta_async(pregunta: str) -> Optional[List[float]]:
+    """Embedding de la pregunta para la caché semántica (None si está desactivada o falla)"""
+    if not cache_semantica_activa():
+        return None
+    try:
+        return await obtener_embeddings().aembed_query(pregunta)
+    except Exception as e:
+        logger.warning(f"⚠️ Caché semántica no disponible: {e}")
+        return None
+
+
+async def _completar_async(mensajes: List[Dict[str, str]]) -> Optional[str]:
+    """
+    Llama al LLM de forma asíncrona (no bloquea el event loop).
+    Espera turno en el control de admisión; sin turno a tiempo levanta SinCapacidad.
+    """
+    client = obtener_cliente_async()
+    async with obtener_admision().turno():
+        respuesta = await client.chat.completions.create(
+            model=MODELO_LLM,
+            messages=mensajes
+        )
     return respuesta.choices[0].message.content
 
 
-def responder_con_rag_stream(pregunta: str):
+async def _stream_llm_async(mensajes: List[Dict[str, str]]):
     """
-    Genera respuesta usando RAG con streaming (generador).
-    Retorna un generador que produce chunks de texto.
+    Generador asíncrono con los fragmentos de texto que produce el LLM.
+    El turno del control de admisión se mantiene hasta que termina (o se corta) el stream;
+    al cerrar el generador se cierra la respuesta HTTP de OpenAI y se libera el turno.
     """
-    # Inicializar el cliente de OpenAI
-    client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    model_name = "gpt-5-mini"  # Modelo válido de OpenAI
-    
-    # 0. Detectar si es un saludo simple - si es así, no buscar contexto
-    if not es_pregunta_academica(pregunta):
-        # Para saludos, responder sin contexto de manera natural pero mencionando la universidad
-        stream = client.chat.completions.create(
-            model=model_name,
-            messages=[{
-                'role': 'system', 
-                'content': 'Eres prismaUNAL, un asistente virtual de la carrera de Administración de Sistemas Informáticos de la Universidad Nacional de Colombia, sede Manizales. Eres amigable, entusiasta y servicial. Tu objetivo es ayudar a los estudiantes con información sobre la malla curricular, materias, horarios, profesores y cualquier consulta relacionada con el programa académico. Responde de manera conversacional, cálida y natural, como si fueras un compañero de carrera que está ayudando. Sé claro y preciso, pero mantén un tono amigable.'
-            }, {
-                'role': 'user', 
-                'content': pregunta
-            }],
+    client = obtener_cliente_async()
+    async with obtener_admision().turno():
+        stream = await client.chat.completions.create(
+            model=MODELO_LLM,
+            messages=mensajes,
             stream=True
         )
         
-        for chunk in stream:
-            if chunk.choices[0].delta.content is not None:
-                yield chunk.choices[0].delta.content
-        return
-    
-    # 1. Detectar si es una pregunta sobre cantidad de materias
-    es_cantidad, filtros_cantidad = es_consulta_sobre_cantidad(pregunta)
-    if es_cantidad and filtros_cantidad is not None:
-        logger.info(f"🔢 Consulta sobre cantidad detectada con filtros: {filtros_cantidad}")
-        respuesta = responder_cantidad_materias(filtros_cantidad)
-        logger.info(f"✅ Respuesta predefinida: {respuesta}")
-        # Simular streaming palabra por palabra
-        palabras = respuesta.split(' ')
-        for palabra in palabras:
-            yield palabra + ' '
+        async with stream:
+            async for chunk in stream:
+                if chunk.choices[0].delta.content is not None:
+                    yield chunk.choices[0].delta.content
+
+
+async def _completar_con_cache_async(intencion: IntencionConsulta, mensajes: List[Dict[str, str]]) -> Optional[str]:
+    """LLM detrás de la caché semántica: una paráfrasis de una pregunta ya respondida no llama al LLM"""
+    en_cache, entrada = _buscar_semantica(intencion, await _embedding_pregunta_async(intencion.pregunta))
+    if en_cache is not None:
+        logger.info("🧠 Respuesta desde caché semántica")
+        return en_cache
+    
+    respuesta = await _completar_async(mensajes)
+    if entrada is not None and respuesta:
+        obtener_cache_semantica().guardar(*entrada, respuesta)
+    return respuesta
+
+
+async def _stream_con_cache_async(intencion: IntencionConsulta, mensajes: List[Dict[str, str]]):
+    """Streaming del LLM detrás de la caché semántica (se guarda solo si el stream termina)"""
+    en_cache, entrada = _buscar_semantica(intencion, await _embedding_pregunta_async(intencion.pregunta))
+    if en_cache is not None:
+        logger.info("🧠 Respuesta desde caché semántica (streaming)")
+        for fragmento in _simular_stream(en_cache):
+            yield fragmento
         return
     
-    # 2. Buscar contexto relevante (k se calcula automáticamente según el tipo de consulta)
-    contexto = buscar_contexto(pregunta)
-    logger.info(f"📚 Contexto obtenido: {len(contexto)} caracteres")
+    fragmentos = []
+    # aclosing: si se cierra este generador, el del LLM se cierra en el mismo paso
+    async with aclosing(_stream_llm_async(mensajes)) as fragmentos_llm:
+        async for fragmento in fragmentos_llm:
+            fragmentos.append(fragmento)
+            yield fragmento
     
-    # 2.5. Intentar extracción programática directa para consultas específicas (evita LLM)
-    if es_consulta_especifica_materia(pregunta):
-        logger.info("🔍 Detectada consulta específica, intentando extracción programática...")
-        info_extraida = extraer_info_especifica_del_contexto(contexto, pregunta)
-        if info_extraida and info_extraida != 'No disponible':
-            logger.info(f"✅ Extracción programática exitosa (sin LLM): {info_extraida}")
-            # Simular streaming palabra por palabra
-            palabras = info_extraida.split(' ')
-            for palabra in palabras:
-                yield palabra + ' '
-            return
-        else:
-            logger.info("⚠️ Extracción programática falló, usando LLM como fallback")
+    if entrada is not None and fragmentos:
+        obtener_cache_semantica().guardar(*entrada, _unir_fragmentos(fragmentos))
+
+
+async def _responder_con_rag_async(pregunta: str):
+    """
+    Flujo completo de responder_con_rag_async (sin caché de respuestas exactas).
+    La detección de intención y la extracción programática son CPU puro (microsegundos)
+    y se ejecutan en línea; la búsqueda y el LLM se esperan sin bloquear el event loop.
+    """
+    # 0. Clasificar la pregunta una vez; saludos: responder sin contexto
+    intencion = clasificar_pregunta(pregunta)
+    if intencion.ruta == "saludo":
+        return await _completar_con_cache_async(intencion, _mensajes_saludo(pregunta))
+    
+    # 1. Cantidad de materias e índice curricular
+    respuesta = _respuesta_sin_busqueda(intencion)
+    if respuesta is not None:
+        return respuesta
     
-    # 3. Detectar si es una consulta de listado simple
-    es_listado, semestre = es_consulta_de_listado(pregunta)
+    # 2. Buscar documentos relevantes
+    resultado = await buscar_documentos_async(pregunta, intencion=intencion)
+    logger.info(f"📚 Documentos recuperados: {len(resultado)}")
     
-    if es_listado:
-        # Extraer programáticamente las materias (más confiable que el LLM)
-        materias = extraer_materias_del_contexto(contexto)
-        
-        if materias:
-            # Si se detectó un semestre específico, filtrar por ese semestre
-            if semestre is not None:
-                materias_filtradas = [
-                    m for m in materias 
-                    if m['semestre'] == str(semestre)
-                ]
-                if materias_filtradas:
-                    respuesta = formatear_lista_materias(materias_filtradas)
-                    # Simular streaming palabra por palabra
-                    palabras = respuesta.split(' ')
-                    for palabra in palabras:
-                        yield palabra + ' '
-                    return
-                else:
-                    respuesta = f"Lo siento, no encontré materias para el semestre {semestre}. ¿Quieres que busque en otro semestre?"
-                    palabras = respuesta.split(' ')
-                    for palabra in palabras:
-                        yield palabra + ' '
-                    return
-            
-            # Si no hay filtro de semestre, devolver todas las materias encontradas
-            respuesta = formatear_lista_materias(materias)
-            palabras = respuesta.split(' ')
-            for palabra in palabras:
-                yield palabra + ' '
-            return
+    # 3. Extracción programática (evita LLM)
+    respuesta = _respuesta_programatica(intencion, resultado)
+    if respuesta is not None:
+        return respuesta
     
-    # 4. Para consultas complejas, usar LLM con streaming (prompt optimizado)
-    logger.info("🤖 Usando LLM para generar respuesta (streaming)...")
-    # Prompt optimizado con tono amigable
-    prompt_content = f"""Información disponible: {contexto}
+    # 4. LLM
+    logger.info("🤖 Usando LLM para generar respuesta (async)...")
+    return await _completar_con_cache_async(intencion, _mensajes_rag(pregunta, resultado.contexto))
 
-Pregunta del estudiante: {pregunta}
 
-Usa la información proporcionada para responder de manera clara y amigable. Responde directamente lo que se pregunta, pero hazlo con un tono conversacional y servicial."""
+async def _responder_con_rag_stream_async(pregunta: str):
+    """Flujo completo de responder_con_rag_stream_async (sin caché de respuestas exactas)"""
+    # 0. Clasificar la pregunta una vez; saludos: responder sin contexto
+    intencion = clasificar_pregunta(pregunta)
+    if intencion.ruta == "saludo":
+        async with aclosing(_stream_con_cache_async(intencion, _mensajes_saludo(pregunta))) as fragmentos:
+            async for fragmento in fragmentos:
+                yield fragmento
+        return
     
-    stream = client.chat.completions.create(
-        model=model_name,
-        messages=[
-            {
-                'role': 'system',
-                'content': 'Eres prismaUNAL, un asistente virtual amigable y servicial de la carrera de Administración de Sistemas Informáticos de la UNAL Manizales. Responde de manera clara, precisa y con un tono conversacional. Sé directo pero amigable, como si estuvieras ayudando a un compañero de carrera.'
-            },
-            {
-                'role': 'user',
-                'content': prompt_content
-            }
-        ],
-        stream=True
-    )
+    # 1. Cantidad de materias e índice curricular
+    respuesta = _respuesta_sin_busqueda(intencion)
+    if respuesta is not None:
+        for fragmento in _simular_stream(respuesta):
+            yield fragmento
+        return
     
-    for chunk in stream:
-        if chunk.choices[0].delta.content is not None:
-            yield chunk.choices[0].delta.content
+    # 2. Buscar documentos relevantes
+    resultado = await buscar_documentos_async(pregunta, intencion=intencion)
+    logger.info(f"📚 Documentos recuperados: {len(resultado)}")
+    
+    # 3. Extracción programática (evita LLM)
+    respuesta = _respuesta_programatica(intencion, resultado)
+    if respuesta is not None:
+        for fragmento in _simular_stream(respuesta):
+            yield fragmento
+        return
+    
+    # 4. LLM con streaming
+    logger.info("🤖 Usando LLM para generar respuesta (streaming async)...")
+    async with aclosing(_stream_con_cache_async(intencion, _mensajes_rag(pregunta, resultado.contexto))) as fragmentos:
+        async for fragmento in fragmentos:
+            yield fragmento
+
+
+def version_corpus() -> str:
+    """
+    Versión del corpus con que se responde, para las claves de las cachés de respuestas:
+    documentos fuente (índice curricular) + lo cargado en el vectorstore (la versión que
+    cargar_chroma.py deja en la colección, o la generación del índice NumPy). No hace I/O:
+    la revisa _revisar_corpus_async al inicio de cada pregunta.
+    """
+    version = obtener_indice().version
+    # Un vectorstore sin versión (p. ej. el wrapper de LangChain) no la agrega
+    version_vectorstore = getattr(_vectorstore_cache, "version", "")
+    if version_vectorstore:
+        version = f"{version}-{version_vectorstore}"
+    return version
+
+
+async def _revisar_corpus_async():
+    """
+    Al inicio de cada pregunta, fuera del event loop: construye el índice curricular si aún
+    no existe (o lo reconstruye si cambiaron los documentos) y vuelve a leer la versión de la
+    colección de Chroma cuando toca. A partir de aquí, obtener_indice() y version_corpus()
+    responden sin esperar.
+    """
+    await obtener_indice_async()
+    vectorstore = _vectorstore_cache
+    if isinstance(vectorstore, ColeccionChroma) and vectorstore.version_vencida():
+        await asyncio.to_thread(vectorstore.revisar_version)
+
+
+def _clave_cache(pregunta: str) -> Optional[str]:
+    """Clave de la caché de respuestas (pregunta + versión del corpus), o None si está desactivada"""
+    if not cache_respuestas_activa():
+        return None
+    return clave_pregunta(pregunta, version_corpus())
+
 
+def _unir_fragmentos(fragmentos: List[str]) -> str:
+    """Respuesta completa de un stream (_simular_stream agrega un espacio tras cada palabra)"""
+    return "".join(fragmentos).rstrip(' ')
+
+
+async def responder_con_rag_async(pregunta: str):
+    """
+    Genera respuesta usando RAG con enfoque híbrido:
+    - Extracción programática para consultas estructuradas (más confiable)
+    - LLM para consultas que requieren razonamiento
+    Las respuestas se guardan en la caché de respuestas (LRU + SQLite).
+    """
+    await _revisar_corpus_async()
+    clave = _clave_cache(pregunta)
+    if clave is not None:
+        en_cache = await obtener_cache_respuestas().obtener_async(clave)
+        if en_cache is not None:
+            logger.info("💾 Respuesta desde caché")
+            return en_cache
+    
+    respuesta = await _responder_con_rag_async(pregunta)
+    
+    if clave is not None and respuesta:
+        await obtener_cache_respuestas().guardar_async(clave, respuesta)
+    return respuesta
+
+
+async def responder_con_rag_stream_async(pregunta: str):
+    """
+    Genera respuesta usando RAG con streaming (generador asíncrono de fragmentos de texto).
+    Se consume directamente en el event loop, sin ocupar un hilo del threadpool durante
+    toda la generación del LLM. Si la respuesta está en caché se reproduce palabra por
+    palabra; si no, se guarda al terminar el stream (un stream interrumpido no se guarda).
+    """
+    await _revisar_corpus_async()
+    clave = _clave_cache(pregunta)
+    if clave is not None:
+        en_cache = await obtener_cache_respuestas().obtener_async(clave)
+        if en_cache is not None:
+            logger.info("💾 Respuesta desde caché (streaming)")
+            for fragmento in _simular_stream(en_cache):
+                yield fragmento
+            return
+    
+    fragmentos = []
+    async with aclosing(_responder_con_rag_stream_async(pregunta)) as flujo:
+        async for fragmento in flujo:
+            fragmentos.append(fragmento)
+            yield fragmento
+    
+    if clave is not None and fragmentos:
+        await obtener_cache_respuestas().guardar_async(clave, _unir_fragmentos(fragmentos))
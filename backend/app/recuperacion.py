@@ -0,0 +1,83 @@
+"""
+Resultados de la búsqueda en el vectorstore como registros tipados
+
+Cada documento recuperado conserva su contenido, la metadata con que se cargó en Chroma y
+la distancia a la pregunta. Las rutas deterministas (listados y campos de una materia) leen
+los campos de la metadata; el texto de contexto para el LLM se arma solo si se necesita.
+"""
+import re
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Campos de la metadata que tienen las materias de la malla (JSON); los documentos del
+# PDF y del CSV no traen créditos ni tipología y no se consideran materias
+_CAMPOS_MATERIA = ('nombre', 'codigo', 'semestre', 'creditos', 'tipologia')
+
+# Vectorstores cargados antes de que la metadata incluyera los prerrequisitos
+_PATRON_PRERREQUISITOS = re.compile(r'^Prerrequisitos: ([^\n]+)', re.MULTILINE)
+
+
+def _valor(valor: Any) -> str:
+    texto = str(valor).strip()
+    return 'No disponible' if texto in ('', 'null', 'None') else texto
+
+
+@dataclass(frozen=True)
+class DocumentoRecuperado:
+    """Documento del vectorstore: contenido, metadata y distancia (None si no hubo ranking)"""
+    contenido: str
+    metadata: Dict[str, Any]
+    distancia: Optional[float] = None
+
+    def como_materia(self) -> Optional[Dict[str, str]]:
+        """Mismo formato que Materia.como_dict; None si el documento no es una materia de la malla"""
+        meta = self.metadata
+        if not all(campo in meta for campo in _CAMPOS_MATERIA):
+            return None
+
+        prerequisitos = meta.get('prerequisitos')
+        if prerequisitos is None:
+            encontrado = _PATRON_PRERREQUISITOS.search(self.contenido)
+            prerequisitos = encontrado.group(1) if encontrado else 'Ninguno'
+
+        return {
+            'nombre': str(meta['nombre']).strip(),
+            'codigo': str(meta['codigo']).strip(),
+            'semestre': _valor(meta['semestre']),
+            'creditos': _valor(meta['creditos']),
+            'tipologia': _valor(meta['tipologia']),
+            'prerequisitos': str(prerequisitos).strip() or 'Ninguno',
+        }
+
+
+@dataclass
+class ResultadoBusqueda:
+    """Documentos recuperados para una pregunta, en orden de relevancia"""
+    documentos: List[DocumentoRecuperado]
+
+    @classmethod
+    def desde_consulta(cls, pares: Iterable[Tuple[Any, float]]) -> "ResultadoBusqueda":
+        """Desde (Document, distancia) de similarity_search_*_with_relevance_scores"""
+        return cls([DocumentoRecuperado(doc.page_content, doc.metadata, distancia) for doc, distancia in pares])
+
+    @classmethod
+    def desde_get(cls, resultado: Dict[str, Any]) -> "ResultadoBusqueda":
+        """Desde la respuesta de vectorstore.get(where=...) (sin ranking)"""
+        return cls([
+            DocumentoRecuperado(contenido, metadata or {})
+            for contenido, metadata in zip(resultado.get('documents') or [], resultado.get('metadatas') or [])
+        ])
+
+    def __len__(self) -> int:
+        return len(self.documentos)
+
+    @cached_property
+    def materias(self) -> List[Dict[str, str]]:
+        """Materias de la malla entre los documentos recuperados, en el mismo orden"""
+        return [m for m in (d.como_materia() for d in self.documentos) if m is not None]
+
+    @cached_property
+    def contexto(self) -> str:
+        """Texto de contexto para el LLM (se arma la primera vez que se pide)"""
+        return "\n\n".join(d.contenido for d in self.documentos)
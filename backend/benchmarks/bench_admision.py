@@ -0,0 +1,130 @@
+"""
+Benchmark del control de admisión del LLM (app/admision.py) bajo un pico de preguntas
+
+Durante SEGUNDOS llegan LLEGADAS_POR_SEGUNDO preguntas por segundo a /chat (llegadas
+abiertas: no esperan a que terminen las anteriores), mezcla de saludos, que van al LLM, y
+preguntas que se responden con el índice curricular (cantidades, códigos, semestres).
+
+El LLM se simula en el proceso con un proveedor de CAPACIDAD llamadas simultáneas: cada
+respuesta son TOKENS pasos de RETARDO_TOKEN segundos, y por encima de esa capacidad cada
+paso se alarga en proporción (el proveedor reparte su cómputo entre todas las llamadas,
+como cuando OpenAI se satura). Las cachés de respuestas están desactivadas.
+
+Compara el control desactivado (LLM_MAX_CONCURRENTES=0) con el control activo: latencia de
+los saludos que se respondieron, cuántos recibieron 503, el pico de llamadas simultáneas al
+proveedor y la latencia de las preguntas deterministas, que no pasan por el control.
+
+Uso (desde backend/):
+    python benchmarks/bench_admision.py [MAX_CONCURRENTES]
+"""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.update(CACHE_RESPUESTAS="0", CACHE_SEMANTICA="0", OPENAI_API_KEY="simulada")
+
+import httpx
+import openai
+
+from app import admision
+from app.indice_curricular import obtener_indice
+from app.main import app
+
+SEGUNDOS = 10
+LLEGADAS_POR_SEGUNDO = 30
+CAPACIDAD = 8
+TOKENS = 20
+RETARDO_TOKEN = 0.025  # 20 x 25 ms = 0.5 s por respuesta sin saturar: ~16 llamadas/s
+ESPERA_MAX = 5
+PREGUNTAS_INDICE = [
+    "¿cuántas materias hay en total?",
+    "materias del tercer semestre",
+    "¿Cuál es el código de Cálculo Diferencial?",
+]
+
+_activos = 0
+_pico = 0
+
+
+class _AsyncOpenAISimulado:
+    """Sustituto de openai.AsyncOpenAI con capacidad limitada"""
+    def __init__(self, *args, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        global _activos, _pico
+        _activos += 1
+        _pico = max(_pico, _activos)
+        try:
+            for _ in range(TOKENS):
+                await asyncio.sleep(RETARDO_TOKEN * max(1.0, _activos / CAPACIDAD))
+        finally:
+            _activos -= 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="¡Hola! ¿En qué te ayudo?"))])
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    return valores[min(len(valores) - 1, int(len(valores) * p))] * 1000 if valores else float("nan")
+
+
+async def _pico_de_preguntas() -> Dict[str, float]:
+    global _pico
+    _pico = 0
+    llm: List[float] = []
+    indice: List[float] = []
+    rechazos = 0
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def una(i: int):
+            nonlocal rechazos
+            saludo = i % 3 != 0
+            pregunta = "hola" if saludo else PREGUNTAS_INDICE[i % len(PREGUNTAS_INDICE)]
+            inicio = time.perf_counter()
+            r = await client.post("/chat", json={"pregunta": pregunta})
+            duracion = time.perf_counter() - inicio
+            if r.status_code == 503:
+                assert int(r.headers["retry-after"]) >= 1
+                rechazos += 1
+                return
+            assert "respuesta" in r.json(), r.text
+            (llm if saludo else indice).append(duracion)
+
+        tareas = []
+        intervalo = 1 / LLEGADAS_POR_SEGUNDO
+        inicio = time.perf_counter()
+        for i in range(SEGUNDOS * LLEGADAS_POR_SEGUNDO):
+            tareas.append(asyncio.create_task(una(i)))
+            await asyncio.sleep(max(0.0, inicio + (i + 1) * intervalo - time.perf_counter()))
+        await asyncio.gather(*tareas)
+
+    llm.sort()
+    indice.sort()
+    return {
+        "llm_ok": len(llm), "llm_p50": _percentil(llm, 0.5), "llm_p99": _percentil(llm, 0.99),
+        "rechazos": rechazos, "pico": _pico, "indice_p99": _percentil(indice, 0.99),
+    }
+
+
+async def main(max_concurrentes: int):
+    openai.AsyncOpenAI = _AsyncOpenAISimulado
+    obtener_indice()  # fuera de la medición: el primer caso no paga la construcción del índice
+    print(f"{SEGUNDOS} s a {LLEGADAS_POR_SEGUNDO} preguntas/s (2/3 saludos), proveedor con capacidad para "
+          f"{CAPACIDAD} llamadas de {TOKENS * RETARDO_TOKEN * 1000:.0f} ms\n")
+    print(f"{'control':>22} | {'saludos ok':>10} {'p50':>8} {'p99':>8} | {'503':>5} | "
+          f"{'pico al LLM':>11} | {'índice p99':>10}")
+    for nombre, limite in (("desactivado", 0), (f"{max_concurrentes} concurrentes", max_concurrentes)):
+        admision._admision = admision.ControlAdmision(limite, 4 * max(1, limite), ESPERA_MAX)
+        r = await _pico_de_preguntas()
+        print(f"{nombre:>22} | {r['llm_ok']:>10} {r['llm_p50']:>6.0f}ms {r['llm_p99']:>6.0f}ms | "
+              f"{r['rechazos']:>5} | {r['pico']:>11} | {r['indice_p99']:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else CAPACIDAD))
@@ -0,0 +1,103 @@
+"""
+Benchmark de la búsqueda con filtros de metadata (consultas que no son de listado)
+
+Compara la recuperación anterior (vectorstore.get(where=...) de todos los documentos que
+cumplen el filtro, Document para cada uno y truncado a k en el orden de almacenamiento) con
+la actual (búsqueda por similitud restringida al filtro: Chroma ordena los documentos del
+`where` y solo se materializan los k primeros).
+
+Usa un vectorstore Chroma temporal con N documentos sintéticos y embeddings deterministas
+(DeterministicFakeEmbedding, sin llamadas a OpenAI); un 30% de los documentos son
+OPTATIVA. Para cada tamaño reporta la latencia por consulta de ambas rutas, los documentos
+materializados y el recall@k frente al top-k exacto dentro del filtro (distancia L2
+calculada con NumPy sobre los embeddings guardados).
+
+Uso (desde backend/):
+    python benchmarks/bench_busqueda_filtrada.py [N1 N2 ...]
+"""
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.rag import _busqueda_por_vector
+
+FILTRO = {"tipologia_tipo": "OPTATIVA"}
+K = 10
+CONSULTAS = [f"materias optativas sobre tema {i}" for i in range(20)]
+
+
+# Ruta anterior (referencia), copiada de _obtener_documentos_filtrados sin los mensajes
+def filtrados_anterior(vectorstore, filtro, k: int) -> List[Document]:
+    docs = vectorstore.get(where=filtro)
+    resultados = [Document(page_content=d, metadata=m or {})
+                  for d, m in zip(docs.get('documents', []), docs.get('metadatas', []))]
+    return resultados[:k]
+
+
+def construir(directorio: str, n: int) -> Chroma:
+    textos = [f"Materia: Asignatura {i}\nCódigo: {4100000 + i}\nContenido: tema {i % 97} y tema {i % 89}"
+              for i in range(n)]
+    metadatas = [{"codigo": str(4100000 + i), "tipologia_tipo": "OPTATIVA" if i % 10 < 3 else "OBLIGATORIA"}
+                 for i in range(n)]
+    vectorstore = Chroma(persist_directory=directorio, embedding_function=DeterministicFakeEmbedding(size=256))
+    for inicio in range(0, n, 5000):
+        vectorstore.add_texts(textos[inicio:inicio + 5000], metadatas[inicio:inicio + 5000])
+    return vectorstore
+
+
+def top_k_exacto(vectorstore, embeddings: np.ndarray, textos: List[str], consulta: str, k: int) -> set:
+    vector = np.asarray(vectorstore.embeddings.embed_query(consulta), dtype=np.float32)
+    distancias = ((embeddings - vector) ** 2).sum(axis=1)
+    return {textos[i] for i in np.argsort(distancias)[:k]}
+
+
+def medir(funcion, repeticiones: int = 3) -> float:
+    """Milisegundos por consulta (mejor de varias pasadas)"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for consulta in CONSULTAS:
+            funcion(consulta)
+        mejor = min(mejor, (time.perf_counter() - inicio) / len(CONSULTAS) * 1000)
+    return mejor
+
+
+def main(tamanos: List[int]):
+    logging.disable(logging.WARNING)
+    print(f"{'documentos':>10} {'en filtro':>9} | {'anterior':>9} {'docs':>6} {'recall':>6} | "
+          f"{'actual':>9} {'docs':>4} {'recall':>6} | mejora")
+    for n in tamanos:
+        with tempfile.TemporaryDirectory() as directorio:
+            vectorstore = construir(directorio, n)
+            guardados = vectorstore.get(where=FILTRO, include=["documents", "embeddings"])
+            embeddings = np.asarray(guardados["embeddings"], dtype=np.float32)
+            textos = guardados["documents"]
+
+            recall_anterior = recall_actual = 0.0
+            for consulta in CONSULTAS:
+                exacto = top_k_exacto(vectorstore, embeddings, textos, consulta, K)
+                anterior = filtrados_anterior(vectorstore, FILTRO, K)
+                actual = _busqueda_por_vector(vectorstore, vectorstore.embeddings.embed_query(consulta), K, FILTRO)
+                recall_anterior += len(exacto & {d.page_content for d in anterior}) / K
+                recall_actual += len(exacto & {d.page_content for d in actual}) / K
+
+            t_anterior = medir(lambda c: filtrados_anterior(vectorstore, FILTRO, K))
+            t_actual = medir(lambda c: _busqueda_por_vector(vectorstore, vectorstore.embeddings.embed_query(c), K, FILTRO))
+            print(f"{n:>10} {len(textos):>9} | {t_anterior:>7.1f}ms {len(textos):>6} "
+                  f"{recall_anterior / len(CONSULTAS):>6.0%} | {t_actual:>7.1f}ms {K:>4} "
+                  f"{recall_actual / len(CONSULTAS):>6.0%} | {t_anterior / t_actual:.1f}x")
+
+
+if __name__ == "__main__":
+    tamanos = [int(x) for x in sys.argv[1:]] or [1000, 10000, 50000]
+    main(tamanos)
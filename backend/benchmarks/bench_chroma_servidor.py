@@ -0,0 +1,152 @@
+"""
+Benchmark del modo cliente/servidor de Chroma frente al embebido
+
+Crea una colección con N documentos sintéticos (vectores aleatorios normalizados de
+1536 dimensiones, sin llamadas a OpenAI) en un directorio temporal, levanta un servidor
+`chroma run` sobre una copia y mide con ColeccionChroma (la clase que usa la app):
+
+- latencia del top-10 embebido, por HTTP sin caché y por HTTP con la caché de resultados
+  del worker (la misma consulta repetida)
+- la misma consulta mientras otro proceso carga documentos (upserts de LOTE documentos
+  sin pausa): en modo embebido el escritor abre los mismos archivos SQLite, en modo
+  servidor escribe a través del servidor
+- si el lector ve los documentos que cargó el otro proceso (el primero que escribió es el
+  vecino más cercano de su propio vector)
+
+Uso (desde backend/):
+    python benchmarks/bench_chroma_servidor.py [N]
+"""
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from app.coleccion_chroma import COLECCION, ColeccionChroma
+
+DIMENSION = 1536
+PUERTO = 8941
+CONSULTAS = 200
+LOTE = 200
+
+
+def aleatorios(n: int, semilla: int) -> np.ndarray:
+    vectores = np.random.default_rng(semilla).standard_normal((n, DIMENSION)).astype(np.float32)
+    return vectores / np.linalg.norm(vectores, axis=1, keepdims=True)
+
+
+def poblar(coleccion, vectores: np.ndarray, desde: int = 0):
+    for inicio in range(0, len(vectores), 1000):
+        bloque = vectores[inicio:inicio + 1000]
+        ids = [str(desde + inicio + i) for i in range(len(bloque))]
+        coleccion.upsert(ids=ids, embeddings=bloque.tolist(), documents=[f"Documento {i}" for i in ids],
+                         metadatas=[{"codigo": i, "tipologia_tipo": "OPTATIVA" if int(i) % 10 < 3 else "OBLIGATORIA"}
+                                    for i in ids])
+
+
+def escritor(directorio: str, servidor: bool, detener):
+    """Carga documentos nuevos sin pausa hasta que se le pide parar (otro proceso)"""
+    import chromadb
+    from chromadb.config import Settings
+    if servidor:
+        cliente = chromadb.HttpClient(host="127.0.0.1", port=PUERTO)
+    else:
+        cliente = chromadb.Client(Settings(is_persistent=True, persist_directory=directorio))
+    coleccion = cliente.get_or_create_collection(COLECCION, embedding_function=None)
+    desde, semilla = 10_000_000, 100
+    while not detener.is_set():
+        poblar(coleccion, aleatorios(LOTE, semilla), desde)
+        desde += LOTE
+        semilla += 1
+
+
+def abrir(directorio: str, servidor: bool, cache: bool) -> ColeccionChroma:
+    os.environ.pop("CHROMA_HOST", None)
+    if servidor:
+        os.environ.update(CHROMA_HOST="127.0.0.1", CHROMA_PUERTO=str(PUERTO))
+    os.environ["CHROMA_CACHE_MAX"] = "2048" if cache else "0"
+    coleccion = ColeccionChroma.abrir(directorio)
+    assert coleccion.modo == ("servidor" if servidor else "embebido")
+    return coleccion
+
+
+def medir(coleccion: ColeccionChroma, consultas: np.ndarray) -> Dict[str, float]:
+    latencias: List[float] = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        coleccion.similarity_search_by_vector_with_relevance_scores(consulta.tolist(), 10)
+        latencias.append(time.perf_counter() - inicio)
+    latencias.sort()
+    return {"p50": latencias[len(latencias) // 2] * 1000, "p99": latencias[int(len(latencias) * 0.99)] * 1000}
+
+
+def esperar_servidor():
+    import chromadb
+    fin = time.time() + 60
+    while True:
+        try:
+            chromadb.HttpClient(host="127.0.0.1", port=PUERTO).heartbeat()
+            return
+        except Exception:
+            if time.time() > fin:
+                raise
+            time.sleep(0.2)
+
+
+def main(n: int):
+    import chromadb
+    from chromadb.config import Settings
+
+    consultas = aleatorios(CONSULTAS, 7)
+    with tempfile.TemporaryDirectory() as temporal:
+        embebido, servido = f"{temporal}/embebido", f"{temporal}/servidor"
+        cliente = chromadb.Client(Settings(is_persistent=True, persist_directory=embebido))
+        poblar(cliente.get_or_create_collection(COLECCION, embedding_function=None), aleatorios(n, n))
+        shutil.copytree(embebido, servido)
+        proceso = subprocess.Popen(["chroma", "run", "--path", servido, "--port", str(PUERTO)],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            esperar_servidor()
+            print(f"{n} documentos, {CONSULTAS} consultas top-10\n")
+            print(f"{'modo':>26} | {'p50':>8} {'p99':>8} | {'con carga concurrente':>21} | ve lo cargado")
+            casos = [("embebido", embebido, False, False),
+                     ("servidor (sin caché)", servido, True, False),
+                     ("servidor (caché, repetida)", servido, True, True)]
+            contexto = multiprocessing.get_context("spawn")
+            for nombre, directorio, servidor, cache in casos:
+                coleccion = abrir(directorio, servidor, cache)
+                if cache:
+                    medir(coleccion, consultas)  # primera pasada: llena la caché
+                libre = medir(coleccion, consultas)
+
+                detener = contexto.Event()
+                carga = contexto.Process(target=escritor, args=(directorio, servidor, detener))
+                carga.start()
+                time.sleep(2)
+                try:
+                    ocupado = medir(coleccion, consultas)
+                finally:
+                    detener.set()
+                    carga.join()
+                if coleccion.cache is not None:
+                    coleccion.cache.limpiar()
+                cargado = aleatorios(LOTE, 100)[0].tolist()
+                (doc, _), = coleccion.similarity_search_by_vector_with_relevance_scores(cargado, 1)
+                print(f"{nombre:>26} | {libre['p50']:>6.2f}ms {libre['p99']:>6.2f}ms | "
+                      f"{ocupado['p50']:>7.2f}ms {ocupado['p99']:>8.2f}ms | "
+                      f"{'sí' if doc.metadata['codigo'] == '10000000' else 'no'}")
+        finally:
+            proceso.terminate()
+            proceso.wait()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
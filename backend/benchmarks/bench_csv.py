@@ -0,0 +1,192 @@
+"""
+Benchmark del procesador de CSV de horarios
+
+Compara el lector actual (una sola pasada en streaming: encoding detectado con una muestra
+acotada, encabezados normalizados una vez, agregación con dicts) con el lector anterior
+(chardet sobre el archivo completo, lista de filas en memoria, deduplicación con listas)
+sobre exportaciones sintéticas del registro académico, y reporta filas/s y el pico de
+memoria (RSS) de cada lector, medido en un proceso nuevo para cada ejecución.
+
+Exportaciones sintéticas:
+- utf8: UTF-8 válido, con el encabezado de asignaturas_formato.csv
+- latin1: el mismo contenido codificado en latin-1
+
+Cada grupo (código, nombre, grupo) aparece en varias filas con profesores, horarios y
+salones repetidos, como en la exportación real de toda la sede. También verifica que ambos
+lectores producen exactamente los mismos documentos, incluido el CSV real si está en
+data/documents.
+
+Uso (desde backend/):
+    python benchmarks/bench_csv.py [FILAS1 FILAS2 ...]
+"""
+import csv
+import sys
+import time
+import resource
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import procesar_csv
+from procesar_csv import corregir_encoding_texto, normalizar_nombre_columna
+
+CSV_REAL = "data/documents/asignaturas_formato.csv"
+ENCABEZADO = ["Códig", "Nombre Asignatura", "Profesor", "Grupo", "Horario Completo", "Saló"]
+DIAS = ["LUNES", "MARTES", "MIÉRCOLES", "JUEVES", "VIERNES", "SÁBADO"]
+
+
+# Lector anterior (referencia), copiado de procesar_csv.py sin los mensajes de depuración
+def csv_horarios_anterior(csv_path: str) -> List[Tuple[str, Dict[str, Any]]]:
+    import chardet
+
+    with open(csv_path, 'rb') as f:
+        encoding = chardet.detect(f.read())['encoding'] or 'utf-8'
+
+    filas = []
+    columnas_originales = []
+    for enc in ['utf-8-sig', 'utf-8', 'latin-1', 'cp1252', 'iso-8859-1', encoding]:
+        try:
+            with open(csv_path, 'r', encoding=enc, newline='') as f:
+                sample = f.read(1024)
+                f.seek(0)
+                delimiter = csv.Sniffer().sniff(sample).delimiter
+                filas = list(csv.DictReader(f, delimiter=delimiter))
+                if filas:
+                    columnas_originales = list(filas[0].keys())
+                    break
+        except (UnicodeDecodeError, csv.Error):
+            continue
+
+    columnas_normalizadas = {col: normalizar_nombre_columna(col) for col in columnas_originales}
+    grupos_agrupados: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+    for fila in filas:
+        fila_normalizada = {columnas_normalizadas.get(k, k): v for k, v in fila.items()}
+        codigo = corregir_encoding_texto(fila_normalizada.get('Código', '').strip())
+        nombre = corregir_encoding_texto(fila_normalizada.get('Nombre Asignatura', '').strip())
+        profesor = corregir_encoding_texto(fila_normalizada.get('Profesor', '').strip())
+        grupo = fila_normalizada.get('Grupo', '').strip()
+        horario = fila_normalizada.get('Horario Completo', '').strip()
+        salon = corregir_encoding_texto(fila_normalizada.get('Salón', '').strip())
+        if not codigo or not nombre:
+            continue
+        if profesor:
+            profesor = ''.join(char for char in profesor if ord(char) >= 32 or char in '\n\r\t').strip()
+        clave = (codigo, nombre, grupo)
+        if clave not in grupos_agrupados:
+            grupos_agrupados[clave] = {'codigo': codigo, 'nombre': nombre, 'grupo': grupo,
+                                       'profesores': [], 'horarios': [], 'salones': []}
+        info = grupos_agrupados[clave]
+        if profesor and profesor not in info['profesores']:
+            info['profesores'].append(profesor)
+        if horario and horario not in info['horarios']:
+            info['horarios'].append(horario)
+        if salon and salon not in info['salones']:
+            info['salones'].append(salon)
+
+    resultado = []
+    for (codigo, nombre, grupo), info in grupos_agrupados.items():
+        texto = f"Materia: {nombre}\nCódigo: {codigo}\nGrupo: {info['grupo']}"
+        if info['profesores']:
+            texto += f"\nProfesor(es): {', '.join(info['profesores'])}"
+        if info['horarios']:
+            texto += f"\nHorario: {'; '.join(info['horarios'])}"
+        if info['salones']:
+            texto += f"\nSalón(es): {'; '.join(info['salones'])}"
+        metadata = {
+            'codigo': codigo, 'nombre': nombre, 'grupo': info['grupo'], 'fuente': 'csv',
+            'tiene_profesor': len(info['profesores']) > 0,
+            'tiene_horario': len(info['horarios']) > 0,
+            'tiene_salon': len(info['salones']) > 0,
+            'num_profesores': len(info['profesores']),
+            'num_horarios': len(info['horarios']),
+            'num_salones': len(info['salones'])
+        }
+        if info['profesores']:
+            metadata['profesores'] = '; '.join(info['profesores'])
+        if info['horarios']:
+            metadata['horarios'] = '; '.join(info['horarios'])
+        if info['salones']:
+            metadata['salones'] = '; '.join(info['salones'])
+        resultado.append((texto, metadata))
+    return resultado
+
+
+def csv_horarios_actual(csv_path: str) -> List[Tuple[str, Dict[str, Any]]]:
+    return list(procesar_csv.iterar_csv_horarios(csv_path))
+
+
+def exportacion_sintetica(ruta: Path, filas: int, encoding: str):
+    """Unas 8 filas por grupo y 20 grupos por asignatura (horarios y salones repetidos)"""
+    with open(ruta, 'w', encoding=encoding, newline='') as f:
+        escritor = csv.writer(f, delimiter=';')
+        escritor.writerow(ENCABEZADO)
+        for i in range(filas):
+            grupo_global = i // 8
+            asignatura = grupo_global // 20
+            dia = DIAS[i % len(DIAS)]
+            escritor.writerow([
+                f"{4200000 + asignatura}",
+                f"Asignatura de programación {asignatura}",
+                f"Profesor Número {grupo_global % 997}",
+                f"{grupo_global % 20 + 1}",
+                f"{dia} {7 + i % 4 * 2:02d}:00 a {9 + i % 4 * 2:02d}:00.",
+                f"P{200 + i % 3} AULA MULTIMEDIA",
+            ])
+
+
+def _pico_memoria_mb() -> float:
+    # VmHWM es del espacio de memoria actual; ru_maxrss arrastra el pico del proceso padre
+    # a través del fork + exec de spawn
+    try:
+        for linea in Path("/proc/self/status").read_text().splitlines():
+            if linea.startswith("VmHWM:"):
+                return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _medir_en_proceso(funcion, ruta: str):
+    inicio = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        documentos = funcion(ruta)
+    return time.perf_counter() - inicio, _pico_memoria_mb(), documentos
+
+
+def medir(funcion, ruta: Path):
+    """(segundos, pico de RSS en MB, documentos) en un proceso nuevo (spawn: no hereda memoria)"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_medir_en_proceso, funcion, str(ruta)).result()
+
+
+def main(niveles: List[int]):
+    if Path(CSV_REAL).exists():
+        _, _, anterior = medir(csv_horarios_anterior, Path(CSV_REAL))
+        _, _, actual = medir(csv_horarios_actual, Path(CSV_REAL))
+        print(f"📄 {CSV_REAL}: resultados idénticos = {anterior == actual}\n")
+
+    print(f"{'exportación':>11} {'filas':>7} {'MB':>5} | {'anterior':>9} {'RSS':>7} | "
+          f"{'actual':>9} {'RSS':>7} {'filas/s':>9} | grupos")
+    with tempfile.TemporaryDirectory() as directorio:
+        for encoding, nombre in (("utf-8", "utf8"), ("latin-1", "latin1")):
+            for n in niveles:
+                ruta = Path(directorio) / f"{nombre}_{n}.csv"
+                exportacion_sintetica(ruta, n, encoding)
+                mb = ruta.stat().st_size / 1e6
+                t_anterior, rss_anterior, anterior = medir(csv_horarios_anterior, ruta)
+                t_actual, rss_actual, actual = medir(csv_horarios_actual, ruta)
+                assert anterior == actual, "los lectores difieren"
+                print(f"{nombre:>11} {n:>7} {mb:>5.1f} | {t_anterior:>8.2f}s {rss_anterior:>5.0f}MB | "
+                      f"{t_actual:>8.2f}s {rss_actual:>5.0f}MB {n / t_actual:>9,.0f} | {len(actual)}")
+                ruta.unlink()
+
+
+if __name__ == "__main__":
+    niveles = [int(x) for x in sys.argv[1:]] or [10000, 100000, 500000]
+    main(niveles)
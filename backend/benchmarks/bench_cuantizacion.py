@@ -0,0 +1,117 @@
+"""
+Benchmark de la representación compacta del índice vectorial NumPy
+
+Compara el índice completo (1536 dimensiones en float32) con versiones de menos
+dimensiones (recorte + renormalización, como el parámetro `dimensions` de la API) y
+cuantizadas (float16, int8 con escala por vector), todas puntuadas por
+IndiceVectorial.buscar sobre la forma compacta:
+
+- recall@5 y recall@10 frente al top-k del índice completo (cada documento hace de consulta
+  y se excluye a sí mismo del resultado)
+- memoria de la matriz (+ escalas)
+- latencia por consulta del top-10
+
+Corpus: el índice exportado por cargar_chroma.py (VECTORES_NUMPY_PATH) si existe y está en
+float32 con todas sus dimensiones. Si no, un sustituto sintético del mismo tamaño: vectores
+agrupados con la varianza concentrada en las primeras dimensiones, como en los embeddings
+text-embedding-3 (el recall del corpus real puede diferir). La latencia y la memoria se
+miden además sobre un corpus sintético de N documentos.
+
+Uso (desde backend/):
+    python benchmarks/bench_cuantizacion.py [N]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from app.indice_vectorial import IndiceVectorial, exportar, ruta_vectores_numpy
+
+DIMENSION = 1536
+DOCUMENTOS_MALLA = 280
+CONFIGURACIONES = [(None, "float32"), (None, "float16"), (None, "int8"),
+                   (512, "float32"), (512, "float16"), (512, "int8"),
+                   (256, "float32"), (256, "float16"), (256, "int8")]
+MAX_CONSULTAS = 300
+
+
+def sintetico(n: int, semilla: int = 0) -> np.ndarray:
+    """Grupos de vectores (materias parecidas) con varianza decreciente por dimensión"""
+    rng = np.random.default_rng(semilla)
+    caida = (np.arange(DIMENSION) + 1.0) ** -0.5
+    centros = rng.standard_normal((max(1, n // 8), DIMENSION)) * caida
+    vectores = centros[rng.integers(0, len(centros), n)] + 0.6 * rng.standard_normal((n, DIMENSION)) * caida
+    vectores = vectores.astype(np.float32)
+    return vectores / np.linalg.norm(vectores, axis=1, keepdims=True)
+
+
+def corpus_malla() -> Tuple[str, np.ndarray]:
+    ruta = ruta_vectores_numpy()
+    try:
+        indice = IndiceVectorial.cargar(ruta)
+        if indice.formato == "float32" and not indice.recortar_consulta and len(indice):
+            return f"{ruta} (corpus real)", np.asarray(indice.vectores)
+    except (OSError, ValueError, KeyError):
+        pass
+    return f"sintético de {DOCUMENTOS_MALLA} documentos (no hay índice float32 en {ruta})", sintetico(DOCUMENTOS_MALLA)
+
+
+def indice_con(directorio: Path, vectores: np.ndarray, dimensiones, formato: str) -> IndiceVectorial:
+    n = len(vectores)
+    destino = directorio / f"{dimensiones or 'todas'}_{formato}"
+    exportar(destino, vectores, [str(i) for i in range(n)], [""] * n, [{}] * n, dimensiones, formato)
+    return IndiceVectorial.cargar(destino)
+
+
+def vecinos(indice: IndiceVectorial, consultas: np.ndarray, filas: np.ndarray, k: int) -> List[List[int]]:
+    """Top-k de cada consulta (un documento del corpus) sin el propio documento"""
+    return [[f for f, _ in indice.buscar(c, k + 1) if f != fila][:k] for c, fila in zip(consultas, filas)]
+
+
+def recall(base: List[List[int]], otro: List[List[int]], k: int) -> float:
+    return float(np.mean([len(set(a[:k]) & set(b[:k])) / k for a, b in zip(base, otro)]))
+
+
+def latencia(indice: IndiceVectorial, consultas: np.ndarray) -> float:
+    """Milisegundos por consulta (mejor de 3 pasadas)"""
+    mejor = float("inf")
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for consulta in consultas:
+            indice.buscar(consulta, 10)
+        mejor = min(mejor, (time.perf_counter() - inicio) / len(consultas) * 1000)
+    return mejor
+
+
+def main(n_grande: int):
+    nombre, vectores = corpus_malla()
+    print(f"📚 Corpus: {nombre}\n")
+    rng = np.random.default_rng(1)
+    filas = rng.choice(len(vectores), min(MAX_CONSULTAS, len(vectores)), replace=False)
+    consultas = vectores[filas]
+    grandes = sintetico(n_grande, 2)
+    consultas_grandes = sintetico(50, 3)
+
+    with tempfile.TemporaryDirectory() as temporal:
+        directorio = Path(temporal)
+        base = None
+        print(f"{'dimensiones':>11} {'formato':>8} | {'recall@5':>8} {'recall@10':>9} | "
+              f"{'memoria':>9} {'ms/consulta':>11} | {f'memoria N={n_grande}':>16} {'ms/consulta':>11}")
+        for dimensiones, formato in CONFIGURACIONES:
+            indice = indice_con(directorio, vectores, dimensiones, formato)
+            resultado = vecinos(indice, consultas, filas, 10)
+            base = base or resultado
+            grande = indice_con(directorio / "grande", grandes, dimensiones, formato)
+            print(f"{dimensiones or DIMENSION:>11} {formato:>8} | {recall(base, resultado, 5):>8.1%} "
+                  f"{recall(base, resultado, 10):>9.1%} | {indice.bytes_vectores / 1024:>7.0f}KB "
+                  f"{latencia(indice, consultas[:50]):>11.3f} | {grande.bytes_vectores / 1e6:>14.1f}MB "
+                  f"{latencia(grande, consultas_grandes):>11.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,67 @@
+"""
+Benchmark del tiempo de importación (arranque en frío de un worker y de los scripts)
+
+Importa cada módulo en un intérprete nuevo con `python -X importtime` y reporta:
+
+- tiempo total de importación (mediana de R procesos nuevos)
+- dependencias pesadas que quedaron cargadas al terminar el import (openai, langchain_*,
+  chromadb, pypdf): lo que paga un worker antes de responder el primer saludo
+- con --detalle, las importaciones más costosas (tiempo acumulado) de cada módulo
+
+Uso (desde backend/):
+    python benchmarks/bench_importacion.py [REPETICIONES] [--detalle]
+"""
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+MODULOS = ["app.main", "app.rag", "app.llm", "app.indice_curricular", "procesar_pdf", "ingesta", "cargar_chroma"]
+PESADAS = ["openai", "langchain_openai", "langchain_community", "langchain_core", "chromadb", "pypdf", "numpy"]
+LINEA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def importar(modulo: str) -> Tuple[float, List[Tuple[int, str]], List[str]]:
+    """(ms totales, [(µs acumulados, módulo)], dependencias pesadas cargadas) en un proceso nuevo"""
+    codigo = (f"import sys, {modulo}; "
+              f"print(','.join(m for m in {PESADAS!r} if m in sys.modules))")
+    proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], cwd=BACKEND,
+                             capture_output=True, text=True, check=True)
+    acumulados = [(int(m.group(2)), m.group(4)) for m in map(LINEA.match, proceso.stderr.splitlines()) if m]
+    total = next(us for us, nombre in reversed(acumulados) if nombre == modulo)
+    cargadas = [m for m in proceso.stdout.strip().splitlines()[-1].split(",") if m] if proceso.stdout.strip() else []
+    return total / 1000, acumulados, cargadas
+
+
+def main(repeticiones: int, detalle: bool):
+    print(f"{'módulo':>22} | {'import (mediana)':>16} | dependencias pesadas cargadas")
+    detalles: Dict[str, List[Tuple[int, str]]] = {}
+    for modulo in MODULOS:
+        tiempos = []
+        for _ in range(repeticiones):
+            total, acumulados, cargadas = importar(modulo)
+            tiempos.append(total)
+        detalles[modulo] = acumulados
+        print(f"{modulo:>22} | {statistics.median(tiempos):>13.0f} ms | {', '.join(cargadas) or '-'}")
+
+    if detalle:
+        for modulo, acumulados in detalles.items():
+            print(f"\n{modulo}: importaciones más costosas (ms acumulados)")
+            vistos = set()
+            for us, nombre in sorted(acumulados, reverse=True):
+                raiz = nombre.split(".")[0]
+                if nombre == modulo or raiz in vistos:
+                    continue
+                vistos.add(raiz)
+                print(f"    {us / 1000:>8.1f}  {nombre}")
+                if len(vistos) == 10:
+                    break
+
+
+if __name__ == "__main__":
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    main(int(argumentos[0]) if argumentos else 5, "--detalle" in sys.argv)
@@ -0,0 +1,133 @@
+"""
+Benchmark del índice vectorial NumPy frente a Chroma
+
+Crea un vectorstore Chroma temporal con N documentos sintéticos y embeddings aleatorios
+normalizados de 1536 dimensiones (como text-embedding-3-small), lo exporta con
+exportar_desde_chroma y compara, para las mismas consultas (por vector, sin llamadas a
+OpenAI):
+
+- apertura: crear el cliente de Chroma o mapear el índice NumPy, más la primera consulta
+- latencia por consulta del top-10 sin filtro y con un filtro de metadata (30% de los
+  documentos), en la interfaz que usa rag.py
+- recall@10 de cada motor frente al top-10 exacto
+
+Uso (desde backend/):
+    python benchmarks/bench_indice_vectorial.py [N1 N2 ...]
+"""
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+from langchain_community.vectorstores import Chroma
+from langchain_core.embeddings import Embeddings
+
+from app.indice_vectorial import IndiceVectorial, exportar_desde_chroma
+
+DIMENSION = 1536
+K = 10
+CONSULTAS = 50
+FILTRO = {"tipologia_tipo": "OPTATIVA"}
+
+
+class EmbeddingsFijos(Embeddings):
+    """Devuelve el vector precalculado de cada texto (para cargar Chroma sin la API)"""
+
+    def __init__(self, vectores: Dict[str, List[float]]):
+        self.vectores = vectores
+
+    def embed_documents(self, textos: List[str]) -> List[List[float]]:
+        return [self.vectores[t] for t in textos]
+
+    def embed_query(self, texto: str) -> List[float]:
+        return self.vectores[texto]
+
+
+def aleatorios(n: int, semilla: int) -> np.ndarray:
+    vectores = np.random.default_rng(semilla).standard_normal((n, DIMENSION)).astype(np.float32)
+    return vectores / np.linalg.norm(vectores, axis=1, keepdims=True)
+
+
+def construir(directorio: str, vectores: np.ndarray) -> Chroma:
+    textos = [f"Materia: Asignatura {i}\nCódigo: {4100000 + i}" for i in range(len(vectores))]
+    metadatas = [{"codigo": str(4100000 + i), "tipologia_tipo": "OPTATIVA" if i % 10 < 3 else "OBLIGATORIA"}
+                 for i in range(len(vectores))]
+    embeddings = EmbeddingsFijos({t: v.tolist() for t, v in zip(textos, vectores)})
+    vectorstore = Chroma(persist_directory=directorio, embedding_function=embeddings)
+    for inicio in range(0, len(textos), 5000):
+        vectorstore.add_texts(textos[inicio:inicio + 5000], metadatas[inicio:inicio + 5000],
+                              ids=[str(i) for i in range(inicio, min(inicio + 5000, len(textos)))])
+    return vectorstore
+
+
+def exacto(vectores: np.ndarray, consulta: np.ndarray, filas: np.ndarray) -> set:
+    distancias = ((vectores[filas] - consulta) ** 2).sum(axis=1)
+    return {str(i) for i in filas[np.argsort(distancias)[:K]]}
+
+
+def medir(motor, consultas: np.ndarray, filtro) -> float:
+    """Milisegundos por consulta (mejor de 3 pasadas)"""
+    mejor = float("inf")
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for consulta in consultas:
+            motor.similarity_search_by_vector_with_relevance_scores(consulta.tolist(), K, filter=filtro)
+        mejor = min(mejor, (time.perf_counter() - inicio) / len(consultas) * 1000)
+    return mejor
+
+
+def recall(motor, vectores: np.ndarray, consultas: np.ndarray, filtro, filas: np.ndarray) -> float:
+    total = 0.0
+    for consulta in consultas:
+        pares = motor.similarity_search_by_vector_with_relevance_scores(consulta.tolist(), K, filter=filtro)
+        ids = {doc.metadata["codigo"] for doc, _ in pares}
+        total += len({str(4100000 + int(i)) for i in exacto(vectores, consulta, filas)} & ids) / K
+    return total / len(consultas)
+
+
+def main(tamanos: List[int]):
+    logging.disable(logging.WARNING)
+    print(f"{'docs':>6} {'MB':>6} | {'apertura':>17} | {'top-10':>19} | {'top-10 filtrado':>19} | recall@10 (chroma/numpy)")
+    print(f"{'':>6} {'':>6} | {'chroma':>8} {'numpy':>8} | {'chroma':>8} {'numpy':>8}  | "
+          f"{'chroma':>8} {'numpy':>8}  |")
+    for n in tamanos:
+        vectores = aleatorios(n, n)
+        consultas = aleatorios(CONSULTAS, 7)
+        todas = np.arange(n)
+        optativas = np.array([i for i in range(n) if i % 10 < 3])
+        with tempfile.TemporaryDirectory() as directorio:
+            construir(directorio + "/chroma", vectores)
+            exportar_desde_chroma(Chroma(persist_directory=directorio + "/chroma"), Path(directorio) / "numpy")
+
+            inicio = time.perf_counter()
+            chroma = Chroma(persist_directory=directorio + "/chroma")
+            chroma.similarity_search_by_vector_with_relevance_scores(consultas[0].tolist(), K)
+            apertura_chroma = (time.perf_counter() - inicio) * 1000
+
+            inicio = time.perf_counter()
+            numpy_ = IndiceVectorial.cargar(Path(directorio) / "numpy")
+            numpy_.similarity_search_by_vector_with_relevance_scores(consultas[0].tolist(), K)
+            apertura_numpy = (time.perf_counter() - inicio) * 1000
+
+            filas = []
+            for filtro in (None, FILTRO):
+                filas.append((medir(chroma, consultas, filtro), medir(numpy_, consultas, filtro)))
+            r_chroma = recall(chroma, vectores, consultas, FILTRO, optativas)
+            r_numpy = recall(numpy_, vectores, consultas, FILTRO, optativas)
+            r_chroma_total = recall(chroma, vectores, consultas, None, todas)
+            r_numpy_total = recall(numpy_, vectores, consultas, None, todas)
+
+            (c0, n0), (c1, n1) = filas
+            print(f"{n:>6} {vectores.nbytes / 1e6:>6.1f} | {apertura_chroma:>6.0f}ms {apertura_numpy:>6.0f}ms | "
+                  f"{c0:>6.2f}ms {n0:>6.2f}ms  | {c1:>6.2f}ms {n1:>6.2f}ms  | "
+                  f"{r_chroma_total:.0%}/{r_numpy_total:.0%} sin filtro, {r_chroma:.0%}/{r_numpy:.0%} con filtro")
+
+
+if __name__ == "__main__":
+    tamanos = [int(x) for x in sys.argv[1:]] or [300, 2000, 10000]
+    main(tamanos)
@@ -0,0 +1,181 @@
+"""
+Microbenchmark del clasificador de intención
+
+Compara la detección anterior (cada función vuelve a pasar la pregunta a minúsculas y
+recorre sus listas de palabras clave con `in`; el flujo de una pregunta llama a unas
+quince de ellas, algunas dos veces) con clasificar_pregunta (una pasada de la expresión
+compilada que produce la IntencionConsulta completa).
+
+La referencia reproduce las funciones anteriores de rag.py con las mismas listas de
+palabras (PALABRAS_CLAVE) y la misma secuencia de llamadas que hacía el flujo para una
+pregunta académica que termina en el LLM (el caso más caro). También verifica que ambas
+clasificaciones coinciden en todas las preguntas del conjunto.
+
+Uso (desde backend/):
+    python benchmarks/bench_intencion.py [REPETICIONES]
+"""
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.intencion import PALABRAS_CLAVE, SEMESTRES_TEXTO, clasificar_pregunta, extraer_nombre_materia_de_pregunta
+
+P = PALABRAS_CLAVE
+
+PREGUNTAS = [
+    "hola",
+    "¿Quién eres?",
+    "¿Cuántas materias obligatorias hay en el tercer semestre?",
+    "cuántos créditos suman las materias disciplinares por semestre",
+    "¿Cuál es el código de Cálculo Diferencial?",
+    "cuantos creditos tiene la materia Fundamentos de Programación?",
+    "¿Qué materias hay en el quinto semestre?",
+    "¿Cuáles son las materias fundamentales del primer semestre?",
+    "dame materias optativas sobre bases de datos",
+    "¿qué tipología tiene Bases de Datos?",
+    "explícame de qué trata la carrera y qué perfil tiene un egresado",
+    "¿Qué profesores dan Programación Orientada a Objetos y en qué horario?",
+]
+
+
+# Detección anterior (referencia): una función por pregunta de clasificación
+def detectar_semestre(query: str) -> Optional[int]:
+    for palabra, num in SEMESTRES_TEXTO.items():
+        if palabra in query:
+            return num
+    match = re.search(r'semestre\s+(\d+)', query)
+    return int(match.group(1)) if match else None
+
+
+def construir_filtro_metadata(pregunta: str) -> Optional[Dict[str, Any]]:
+    query = pregunta.lower()
+    condiciones = []
+    if any(p in query for p in P["obligatoria"]):
+        condiciones.append({"tipologia_tipo": "OBLIGATORIA"})
+    elif any(p in query for p in P["optativa"]):
+        condiciones.append({"tipologia_tipo": "OPTATIVA"})
+    if any(p in query for p in P["fundamental"]):
+        condiciones.append({"tipologia_categoria": "FUNDAMENTAL"})
+    elif any(p in query for p in P["disciplinar"]):
+        condiciones.append({"tipologia_categoria": "DISCIPLINAR"})
+    semestre = detectar_semestre(query)
+    if semestre is not None:
+        condiciones.append({"semestre": str(semestre)})
+    if not condiciones:
+        return None
+    return condiciones[0] if len(condiciones) == 1 else {"$and": condiciones}
+
+
+def es_consulta_especifica_materia(pregunta: str) -> bool:
+    query = pregunta.lower()
+    return any(p in query for p in P["especifica"])
+
+
+def es_pregunta_sobre_identidad(pregunta: str) -> bool:
+    query = pregunta.lower().strip()
+    return any(p in query for p in P["identidad"])
+
+
+def es_pregunta_academica(pregunta: str) -> bool:
+    query = pregunta.lower().strip()
+    if es_pregunta_sobre_identidad(pregunta):
+        return False
+    saludos = P["saludo"]
+    if query in saludos or any(s in query for s in saludos if len(query) < 20):
+        return False
+    return any(p in query for p in P["academica"])
+
+
+def es_consulta_sobre_cantidad(pregunta: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    query = pregunta.lower()
+    if any(p in query for p in P["no_cantidad"]):
+        return False, None
+    if not any(p in query for p in P["cantidad"]):
+        return False, None
+    filtros: Dict[str, Any] = {}
+    if any(p in query for p in P["obligatoria"]):
+        filtros['tipo'] = "OBLIGATORIA"
+    elif any(p in query for p in P["optativa"]):
+        filtros['tipo'] = "OPTATIVA"
+    if any(p in query for p in P["fundamental"]):
+        filtros['categoria'] = "FUNDAMENTAL"
+    elif any(p in query for p in P["disciplinar"]):
+        filtros['categoria'] = "DISCIPLINAR"
+    elif any(p in query for p in P["lengua_extranjera"]):
+        filtros['categoria'] = "LENGUA EXTRANJERA"
+    elif any(p in query for p in P["trabajo_de_grado"]):
+        filtros['categoria'] = "TRABAJO DE GRADO"
+    semestre = detectar_semestre(query)
+    if semestre is not None:
+        filtros['semestre'] = semestre
+    if any(p in query for p in P["medida_creditos"]):
+        filtros['medida'] = "creditos"
+    if any(p in query for p in P["desglose_semestre"]):
+        filtros['desglose'] = "semestre"
+    return True, filtros
+
+
+def es_consulta_de_listado(pregunta: str) -> Tuple[bool, Optional[int]]:
+    query = pregunta.lower()
+    return any(p in query for p in P["listado"]), detectar_semestre(query)
+
+
+def resolver_k(pregunta: str) -> int:
+    if es_consulta_especifica_materia(pregunta):
+        return 2 if extraer_nombre_materia_de_pregunta(pregunta) else 3
+    return 10
+
+
+def flujo_anterior(pregunta: str):
+    """Llamadas que hacía el flujo de rag.py para una pregunta que termina en el LLM"""
+    academica = es_pregunta_academica(pregunta)                  # paso 0
+    cantidad = es_consulta_sobre_cantidad(pregunta)              # paso 1: cantidad
+    especifica = es_consulta_especifica_materia(pregunta)        # paso 1: índice
+    nombre = extraer_nombre_materia_de_pregunta(pregunta) if especifica else None
+    listado = es_consulta_de_listado(pregunta)
+    filtro = construir_filtro_metadata(pregunta)
+    es_consulta_de_listado(pregunta)                             # paso 2: buscar_contexto
+    k = resolver_k(pregunta)
+    construir_filtro_metadata(pregunta)
+    es_consulta_especifica_materia(pregunta)                     # paso 3: programática
+    es_consulta_de_listado(pregunta)
+    es_pregunta_academica(pregunta)                              # paso 4: huella semántica
+    if es_consulta_especifica_materia(pregunta):
+        extraer_nombre_materia_de_pregunta(pregunta)
+    construir_filtro_metadata(pregunta)
+    return academica, cantidad, especifica, nombre, listado, filtro, k
+
+
+def flujo_actual(pregunta: str):
+    i = clasificar_pregunta(pregunta)
+    return (i.es_academica, (i.es_cantidad, i.filtros_cantidad), i.es_especifica, i.nombre_materia,
+            (i.es_listado, i.semestre), i.filtro_metadata, i.k)
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Microsegundos por pregunta"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for pregunta in PREGUNTAS:
+            funcion(pregunta)
+    return (time.perf_counter() - inicio) / (repeticiones * len(PREGUNTAS)) * 1e6
+
+
+def main(repeticiones: int):
+    for pregunta in PREGUNTAS:
+        assert flujo_anterior(pregunta) == flujo_actual(pregunta), f"difieren: {pregunta}"
+    print(f"✅ Misma clasificación en las {len(PREGUNTAS)} preguntas\n")
+
+    anterior = medir(flujo_anterior, repeticiones)
+    actual = medir(flujo_actual, repeticiones)
+    print(f"Flujo anterior (~15 funciones):   {anterior:7.1f} µs/pregunta")
+    print(f"clasificar_pregunta (una pasada): {actual:7.1f} µs/pregunta")
+    print(f"Mejora: {anterior / actual:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,192 @@
+"""
+Benchmark del parser de materias del PDF
+
+Compara el parser actual (máquina de estados línea por línea, página por página) con el
+parser anterior (texto completo concatenado + regex DOTALL con .+? y lookaheads) sobre
+catálogos sintéticos de 250, 500 y 1000 páginas. Se mide solo el parseo: el texto de cada
+página se genera directamente, sin pypdf (la extracción cuesta lo mismo en ambos casos).
+
+Catálogos:
+- normal: una materia por página con el formato de Contenido_de_las_asignaturas.pdf
+- sin_contenido: a las materias les falta la etiqueta "Contenido" (el regex reintenta
+  desde cada "Código" hasta el final del bloque)
+
+También verifica que ambos parsers producen exactamente las mismas materias, incluido el
+PDF real si está en data/documents.
+
+Uso (desde backend/):
+    python benchmarks/bench_pdf.py [PAGINAS1 PAGINAS2 ...]
+"""
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import procesar_pdf
+
+PDF_REAL = "data/documents/Contenido_de_las_asignaturas.pdf"
+SEMESTRES = ["Primer", "Segundo", "Tercer", "Cuarto", "Quinto", "Sexto", "Séptimo", "Octavo", "Noveno", "Décimo"]
+
+
+# Parser anterior (referencia), copiado sin cambios de procesar_pdf.py
+def extraer_materias_regex(texto: str) -> List[Dict[str, Any]]:
+    """
+    Extrae información de materias del texto del PDF.
+    
+    Formato esperado:
+    Primer semestre.
+    Código:4200910
+    Nombre: Fundamentos de Programación
+    Descripción: [texto multilínea]
+    Contenido: [texto multilínea]
+    """
+    materias = []
+    
+    # Diccionario para convertir texto de semestre a número
+    semestres_texto = {
+        "primer": 1, "primero": 1, "1er": 1, "1ro": 1,
+        "segundo": 2, "segunda": 2, "2do": 2, "2da": 2,
+        "tercer": 3, "tercero": 3, "3er": 3, "3ro": 3,
+        "cuarto": 4, "4to": 4,
+        "quinto": 5, "5to": 5,
+        "sexto": 6, "6to": 6,
+        "séptimo": 7, "septimo": 7, "7mo": 7,
+        "octavo": 8, "8vo": 8,
+        "noveno": 9, "9no": 9,
+        "décimo": 10, "decimo": 10, "10mo": 10
+    }
+    
+    # Patrón para encontrar bloques de semestre seguidos de materias
+    # Busca: "Primer semestre." seguido de materias hasta el siguiente semestre
+    patron_semestre = re.compile(
+        r'(Primer|Segundo|Tercer|Cuarto|Quinto|Sexto|Séptimo|Septimo|Octavo|Noveno|Décimo|Decimo|Primero|Segunda|Tercero|Cuarta|Quinta|Sexta|Séptima|Septima|Octava|Novena|Décima|Decima|1er|1ro|2do|2da|3er|3ro|4to|5to|6to|7mo|8vo|9no|10mo)\s+semestre\.',
+        re.IGNORECASE
+    )
+    
+    # Encontrar todas las posiciones de semestres
+    posiciones_semestres = []
+    for match in patron_semestre.finditer(texto):
+        semestre_texto = match.group(1).lower()
+        semestre_num = semestres_texto.get(semestre_texto, None)
+        posiciones_semestres.append((match.start(), match.end(), semestre_num))
+    
+    # Si no se encontraron semestres, intentar método alternativo
+    if not posiciones_semestres:
+        return procesar_pdf._extraer_materias_alternativo(texto)
+    
+    # Procesar cada bloque de semestre
+    for i, (inicio_semestre, fin_semestre, semestre_num) in enumerate(posiciones_semestres):
+        # Determinar el final del bloque (siguiente semestre o fin del texto)
+        if i + 1 < len(posiciones_semestres):
+            fin_bloque = posiciones_semestres[i + 1][0]
+        else:
+            fin_bloque = len(texto)
+        
+        bloque_texto = texto[fin_semestre:fin_bloque]
+        
+        # Buscar todas las materias en este bloque
+        # Patrón: Código:XXXXX seguido de Nombre, Descripción y Contenido
+        # El contenido puede estar en la misma línea o en líneas siguientes
+        # Nota: re.IGNORECASE hace que funcione con mayúsculas, minúsculas o cualquier combinación
+        # Los dos puntos (:) son opcionales - funciona con "Código:4200910" o "Código 4200910"
+        patron_materia = re.compile(
+            r'Código\s*:?\s*([A-Z0-9\s\-]+?)\n'
+            r'Nombre\s*:?\s*(.+?)\n'
+            r'Descripción\s*:?\s*(.+?)(?=\n\s*Contenido\s*:?)'
+            r'\n\s*Contenido\s*:?\s*(.*?)(?=\n\s*Código\s*:?|$)',
+            re.IGNORECASE | re.DOTALL
+        )
+        
+        matches = patron_materia.finditer(bloque_texto)
+        
+        for match in matches:
+            codigo = match.group(1).strip()
+            nombre = match.group(2).strip() if match.group(2) else ""
+            descripcion = match.group(3).strip() if match.group(3) else ""
+            contenido = match.group(4).strip() if match.group(4) else ""
+            
+            if codigo and nombre:
+                materia = {
+                    'codigo': codigo,
+                    'nombre': nombre,
+                    'descripcion': descripcion,
+                    'contenido': contenido,
+                    'semestre': semestre_num
+                }
+                materias.append(materia)
+    
+    # Si no se encontraron materias, intentar método alternativo
+    if not materias:
+        materias = procesar_pdf._extraer_materias_alternativo(texto)
+    
+    return materias
+
+
+def catalogo_sintetico(paginas: int, con_contenido: bool = True) -> List[str]:
+    """Texto de cada página: una materia por página, un semestre cada paginas/10 páginas"""
+    por_semestre = max(1, paginas // len(SEMESTRES))
+    etiqueta_contenido = "Contenido:" if con_contenido else "Temario:"
+    resultado = []
+    for i in range(paginas):
+        lineas = []
+        if i % por_semestre == 0:
+            semestre = SEMESTRES[min(i // por_semestre, len(SEMESTRES) - 1)]
+            lineas.append(f"Contenido de las asignaturas: {semestre} semestre. ")
+        lineas.append(f"Código:{4200000 + i} ")
+        lineas.append(f"Nombre: Asignatura sintética {i} ")
+        lineas.append("Descripción: Este curso presenta los fundamentos de la materia y su aplicación ")
+        lineas.extend(
+            f"en problemas del área; el código de ética y la práctica profesional, línea {j}. "
+            for j in range(15)
+        )
+        lineas.append(etiqueta_contenido)
+        lineas.extend(
+            f"{j}. TEMA {j} {j}.1. Conceptos básicos {j}.2. Ejercicios y casos de estudio {j}.3. "
+            for j in range(1, 31)
+        )
+        resultado.append("\n".join(lineas))
+    return resultado
+
+
+def parser_anterior(paginas: List[str]) -> List[Dict[str, Any]]:
+    texto_completo = ""
+    for pagina in paginas:
+        texto_completo += pagina + "\n"
+    return extraer_materias_regex(texto_completo)
+
+
+def parser_actual(paginas: List[str]) -> List[Dict[str, Any]]:
+    return list(procesar_pdf._iterar_materias(iter(paginas)))
+
+
+def medir(funcion, paginas: List[str]):
+    inicio = time.perf_counter()
+    materias = funcion(paginas)
+    return time.perf_counter() - inicio, materias
+
+
+def main(niveles: List[int]):
+    if Path(PDF_REAL).exists():
+        from pypdf import PdfReader
+        paginas = [p.extract_text() for p in PdfReader(PDF_REAL).pages]
+        iguales = parser_anterior(paginas) == parser_actual(paginas)
+        print(f"📄 {PDF_REAL}: resultados idénticos = {iguales}\n")
+
+    print(f"{'catálogo':>14} {'páginas':>8} {'MB':>6} | {'anterior':>10} {'actual':>10} {'mejora':>8} | materias")
+    for con_contenido, nombre in ((True, "normal"), (False, "sin_contenido")):
+        for n in niveles:
+            paginas = catalogo_sintetico(n, con_contenido)
+            mb = sum(len(p) for p in paginas) / 1e6
+            t_anterior, m_anterior = medir(parser_anterior, paginas)
+            t_actual, m_actual = medir(parser_actual, paginas)
+            assert m_anterior == m_actual, "los parsers difieren"
+            print(f"{nombre:>14} {n:>8} {mb:>6.1f} | {t_anterior:>9.3f}s {t_actual:>9.3f}s "
+                  f"{t_anterior / t_actual:>7.1f}x | {len(m_actual)}")
+
+
+if __name__ == "__main__":
+    niveles = [int(x) for x in sys.argv[1:]] or [250, 500, 1000]
+    main(niveles)
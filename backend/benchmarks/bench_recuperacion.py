@@ -0,0 +1,107 @@
+"""
+Benchmark del paso posterior a la búsqueda en las rutas deterministas
+
+Compara lo que se hacía con los documentos recuperados (unir todos los textos en un string
+de contexto y volver a extraer las materias con una expresión regular) con los registros
+tipados actuales (ResultadoBusqueda.materias lee los campos de la metadata de Chroma y el
+contexto solo se arma si la pregunta llega al LLM).
+
+Los documentos son los mismos que carga cargar_chroma.py (JSON + PDF + CSV de
+data/documents). Se mide un top-k de una consulta específica y el listado completo de un
+filtro, y se verifica que ambas rutas producen las mismas materias (el semestre vacío,
+antes 'None', ahora es 'No disponible' como en el índice curricular).
+
+Uso (desde backend/):
+    python benchmarks/bench_recuperacion.py [REPETICIONES]
+"""
+import re
+import sys
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.recuperacion import DocumentoRecuperado, ResultadoBusqueda
+from procesar_csv import procesar_csv_horarios
+from procesar_json import procesar_malla_curricular
+from procesar_pdf import procesar_pdf_materias
+
+DOCUMENTOS = "data/documents"
+
+
+# Extracción anterior (referencia), copiada de rag.py
+def extraer_materias_del_contexto(contexto: str) -> List[Dict[str, str]]:
+    materias = []
+    patron = r'Materia: ([^\n]+)\nCódigo: ([^\n]+)\nSemestre: ([^\n]+)\nCréditos: ([^\n]+)\nTipología: ([^\n]+)(?:\nPrerrequisitos: ([^\n]+))?'
+    for match in re.finditer(patron, contexto):
+        materias.append({
+            'nombre': match.group(1).strip(),
+            'codigo': match.group(2).strip(),
+            'semestre': match.group(3).strip(),
+            'creditos': match.group(4).strip(),
+            'tipologia': match.group(5).strip(),
+            'prerequisitos': match.group(6).strip() if match.group(6) else 'Ninguno'
+        })
+    return materias
+
+
+def anterior(documentos: List[DocumentoRecuperado]) -> List[Dict[str, str]]:
+    contexto = "\n\n".join(d.contenido for d in documentos)
+    return extraer_materias_del_contexto(contexto)
+
+
+def _equivalentes(materias: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    # El texto dice "Semestre: None" donde la metadata guarda 'null'; ahora es 'No disponible'
+    return [dict(m, semestre='No disponible') if m['semestre'] == 'None' else m for m in materias]
+
+
+def actual(documentos: List[DocumentoRecuperado]) -> List[Dict[str, str]]:
+    # Un ResultadoBusqueda nuevo por consulta, como en el flujo
+    return ResultadoBusqueda(documentos).materias
+
+
+def cargar() -> List[DocumentoRecuperado]:
+    documentos = []
+    with redirect_stdout(StringIO()):
+        for procesar, nombre in ((procesar_malla_curricular, "malla_curricular_administracion_sistemas_informaticos.json"),
+                                 (procesar_pdf_materias, "Contenido_de_las_asignaturas.pdf"),
+                                 (procesar_csv_horarios, "asignaturas_formato.csv")):
+            ruta = Path(DOCUMENTOS) / nombre
+            if ruta.exists():
+                textos, metadatas = procesar(str(ruta))
+                documentos += [DocumentoRecuperado(t, m) for t, m in zip(textos, metadatas)]
+    return documentos
+
+
+def medir(funcion, documentos, repeticiones: int) -> float:
+    """Microsegundos por consulta"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion(documentos)
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def main(repeticiones: int):
+    documentos = cargar()
+    malla = [d for d in documentos if 'tipologia' in d.metadata]
+    # Top-k mezclado (materias, descripciones del PDF y grupos del CSV) y listado de un filtro
+    casos = {
+        "top-10 mezclado": documentos[::max(1, len(documentos) // 10)][:10],
+        "listado (malla)": malla,
+        "todo el corpus": documentos,
+    }
+    print(f"{'caso':>16} {'docs':>5} {'contexto':>9} | {'anterior':>9} | {'actual':>9} | mejora")
+    for nombre, docs in casos.items():
+        assert _equivalentes(anterior(docs)) == actual(docs), f"difieren: {nombre}"
+        caracteres = sum(len(d.contenido) for d in docs)
+        t_anterior = medir(anterior, docs, repeticiones)
+        t_actual = medir(actual, docs, repeticiones)
+        print(f"{nombre:>16} {len(docs):>5} {caracteres:>8,}c | {t_anterior:>7.1f}µs | "
+              f"{t_actual:>7.1f}µs | {t_anterior / t_actual:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,99 @@
+"""
+Benchmark del resolvedor de materias del índice curricular
+
+Genera variantes de los nombres y códigos de todas las materias del índice (JSON + PDF +
+CSV) y compara la búsqueda anterior (buscar_nombre: nombre exacto normalizado o contención
+en ambos sentidos) con IndiceCurricular.resolver (código, nombre exacto o por contención y,
+si nada coincide, nombre aproximado por trigramas):
+
+- exacto:     el nombre tal como está en la malla
+- mayúsculas: en mayúsculas y sin tildes
+- código:     el código, con y sin sufijo de sede ('1000004-Z')
+- errata:     una letra cambiada, omitida o transpuesta (posición fija por nombre)
+
+Reporta el porcentaje de variantes que resuelven al código correcto y la latencia de cada
+búsqueda (mediana, p99 y máximo). También verifica los ejemplos de referencia
+("calculo diferencial", "CÁLCULO DIFERENCIA", "4200910").
+
+Uso (desde backend/):
+    python benchmarks/bench_resolver.py [REPETICIONES]
+"""
+import sys
+import time
+import statistics
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.indice_curricular import IndiceCurricular, Materia, construir_indice, normalizar_texto
+
+EJEMPLOS = {"calculo diferencial": "1000004", "CÁLCULO DIFERENCIA": "1000004", "4200910": "4200910"}
+
+
+def errata(nombre: str, semilla: int) -> str:
+    """Cambia, omite o transpone una letra de la mitad del nombre (determinista)"""
+    i = len(nombre) // 2 + semilla % 3
+    while i < len(nombre) - 1 and not nombre[i].isalpha():
+        i += 1
+    operacion = semilla % 3
+    if operacion == 0:
+        return nombre[:i] + ("x" if nombre[i] != "x" else "z") + nombre[i + 1:]
+    if operacion == 1:
+        return nombre[:i] + nombre[i + 1:]
+    return nombre[:i] + nombre[i + 1] + nombre[i] + nombre[i + 2:]
+
+
+def variantes(indice: IndiceCurricular) -> Dict[str, List[Tuple[str, str]]]:
+    """(texto, código esperado) por tipo de variante"""
+    casos: Dict[str, List[Tuple[str, str]]] = {"exacto": [], "mayúsculas": [], "código": [], "errata": []}
+    for n, materia in enumerate(indice.materias):
+        casos["exacto"].append((materia.nombre, materia.codigo))
+        casos["mayúsculas"].append((normalizar_texto(materia.nombre).upper(), materia.codigo))
+        casos["código"].append((materia.codigo, materia.codigo))
+        casos["código"].append((f"{materia.codigo}-Z", materia.codigo))
+        if len(materia.nombre) >= 8:
+            casos["errata"].append((errata(materia.nombre, n), materia.codigo))
+    return casos
+
+
+def medir(buscar: Callable[[str], Optional[Materia]], casos: List[Tuple[str, str]],
+          repeticiones: int) -> Tuple[float, List[float]]:
+    """(fracción resuelta al código correcto, latencias en µs)"""
+    aciertos = 0
+    latencias = []
+    for texto, esperado in casos:
+        materia = buscar(texto)
+        aciertos += materia is not None and materia.codigo == esperado
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            buscar(texto)
+        latencias.append((time.perf_counter() - inicio) / repeticiones * 1e6)
+    return aciertos / len(casos), latencias
+
+
+def main(repeticiones: int):
+    with redirect_stdout(StringIO()):
+        indice = construir_indice()
+    print(f"🗂️ {len(indice)} materias, {len(indice.por_nombre)} nombres, {len(indice.por_trigrama)} trigramas\n")
+
+    for texto, esperado in EJEMPLOS.items():
+        materia = indice.resolver(texto)
+        assert materia is not None and materia.codigo == esperado, f"{texto!r} no resuelve a {esperado}"
+        print(f"✅ {texto!r:>22} -> {materia.codigo} {materia.nombre}")
+    print()
+
+    print(f"{'variante':>11} {'casos':>5} | {'anterior':>8} | {'resolver':>8} {'mediana':>9} {'p99':>9} {'máx':>9}")
+    for tipo, casos in variantes(indice).items():
+        anterior, _ = medir(indice.buscar_nombre, casos, 1)
+        actual, latencias = medir(indice.resolver, casos, repeticiones)
+        latencias.sort()
+        p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))]
+        print(f"{tipo:>11} {len(casos):>5} | {anterior:>7.0%} | {actual:>7.0%} "
+              f"{statistics.median(latencias):>7.1f}µs {p99:>7.1f}µs {latencias[-1]:>7.1f}µs")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
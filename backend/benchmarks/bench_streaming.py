@@ -0,0 +1,157 @@
+"""
+Benchmark de concurrencia de /chat/stream
+
+Compara el endpoint SSE actual (generador asíncrono) con la implementación anterior
+(generador síncrono que Starlette ejecuta en el threadpool de anyio, ~40 hilos).
+
+El LLM se simula con un stream que emite TOKENS fragmentos separados por RETARDO_TOKEN
+segundos, así que el benchmark mide la capa HTTP/SSE y no la latencia de OpenAI.
+Las preguntas son saludos ("hola"), que van directo al LLM sin tocar el vectorstore.
+
+Uso (desde backend/):
+    python benchmarks/bench_streaming.py [N1 N2 ...]
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+import openai
+from fastapi.responses import StreamingResponse
+
+from app import rag
+from app.llm import obtener_cliente
+from app.main import app, Pregunta
+
+TOKENS = 20
+RETARDO_TOKEN = 0.05  # 20 x 50 ms = 1 s de generación por respuesta
+
+_activos = 0
+_pico = 0
+_lock = threading.Lock()
+
+
+def _chunk(texto):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=texto))])
+
+
+def _entrar():
+    global _activos, _pico
+    with _lock:
+        _activos += 1
+        _pico = max(_pico, _activos)
+
+
+def _salir():
+    global _activos
+    with _lock:
+        _activos -= 1
+
+
+class _StreamSync:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def __iter__(self):
+        for i in range(TOKENS):
+            _entrar()
+            time.sleep(RETARDO_TOKEN)
+            _salir()
+            yield _chunk(f"t{i} ")
+
+
+class _StreamAsync:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def __aiter__(self):
+        for i in range(TOKENS):
+            _entrar()
+            await asyncio.sleep(RETARDO_TOKEN)
+            _salir()
+            yield _chunk(f"t{i} ")
+
+
+class _OpenAISimulado:
+    """Sustituto de openai.OpenAI (app.llm lo instancia como cliente compartido)"""
+    def __init__(self, *args, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        return _StreamSync()
+
+
+class _AsyncOpenAISimulado:
+    """Sustituto de openai.AsyncOpenAI (app.llm lo instancia como cliente compartido)"""
+    def __init__(self, *args, **kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        return _StreamAsync()
+
+
+@app.post("/bench/chat/stream-sync")
+async def chat_stream_sync(pregunta: Pregunta):
+    """Réplica del endpoint anterior: generador síncrono (cliente síncrono de OpenAI) -> threadpool"""
+    def generate():
+        stream = obtener_cliente().chat.completions.create(
+            model=rag.MODELO_LLM, messages=rag._mensajes_saludo(pregunta.pregunta), stream=True
+        )
+        with stream:
+            for chunk in stream:
+                yield f"data: {json.dumps({'content': chunk.choices[0].delta.content})}\n\n"
+        yield f"data: {json.dumps({'done': True})}\n\n"
+
+    return StreamingResponse(generate(), media_type="text/event-stream")
+
+
+async def _medir(ruta: str, concurrentes: int):
+    """
+    Lanza `concurrentes` streams a la vez y devuelve (segundos, pico de streams generando
+    simultáneamente, es decir, esperando el siguiente token al mismo tiempo)
+    """
+    global _pico
+    _pico = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def una():
+            r = await client.post(ruta, json={"pregunta": "hola"})
+            assert '"done": true' in r.text
+        inicio = time.perf_counter()
+        await asyncio.gather(*(una() for _ in range(concurrentes)))
+        return time.perf_counter() - inicio, _pico
+
+
+async def main(niveles):
+    openai.OpenAI = _OpenAISimulado
+    openai.AsyncOpenAI = _AsyncOpenAISimulado
+    # Sin control de admisión ni cachés de respuestas: se mide la capa HTTP/SSE con todos
+    # los streams generando a la vez
+    os.environ.update(LLM_MAX_CONCURRENTES="0", CACHE_RESPUESTAS="0", CACHE_SEMANTICA="0")
+    generacion = TOKENS * RETARDO_TOKEN
+
+    print(f"⏱️  Generación simulada por respuesta: {generacion:.2f}s ({TOKENS} tokens)\n")
+    print(f"{'streams':>8} | {'sync+threadpool':>24} | {'async':>24}")
+    print(f"{'':>8} | {'tiempo':>10} {'pico':>13} | {'tiempo':>10} {'pico':>13}")
+    for n in niveles:
+        t_sync, p_sync = await _medir("/bench/chat/stream-sync", n)
+        t_async, p_async = await _medir("/chat/stream", n)
+        print(f"{n:>8} | {t_sync:>9.2f}s {p_sync:>13} | {t_async:>9.2f}s {p_async:>13}")
+
+
+if __name__ == "__main__":
+    niveles = [int(x) for x in sys.argv[1:]] or [40, 200, 1000]
+    asyncio.run(main(niveles))
@@ -0,0 +1,164 @@
+"""
+Benchmark del servidor de producción: 1 worker frente a N workers (gunicorn.conf.py)
+
+Levanta `gunicorn app.main:app -c gunicorn.conf.py` con cada número de workers, espera a
+que todos respondan /ready y mide durante SEGUNDOS con CONCURRENCIA clientes:
+
+- índice: preguntas que se responden con el índice curricular (trabajo de CPU del worker)
+- llm: saludos, que van al LLM; el LLM es un servidor HTTP local compatible con la API de
+  OpenAI que responde después de RETARDO_LLM segundos (sin cachés de respuestas)
+
+Al final de cada corrida reporta la memoria del master + workers (PSS, que reparte entre
+los procesos las páginas compartidas copy-on-write), con y sin precarga en el master.
+El cliente de carga corre en la misma máquina y compite por la CPU con los workers.
+
+Uso (desde backend/):
+    python benchmarks/bench_workers.py [N1 N2 ...]
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+BACKEND = Path(__file__).resolve().parent.parent
+PUERTO = 8931
+PUERTO_LLM = 8932
+SEGUNDOS = 8
+CONCURRENCIA = 32
+RETARDO_LLM = 0.2
+PREGUNTAS_INDICE = [
+    "¿cuántas materias hay en total?",
+    "materias del tercer semestre",
+    "¿Cuál es el código de Cálculo Diferencial?",
+    "cuantos creditos tiene Fundamentos de Programación?",
+]
+
+
+class _LLMSimulado(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        time.sleep(RETARDO_LLM)
+        cuerpo = json.dumps({
+            "id": "x", "object": "chat.completion", "created": 0, "model": "simulado",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "¡Hola! ¿En qué te ayudo?"}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+def iniciar_llm():
+    servidor = ThreadingHTTPServer(("127.0.0.1", PUERTO_LLM), _LLMSimulado)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+
+def levantar(workers: int, precarga: bool) -> subprocess.Popen:
+    entorno = dict(os.environ, SERVIDOR_WORKERS=str(workers), SERVIDOR_BIND=f"127.0.0.1:{PUERTO}",
+                   SERVIDOR_PRECARGA="1" if precarga else "0", SERVIDOR_MAX_PETICIONES="0",
+                   OPENAI_API_KEY="simulada", OPENAI_BASE_URL=f"http://127.0.0.1:{PUERTO_LLM}/v1",
+                   CACHE_RESPUESTAS="0", CACHE_SEMANTICA="0")
+    return subprocess.Popen([sys.executable, "-m", "gunicorn", "app.main:app", "-c", "gunicorn.conf.py"],
+                            cwd=BACKEND, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def esperar_workers(workers: int, limite: float = 60):
+    """Hasta que /ready responde 200 desde `workers` procesos distintos"""
+    listos = set()
+    fin = time.time() + limite
+    while len(listos) < workers:
+        if time.time() > fin:
+            raise TimeoutError(f"Solo {len(listos)} de {workers} workers respondieron /ready")
+        try:
+            # Conexión nueva por intento para que el kernel la reparta entre workers
+            with httpx.Client() as cliente:
+                respuesta = cliente.get(f"http://127.0.0.1:{PUERTO}/ready")
+            if respuesta.status_code == 200:
+                # Las duraciones del calentamiento identifican al worker que respondió
+                listos.add(json.dumps(respuesta.json()["componentes"], sort_keys=True))
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+
+
+def procesos(raiz: int) -> List[int]:
+    hijos = Path(f"/proc/{raiz}/task/{raiz}/children").read_text().split()
+    return [raiz] + [int(h) for h in hijos]
+
+
+def memoria_mb(pids: List[int]) -> Dict[str, float]:
+    """PSS y RSS sumados (MB) de los procesos"""
+    total = {"pss": 0.0, "rss": 0.0}
+    for pid in pids:
+        for linea in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+            campo, _, valor = linea.partition(":")
+            if campo in ("Pss", "Rss"):
+                total[campo.lower()] += int(valor.split()[0]) / 1024
+    return total
+
+
+async def carga(preguntas: List[str]) -> Dict[str, float]:
+    latencias: List[float] = []
+    fin = time.perf_counter() + SEGUNDOS
+
+    async def cliente(i: int, http: httpx.AsyncClient):
+        n = i
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            respuesta = await http.post(f"http://127.0.0.1:{PUERTO}/chat",
+                                        json={"pregunta": preguntas[n % len(preguntas)]})
+            respuesta.raise_for_status()
+            latencias.append(time.perf_counter() - inicio)
+            n += 1
+
+    limites = httpx.Limits(max_connections=CONCURRENCIA)
+    async with httpx.AsyncClient(limits=limites, timeout=60) as http:
+        await asyncio.gather(*(cliente(i, http) for i in range(CONCURRENCIA)))
+    latencias.sort()
+    return {
+        "rps": len(latencias) / SEGUNDOS,
+        "p50": latencias[len(latencias) // 2] * 1000,
+        "p99": latencias[int(len(latencias) * 0.99)] * 1000,
+    }
+
+
+def main(tamanos: List[int]):
+    iniciar_llm()
+    print(f"CPUs: {os.cpu_count()}, {CONCURRENCIA} clientes, {SEGUNDOS} s por caso, LLM simulado de {RETARDO_LLM * 1000:.0f} ms\n")
+    print(f"{'workers':>7} {'precarga':>8} | {'índice req/s':>12} {'p50':>7} {'p99':>7} | "
+          f"{'llm req/s':>9} {'p50':>7} {'p99':>7} | {'PSS total':>9} {'RSS total':>9}")
+    for workers in tamanos:
+        for precarga in (True, False):
+            servidor = levantar(workers, precarga)
+            try:
+                esperar_workers(workers)
+                indice = asyncio.run(carga(PREGUNTAS_INDICE))
+                llm = asyncio.run(carga(["hola"]))
+                memoria = memoria_mb(procesos(servidor.pid))
+            finally:
+                servidor.terminate()
+                servidor.wait()
+            print(f"{workers:>7} {'sí' if precarga else 'no':>8} | {indice['rps']:>12.0f} {indice['p50']:>5.0f}ms "
+                  f"{indice['p99']:>5.0f}ms | {llm['rps']:>9.0f} {llm['p50']:>5.0f}ms {llm['p99']:>5.0f}ms | "
+                  f"{memoria['pss']:>7.0f}MB {memoria['rss']:>7.0f}MB")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [1, 2, 4])
@@ -0,0 +1,116 @@
+"""
+Caché en disco del texto por página de los PDF (para procesar_pdf.py)
+
+Guarda el texto de cada página con clave hash del archivo + número de página: un PDF que no
+cambió se vuelve a procesar sin abrir pypdf, y uno modificado tiene otro hash, así sus
+páginas anteriores dejan de coincidir solas. Solo usa la biblioteca estándar (sqlite3),
+para que los procesadores no dependan del paquete de la app.
+
+Las páginas se eliminan por archivo completo: cuando se supera el máximo de páginas salen
+primero los PDF leídos hace más tiempo.
+
+Configuración por variables de entorno:
+    PDF_CACHE            1 para activar la caché de páginas (por defecto), 0 para desactivar
+    PDF_CACHE_PATH       Archivo SQLite de la caché (data/cache/paginas_pdf.sqlite3)
+    PDF_CACHE_MAX        Páginas máximas en la caché (100000)
+"""
+import os
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# La hora de lectura de un PDF se actualiza a lo sumo una vez por intervalo (una lectura no
+# se convierte en escritura cada vez)
+_SEGUNDOS_ENTRE_ACCESOS = 300
+
+
+class CachePaginas:
+    """Páginas de texto por hash de PDF en SQLite (una conexión por hilo, WAL)"""
+
+    def __init__(self, ruta: str, max_paginas: int):
+        self.ruta = ruta
+        self.max_paginas = max_paginas
+        self._local = threading.local()
+        Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+        conexion = self._conexion()
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS pdf_archivos ("
+            " hash TEXT PRIMARY KEY, paginas INTEGER NOT NULL, accedido REAL NOT NULL)"
+        )
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS pdf_paginas ("
+            " hash TEXT NOT NULL, numero INTEGER NOT NULL, texto TEXT NOT NULL,"
+            " PRIMARY KEY (hash, numero))"
+        )
+
+    def _conexion(self) -> sqlite3.Connection:
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def leer(self, hash_pdf: str) -> Tuple[Optional[int], Dict[int, str]]:
+        """(número de páginas o None si el PDF no está, {página: texto} de las guardadas)"""
+        conexion = self._conexion()
+        fila = conexion.execute("SELECT paginas, accedido FROM pdf_archivos WHERE hash = ?", (hash_pdf,)).fetchone()
+        if fila is None:
+            return None, {}
+        total, accedido = fila
+        ahora = time.time()
+        if ahora - accedido >= _SEGUNDOS_ENTRE_ACCESOS:
+            conexion.execute("UPDATE pdf_archivos SET accedido = ? WHERE hash = ?", (ahora, hash_pdf))
+        paginas = dict(conexion.execute("SELECT numero, texto FROM pdf_paginas WHERE hash = ?", (hash_pdf,)))
+        return total, paginas
+
+    def guardar(self, hash_pdf: str, total: int, paginas: List[Tuple[int, str]]):
+        """Guarda páginas nuevas de un PDF (y su número de páginas) en una sola transacción"""
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute("BEGIN")
+            conexion.execute("INSERT OR REPLACE INTO pdf_archivos (hash, paginas, accedido) VALUES (?, ?, ?)",
+                             (hash_pdf, total, time.time()))
+            conexion.executemany("INSERT OR REPLACE INTO pdf_paginas (hash, numero, texto) VALUES (?, ?, ?)",
+                                 [(hash_pdf, numero, texto) for numero, texto in paginas])
+        self._limitar()
+
+    def _limitar(self):
+        """Elimina los PDF leídos hace más tiempo mientras se supere max_paginas"""
+        conexion = self._conexion()
+        exceso = conexion.execute("SELECT COUNT(*) FROM pdf_paginas").fetchone()[0] - self.max_paginas
+        for hash_pdf, paginas in conexion.execute("SELECT hash, paginas FROM pdf_archivos ORDER BY accedido").fetchall():
+            if exceso <= 0:
+                break
+            with conexion:
+                conexion.execute("BEGIN")
+                conexion.execute("DELETE FROM pdf_paginas WHERE hash = ?", (hash_pdf,))
+                conexion.execute("DELETE FROM pdf_archivos WHERE hash = ?", (hash_pdf,))
+            exceso -= paginas
+
+
+_cache_paginas: Optional[CachePaginas] = None
+
+
+def obtener_cache_paginas() -> Optional[CachePaginas]:
+    """Caché de páginas del proceso (None si está desactivada o no se puede abrir)"""
+    global _cache_paginas
+    if _cache_paginas is None and os.getenv("PDF_CACHE", "1") != "0":
+        try:
+            _cache_paginas = CachePaginas(
+                os.getenv("PDF_CACHE_PATH", "data/cache/paginas_pdf.sqlite3"),
+                int(os.getenv("PDF_CACHE_MAX", "100000"))
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️  Caché de páginas no disponible: {e}")
+            return None
+    return _cache_paginas
+
+
+def cerrar_cache_paginas():
+    """Suelta la caché de páginas de este proceso (sus conexiones SQLite no se heredan en un fork)"""
+    global _cache_paginas
+    _cache_paginas = None
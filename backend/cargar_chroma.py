@@ -1,91 +1,79 @@
 """
 Script para cargar textos en Chroma usando embeddings de OpenAI con metadata
-Soporta múltiples formatos: JSON, PDF y CSV
+Soporta múltiples formatos: JSON, PDF y CSV (todos los archivos de data/documents)
 """
-from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
-from procesar_json import procesar_malla_curricular
-from procesar_pdf import procesar_pdf_materias
-from procesar_csv import procesar_csv_horarios
-import shutil
-import os
+from app.cache_embeddings import con_cache
+from embeber import EmbeddingsPorLotes
+from ingesta import ingerir, ManifiestoIngesta, PROCESADORES
+from app.indice_vectorial import exportar_desde_chroma, ruta_vectores_numpy
+from app.coleccion_chroma import crear_cliente_chroma, servidor_chroma, guardar_version_corpus
 from pathlib import Path
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
 load_dotenv()
 
-# 0. Eliminar vectorstore anterior si existe (para re-cargar con metadata)
+documentos_path = "data/documents"
 vectorstore_path = Path("data/vectorstore")
-if vectorstore_path.exists():
-    print("🗑️  Eliminando vectorstore anterior para re-cargar con metadata...")
-    shutil.rmtree(vectorstore_path)
 
-# 1. Procesar documentos (JSON y/o PDF)
-todos_textos = []
-todas_metadatas = []
 
-# Procesar JSON si existe
-json_path = "data/documents/malla_curricular_administracion_sistemas_informaticos.json"
-if Path(json_path).exists():
-    print("📖 Procesando JSON...")
-    textos_json, metadatas_json = procesar_malla_curricular(json_path)
-    todos_textos.extend(textos_json)
-    todas_metadatas.extend(metadatas_json)
-    print(f"✅ {len(textos_json)} materias del JSON procesadas\n")
-else:
-    print(f"⚠️  JSON no encontrado en: {json_path}\n")
+def main():
+    if not Path(documentos_path).exists():
+        print(f"❌ Error: No existe el directorio {documentos_path}")
+        print(f"   Coloca ahí los documentos a cargar ({', '.join(PROCESADORES)})")
+        exit(1)
 
-# Procesar PDF si existe
-pdf_path = "data/documents/Contenido_de_las_asignaturas.pdf"
-if Path(pdf_path).exists():
-    print("📄 Procesando PDF...")
-    textos_pdf, metadatas_pdf = procesar_pdf_materias(pdf_path)
-    todos_textos.extend(textos_pdf)
-    todas_metadatas.extend(metadatas_pdf)
-    print(f"✅ {len(textos_pdf)} materias del PDF procesadas\n")
-else:
-    print(f"⚠️  PDF no encontrado en: {pdf_path}")
-    print("   Si tienes un PDF, colócalo en esa ruta para procesarlo.\n")
+    # 1. Crear embeddings usando text-embedding-3-small de OpenAI
+    # Lotes concurrentes con backoff (EMBEDDING_LOTE, EMBEDDING_CONCURRENCIA...), detrás de la
+    # misma caché persistente que usa la app: los textos ya vistos no vuelven a la API
+    print("🔗 Creando embeddings con text-embedding-3-small (OpenAI)...")
+    modelo_embeddings = "text-embedding-3-small"
+    embeddings_api = EmbeddingsPorLotes(modelo_embeddings)
+    embeddings = con_cache(embeddings_api, modelo_embeddings)
 
-# Procesar CSV si existe
-csv_path = "data/documents/asignaturas_formato.csv"
-if Path(csv_path).exists():
-    print("📊 Procesando CSV...")
-    textos_csv, metadatas_csv = procesar_csv_horarios(csv_path)
-    todos_textos.extend(textos_csv)
-    todas_metadatas.extend(metadatas_csv)
-    print(f"✅ {len(textos_csv)} grupos del CSV procesados\n")
-else:
-    print(f"⚠️  CSV no encontrado en: {csv_path}")
-    print("   Si tienes un CSV, colócalo en esa ruta para procesarlo.\n")
+    # 2. Abrir (o crear) el vector store: embebido en data/vectorstore, o en el servidor de
+    # Chroma si hay CHROMA_HOST (sin volver al embebido si no responde: la app no lo vería)
+    try:
+        cliente, _ = crear_cliente_chroma(str(vectorstore_path), respaldo_embebido=False)
+    except Exception as e:
+        print(f"❌ Error: No se pudo conectar al servidor de Chroma {servidor_chroma()}: {e}")
+        exit(1)
+    vectorstore = Chroma(client=cliente, embedding_function=embeddings)
 
-if not todos_textos:
-    print("❌ Error: No se encontraron documentos para procesar.")
-    print("   Asegúrate de tener al menos un JSON o PDF en data/documents/")
-    exit(1)
+    # 3. Procesar los documentos en paralelo y cargar solo lo nuevo o modificado
+    # (los hashes de contenido se guardan en el manifiesto local, uno por destino)
+    servidor = servidor_chroma()
+    nombre_manifiesto = "manifiesto.json" if servidor is None else f"manifiesto_{servidor[0]}_{servidor[1]}.json"
+    manifiesto = ManifiestoIngesta(vectorstore_path / nombre_manifiesto)
+    resumen = ingerir(documentos_path, vectorstore, manifiesto)
 
-print(f"📊 Total de documentos a cargar: {len(todos_textos)}")
-print(f"   - JSON: {len([m for m in todas_metadatas if m.get('fuente') not in ['pdf', 'csv']])}")
-print(f"   - PDF: {len([m for m in todas_metadatas if m.get('fuente') == 'pdf'])}")
-print(f"   - CSV: {len([m for m in todas_metadatas if m.get('fuente') == 'csv'])}\n")
+    if resumen["documentos"] == 0:
+        print("❌ Error: No se encontraron documentos para procesar.")
+        print("   Asegúrate de tener al menos un JSON o PDF en data/documents/")
+        exit(1)
 
-# 2. Crear embeddings usando text-embedding-3-small de OpenAI
-print("🔗 Creando embeddings con text-embedding-3-small (OpenAI)...")
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-3-small"
-)
+    # 4. Publicar la versión del corpus en la colección: la API la lee y deja de responder
+    # desde sus cachés lo que se respondió con el corpus anterior
+    guardar_version_corpus(cliente, manifiesto.version)
 
-# 3. Crear Chroma vector store con metadata
-print("💾 Creando vector store en Chroma con metadata...")
-vectorstore = Chroma.from_texts(
-    texts=todos_textos,
-    metadatas=todas_metadatas,
-    embedding=embeddings,
-    persist_directory="data/vectorstore"
-)
+    # 5. Exportar embeddings y metadata al índice NumPy (MOTOR_VECTORIAL=numpy en la app),
+    # con las dimensiones y el formato de VECTORES_DIMENSIONES y VECTORES_FORMATO
+    exportados = exportar_desde_chroma(vectorstore, ruta_vectores_numpy())
+    print(f"🧮 Índice NumPy exportado: {exportados} vectores en {ruta_vectores_numpy()}")
 
-print(f"✅ {len(todos_textos)} documentos cargados en Chroma con metadata")
-print(f"📁 Vector store guardado en: data/vectorstore")
-print("\n✅ ¡Listo! El vectorstore está actualizado y listo para usar.")
+    print(f"\n📊 Documentos: {resumen['documentos']} | Sin cambios: {resumen['sin_cambios']} | "
+          f"Nuevos o modificados: {resumen['actualizados']} | Eliminados: {resumen['eliminados']}")
+    if resumen["errores"]:
+        print(f"⚠️  Archivos con errores (se conservó lo cargado antes): {list(resumen['errores'])}")
+    if embeddings_api.ultimo_reporte:
+        print(f"⚡ Embeddings: {embeddings_api.ultimo_reporte}")
+    if hasattr(embeddings, "resumen"):
+        print(f"💾 Caché de embeddings: {embeddings.resumen()}")
+    destino = vectorstore_path if servidor is None else f"servidor de Chroma {servidor[0]}:{servidor[1]}"
+    print(f"📁 Vector store guardado en: {destino}")
+    print("\n✅ ¡Listo! El vectorstore está actualizado y listo para usar.")
 
+
+if __name__ == "__main__":
+    main()
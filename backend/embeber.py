@@ -0,0 +1,151 @@
+"""
+Etapa de embeddings para la carga de documentos
+Divide los textos en lotes (por número de documentos y por tokens), los envía a la API de
+OpenAI con varias peticiones en paralelo y reintenta con backoff exponencial si la API
+responde 429 (límite de tasa). Informa el progreso en documentos/s y tokens/s.
+
+Se usa como un modelo de embeddings de LangChain, así que puede ir detrás de la caché de
+embeddings y dentro de Chroma.add_texts sin cambiar nada más.
+
+Configuración por variables de entorno:
+    EMBEDDING_LOTE               Documentos máximos por petición (100)
+    EMBEDDING_MAX_TOKENS_LOTE    Tokens máximos por petición (100000)
+    EMBEDDING_CONCURRENCIA       Peticiones simultáneas (4)
+    EMBEDDING_MAX_REINTENTOS     Reintentos ante 429 o errores transitorios (6)
+"""
+import os
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Tuple
+
+import openai
+from langchain_core.embeddings import Embeddings
+
+# Espera base del backoff exponencial (se duplica en cada reintento) y espera máxima
+_ESPERA_BASE_SEGUNDOS = 1.0
+_ESPERA_MAXIMA_SEGUNDOS = 60.0
+
+# Errores que vale la pena reintentar (el resto se propaga)
+_ERRORES_TRANSITORIOS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+_codificador = None
+_codificador_cargado = False
+
+
+def contar_tokens(texto: str) -> int:
+    """Tokens del texto con tiktoken si está disponible; si no, aproximación de 4 caracteres por token"""
+    global _codificador, _codificador_cargado
+    if not _codificador_cargado:
+        _codificador_cargado = True
+        try:
+            import tiktoken
+            _codificador = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _codificador = None
+    if _codificador is not None:
+        return len(_codificador.encode(texto, disallowed_special=()))
+    return max(1, len(texto) // 4)
+
+
+def dividir_en_lotes(tokens: List[int], max_documentos: int, max_tokens: int) -> List[Tuple[int, int]]:
+    """
+    Rangos [inicio, fin) consecutivos que respetan ambos límites.
+    Un documento que por sí solo supera max_tokens va en un lote propio.
+    """
+    lotes = []
+    inicio, acumulado = 0, 0
+    for i, n in enumerate(tokens):
+        if i > inicio and (i - inicio >= max_documentos or acumulado + n > max_tokens):
+            lotes.append((inicio, i))
+            inicio, acumulado = i, 0
+        acumulado += n
+    if inicio < len(tokens):
+        lotes.append((inicio, len(tokens)))
+    return lotes
+
+
+def _espera_reintento(error: Exception, intento: int) -> float:
+    """Retry-After de la API si viene; si no, backoff exponencial con jitter"""
+    respuesta = getattr(error, "response", None)
+    if respuesta is not None:
+        try:
+            return min(float(respuesta.headers.get("retry-after")), _ESPERA_MAXIMA_SEGUNDOS)
+        except (TypeError, ValueError):
+            pass
+    espera = min(_ESPERA_BASE_SEGUNDOS * (2 ** intento), _ESPERA_MAXIMA_SEGUNDOS)
+    return espera * (0.5 + random.random() / 2)
+
+
+class EmbeddingsPorLotes(Embeddings):
+    """Embeddings de OpenAI en lotes concurrentes con backoff ante límites de tasa"""
+
+    def __init__(self, modelo: str = "text-embedding-3-small", cliente: Optional[openai.OpenAI] = None,
+                 tamano_lote: Optional[int] = None, max_tokens_lote: Optional[int] = None,
+                 concurrencia: Optional[int] = None, max_reintentos: Optional[int] = None,
+                 mostrar_progreso: bool = True):
+        self.modelo = modelo
+        # Los reintentos los maneja esta clase, no el SDK
+        self.cliente = (cliente or openai.OpenAI()).with_options(max_retries=0)
+        self.tamano_lote = tamano_lote or int(os.getenv("EMBEDDING_LOTE", "100"))
+        self.max_tokens_lote = max_tokens_lote or int(os.getenv("EMBEDDING_MAX_TOKENS_LOTE", "100000"))
+        self.concurrencia = concurrencia or int(os.getenv("EMBEDDING_CONCURRENCIA", "4"))
+        self.max_reintentos = max_reintentos if max_reintentos is not None else int(os.getenv("EMBEDDING_MAX_REINTENTOS", "6"))
+        self.mostrar_progreso = mostrar_progreso
+        self.reintentos = 0
+        self.ultimo_reporte: dict = {}
+
+    def _embeber_lote(self, textos: List[str]) -> List[List[float]]:
+        for intento in range(self.max_reintentos + 1):
+            try:
+                respuesta = self.cliente.embeddings.create(model=self.modelo, input=textos)
+                return [dato.embedding for dato in sorted(respuesta.data, key=lambda d: d.index)]
+            except _ERRORES_TRANSITORIOS as e:
+                if intento == self.max_reintentos:
+                    raise
+                espera = _espera_reintento(e, intento)
+                self.reintentos += 1
+                print(f"⏳ {type(e).__name__}: reintento {intento + 1}/{self.max_reintentos} en {espera:.1f}s")
+                time.sleep(espera)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        tokens = [contar_tokens(t) for t in texts]
+        lotes = dividir_en_lotes(tokens, self.tamano_lote, self.max_tokens_lote)
+        vectores: List[Optional[List[float]]] = [None] * len(texts)
+
+        inicio = time.perf_counter()
+        docs_listos, tokens_listos = 0, 0
+
+        with ThreadPoolExecutor(max_workers=self.concurrencia) as pool:
+            futuros = {pool.submit(self._embeber_lote, texts[a:b]): (a, b) for a, b in lotes}
+            for futuro in as_completed(futuros):
+                a, b = futuros[futuro]
+                vectores[a:b] = futuro.result()
+                docs_listos += b - a
+                tokens_listos += sum(tokens[a:b])
+                if self.mostrar_progreso:
+                    transcurrido = max(time.perf_counter() - inicio, 1e-9)
+                    print(f"   📦 {docs_listos}/{len(texts)} documentos | "
+                          f"{docs_listos / transcurrido:.1f} docs/s | {tokens_listos / transcurrido:.0f} tokens/s")
+
+        transcurrido = max(time.perf_counter() - inicio, 1e-9)
+        self.ultimo_reporte = {
+            "documentos": len(texts),
+            "tokens": sum(tokens),
+            "lotes": len(lotes),
+            "segundos": round(transcurrido, 2),
+            "docs_por_segundo": round(len(texts) / transcurrido, 1),
+            "tokens_por_segundo": round(sum(tokens) / transcurrido, 0),
+            "reintentos": self.reintentos,
+        }
+        return vectores
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embeber_lote([text])[0]
@@ -0,0 +1,70 @@
+"""
+Servidor de producción: gunicorn con workers de uvicorn
+
+    gunicorn app.main:app -c gunicorn.conf.py            (desde backend/)
+
+- preload_app: el master importa la app y ejecuta app.arranque.precargar() (módulos
+  pesados, índice curricular, índice NumPy) antes de crear los workers; los workers
+  heredan esas páginas copy-on-write en lugar de construir cada uno su copia. El recolector
+  de basura se congela antes de cada fork para que no toque (y copie) esos objetos.
+- Cada worker crea después, en su lifespan, lo que no se puede compartir entre procesos:
+  clientes de OpenAI, la conexión a Chroma y las cachés con SQLite (ver app/arranque.py).
+- Reciclado: cada worker se reemplaza después de SERVIDOR_MAX_PETICIONES peticiones (con
+  jitter para que no se reinicien todos a la vez); el master levanta el reemplazo antes de
+  que el viejo termine. `kill -HUP <pid del master>` recicla todos los workers de la misma
+  forma (terminan las peticiones en curso durante SERVIDOR_TIMEOUT_APAGADO segundos), sin
+  cerrar el socket. Para cargar código nuevo, `kill -USR2` levanta un master nuevo junto
+  al viejo y después `kill -TERM` al viejo.
+
+El servidor de desarrollo sigue siendo `python main.py` (un proceso, con recarga).
+
+Configuración por variables de entorno:
+    SERVIDOR_BIND               Dirección de escucha (0.0.0.0:8000)
+    SERVIDOR_WORKERS            Número de workers (0: uno por CPU)
+    SERVIDOR_PRECARGA           1 para precargar en el master (por defecto), 0 para que cada
+                                worker importe y construya todo por su cuenta
+    SERVIDOR_MAX_PETICIONES     Peticiones antes de reciclar un worker (5000; 0 desactiva)
+    SERVIDOR_TIMEOUT_APAGADO    Segundos para terminar las peticiones en curso al reciclar (30)
+    SERVIDOR_TIMEOUT            Segundos sin latido antes de matar un worker colgado (120)
+"""
+import gc
+import os
+
+bind = os.getenv("SERVIDOR_BIND", "0.0.0.0:8000")
+# El trabajo de cada petición es sobre todo esperar a OpenAI (async) y la parte de CPU es
+# corta: un worker por CPU alcanza para usarlas todas
+workers = int(os.getenv("SERVIDOR_WORKERS", "0")) or os.cpu_count() or 1
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("SERVIDOR_PRECARGA", "1") != "0"
+
+max_requests = int(os.getenv("SERVIDOR_MAX_PETICIONES", "5000"))
+max_requests_jitter = max_requests // 10
+graceful_timeout = int(os.getenv("SERVIDOR_TIMEOUT_APAGADO", "30"))
+timeout = int(os.getenv("SERVIDOR_TIMEOUT", "120"))
+keepalive = 5
+
+
+def on_starting(server):
+    """En el master, con la app ya importada (preload_app) y antes de crear los workers"""
+    if not preload_app:
+        return
+    from app.main import configurar_proceso
+    from app.arranque import precargar
+
+    configurar_proceso()
+    # Sin colecciones del GC en el master: cada una escribe en los objetos que se comparten
+    gc.disable()
+    precargar()
+
+
+def pre_fork(server, worker):
+    if not preload_app:
+        return
+    # Lo que hay en el heap del master pasa a la generación permanente: el GC de los workers
+    # no lo recorre, así sus páginas no se copian
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        gc.enable()
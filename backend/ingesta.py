@@ -0,0 +1,293 @@
+"""
+Pipeline de carga de documentos en Chroma
+- Descubre los documentos de un directorio y elige el procesador por extensión
+  (.json, .pdf, .csv; ver PROCESADORES)
+- Procesa los archivos en paralelo en un pool de procesos; cada procesador es un generador
+  de (texto, metadata) y los registros llegan al proceso principal por una cola acotada,
+  así la memoria no crece con el tamaño del directorio
+- Los registros se agrupan en bloques que se comparan con el manifiesto de hashes y solo
+  los nuevos o modificados pasan por la etapa de embeddings y el upsert en Chroma
+
+Configuración por variables de entorno:
+    INGESTA_PROCESOS       Procesos para procesar archivos (número de CPUs)
+    INGESTA_LOTE_UPSERT    Registros por bloque de embeddings + upsert (500)
+"""
+import os
+import json
+import queue
+import hashlib
+import multiprocessing
+from contextlib import closing
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from procesar_json import iterar_malla_curricular
+from procesar_pdf import iterar_pdf_materias
+from procesar_csv import iterar_csv_horarios
+
+Registro = Tuple[str, Dict[str, Any]]
+
+# Procesador de cada tipo de documento: función generadora ruta -> (texto, metadata)
+PROCESADORES: Dict[str, Callable[[str], Iterator[Registro]]] = {
+    ".json": iterar_malla_curricular,
+    # La carga de documentos extrae en paralelo las páginas de un PDF que no están en caché
+    ".pdf": partial(iterar_pdf_materias, paralelo=True),
+    ".csv": iterar_csv_horarios,
+}
+
+# Registros por mensaje entre procesos y mensajes en la cola (acota la memoria en tránsito)
+_REGISTROS_POR_MENSAJE = 64
+_MENSAJES_POR_PROCESO = 4
+
+# Segundos que un proceso espera lugar en la cola antes de revisar si la ingesta se canceló
+_ESPERA_ENVIO = 0.5
+
+# Cola compartida con los procesos del pool y aviso de cancelación (se asignan en cada
+# proceso al iniciarlo)
+_cola = None
+_cancelada = None
+
+
+class _IngestaCancelada(Exception):
+    """Quien consume los registros dejó de leer la cola (falló o cerró el generador)"""
+
+
+def descubrir_archivos(directorio: str) -> List[Path]:
+    """Archivos del directorio (recursivo) que tienen un procesador, en orden estable"""
+    return sorted(
+        ruta for ruta in Path(directorio).rglob("*")
+        if ruta.is_file() and ruta.suffix.lower() in PROCESADORES
+    )
+
+
+def id_documento(archivo: str, metadata: Dict[str, Any]) -> str:
+    """ID determinista del documento: archivo fuente (nombre_archivo) + código (+ grupo en el CSV)"""
+    partes = [archivo, str(metadata.get('codigo', '')).strip()]
+    if metadata.get('grupo'):
+        partes.append(str(metadata['grupo']).strip())
+    return ":".join(partes)
+
+
+def hash_documento(texto: str, metadata: Dict[str, Any]) -> str:
+    contenido = texto + "\n" + json.dumps(metadata, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def _iniciar_proceso(cola, cancelada):
+    global _cola, _cancelada
+    _cola = cola
+    _cancelada = cancelada
+    # Al salir, el proceso no espera a volcar en la cola lo que nadie va a leer (en una
+    # ingesta completa el proceso principal ya recibió todo antes de cerrar el pool)
+    cola.cancel_join_thread()
+
+
+def _enviar(mensaje: tuple):
+    """Pone un mensaje en la cola; si la ingesta se cancela mientras espera lugar, se detiene"""
+    while not _cancelada.is_set():
+        try:
+            _cola.put(mensaje, timeout=_ESPERA_ENVIO)
+            return
+        except queue.Full:
+            continue
+    raise _IngestaCancelada()
+
+
+def _procesar_archivo(ruta: str, nombre: str):
+    """
+    Se ejecuta en un proceso del pool: envía los registros del archivo por la cola en
+    mensajes de _REGISTROS_POR_MENSAJE (identificados con `nombre`) y termina con un
+    mensaje 'fin' o 'error'.
+    """
+    try:
+        procesador = PROCESADORES[Path(ruta).suffix.lower()]
+        pendientes: List[Registro] = []
+        total = 0
+        for registro in procesador(ruta):
+            pendientes.append(registro)
+            if len(pendientes) >= _REGISTROS_POR_MENSAJE:
+                _enviar(("registros", nombre, pendientes))
+                total += len(pendientes)
+                pendientes = []
+        if pendientes:
+            _enviar(("registros", nombre, pendientes))
+            total += len(pendientes)
+        _enviar(("fin", nombre, total))
+    except _IngestaCancelada:
+        return
+    except Exception as e:
+        try:
+            _enviar(("error", nombre, f"{type(e).__name__}: {e}"))
+        except _IngestaCancelada:
+            return
+
+
+def nombre_archivo(ruta: Path, directorio: Optional[str] = None) -> str:
+    """
+    Nombre con que se identifica un archivo en los IDs, los mensajes y `errores`: la ruta
+    relativa a `directorio` (dos archivos con el mismo nombre en subdirectorios distintos no
+    comparten IDs), o solo el nombre si no hay directorio
+    """
+    if directorio is None:
+        return ruta.name
+    return Path(os.path.relpath(ruta, directorio)).as_posix()
+
+
+def iterar_registros(archivos: Iterable[Path], procesos: Optional[int] = None,
+                     errores: Optional[Dict[str, str]] = None,
+                     directorio: Optional[str] = None) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Procesa los archivos en paralelo y produce (nombre de archivo, texto, metadata) a medida
+    que llegan, con el nombre de nombre_archivo (relativo a `directorio`). Los registros de
+    un mismo archivo llegan en orden. Los archivos que fallan se anotan en `errores`
+    (nombre -> mensaje) y no detienen el resto.
+
+    Si quien consume falla o cierra el generador a mitad de camino, los procesos se detienen
+    en su siguiente envío y el pool se cierra sin procesar los archivos pendientes. Quien
+    puede dejarlo a medias debe cerrarlo (contextlib.closing): un generador abandonado
+    durante una excepción no se cierra hasta que se libera, y al salir el intérprete espera
+    antes a los procesos del pool.
+    """
+    archivos = [(str(a), nombre_archivo(Path(a), directorio)) for a in archivos]
+    if not archivos:
+        return
+    procesos = min(procesos or int(os.getenv("INGESTA_PROCESOS", "0")) or os.cpu_count() or 1, len(archivos))
+    errores = errores if errores is not None else {}
+
+    contexto = multiprocessing.get_context()
+    cola = contexto.Queue(maxsize=procesos * _MENSAJES_POR_PROCESO)
+    cancelada = contexto.Event()
+    pool = ProcessPoolExecutor(max_workers=procesos, mp_context=contexto,
+                               initializer=_iniciar_proceso, initargs=(cola, cancelada))
+    futuros = []
+    completa = False
+    try:
+        futuros = [pool.submit(_procesar_archivo, ruta, nombre) for ruta, nombre in archivos]
+        pendientes = len(archivos)
+        while pendientes:
+            try:
+                tipo, nombre, contenido = cola.get(timeout=1)
+            except queue.Empty:
+                # Un proceso que muere sin avisar (p. ej. sin memoria) deja su futuro con excepción
+                caidos = [f for f in futuros if f.done() and f.exception() is not None]
+                if caidos:
+                    raise RuntimeError(f"Falló un proceso de ingesta: {caidos[0].exception()}")
+                continue
+
+            if tipo == "registros":
+                for texto, metadata in contenido:
+                    yield nombre, texto, metadata
+            else:
+                pendientes -= 1
+                if tipo == "error":
+                    errores[nombre] = contenido
+                    print(f"❌ Error procesando {nombre}: {contenido}")
+                else:
+                    print(f"✅ {nombre}: {contenido} documentos")
+        completa = True
+    finally:
+        if not completa:
+            # Un proceso bloqueado en la cola llena que ya nadie vacía no terminaría nunca:
+            # se avisa la cancelación, se descartan los archivos que no empezaron y se vacía
+            # la cola para soltar a los que esperan lugar
+            cancelada.set()
+            for futuro in futuros:
+                futuro.cancel()
+            _vaciar(cola)
+        pool.shutdown(wait=completa, cancel_futures=True)
+
+
+def _vaciar(cola):
+    """Descarta los mensajes en tránsito"""
+    while True:
+        try:
+            cola.get_nowait()
+        except queue.Empty:
+            return
+
+class ManifiestoIngesta:
+    """Hash del contenido de cada documento cargado (id -> hash), guardado junto al vectorstore"""
+
+    def __init__(self, ruta: Path):
+        self.ruta = ruta
+        self.hashes: Dict[str, str] = json.loads(ruta.read_text(encoding='utf-8')) if ruta.exists() else {}
+
+    def guardar(self, hashes: Dict[str, str]):
+        """Escritura atómica: un fallo a mitad de camino deja el manifiesto anterior"""
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = self.ruta.with_suffix(".tmp")
+        temporal.write_text(json.dumps(hashes, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(temporal, self.ruta)
+        self.hashes = hashes
+
+    @property
+    def version(self) -> str:
+        """Hash corto de todo el manifiesto: cambia si se agrega, modifica o elimina un documento"""
+        contenido = json.dumps(self.hashes, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(contenido).hexdigest()[:16]
+
+
+def ingerir(directorio: str, vectorstore, manifiesto: ManifiestoIngesta,
+            procesos: Optional[int] = None, lote_upsert: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Carga incremental de todos los documentos de `directorio` en `vectorstore` (Chroma).
+    Solo se calculan embeddings de documentos nuevos o modificados; los que ya no existen
+    se eliminan. Los documentos de un archivo que falló se conservan como estaban.
+    Retorna un resumen con los conteos.
+    """
+    lote_upsert = lote_upsert or int(os.getenv("INGESTA_LOTE_UPSERT", "500"))
+    archivos = descubrir_archivos(directorio)
+    print(f"📂 {len(archivos)} documentos encontrados en {directorio}")
+
+    ids_existentes = set(vectorstore.get(include=[])["ids"])
+    hashes: Dict[str, str] = {}
+    errores: Dict[str, str] = {}
+    bloque: List[Tuple[str, str, Dict[str, Any]]] = []
+    resumen = {"archivos": len(archivos), "documentos": 0, "sin_cambios": 0,
+               "actualizados": 0, "eliminados": 0, "errores": errores}
+
+    def cargar_bloque():
+        cambiados = [(doc_id, texto, metadata) for doc_id, texto, metadata in bloque
+                     if doc_id not in ids_existentes or manifiesto.hashes.get(doc_id) != hashes[doc_id]]
+        resumen["sin_cambios"] += len(bloque) - len(cambiados)
+        if cambiados:
+            vectorstore.add_texts(
+                texts=[texto for _, texto, _ in cambiados],
+                metadatas=[metadata for _, _, metadata in cambiados],
+                ids=[doc_id for doc_id, _, _ in cambiados]
+            )
+            resumen["actualizados"] += len(cambiados)
+            print(f"💾 {resumen['actualizados']} documentos nuevos o modificados cargados")
+        bloque.clear()
+
+    with closing(iterar_registros(archivos, procesos, errores, directorio)) as registros:
+        for archivo, texto, metadata in registros:
+            # IDs repetidos dentro de un archivo se numeran en orden de aparición
+            base = id_documento(archivo, metadata)
+            doc_id, repeticion = base, 1
+            while doc_id in hashes:
+                repeticion += 1
+                doc_id = f"{base}#{repeticion}"
+            hashes[doc_id] = hash_documento(texto, metadata)
+            bloque.append((doc_id, texto, metadata))
+            if len(bloque) >= lote_upsert:
+                cargar_bloque()
+    cargar_bloque()
+    resumen["documentos"] = len(hashes)
+
+    # Conservar lo cargado de archivos que fallaron en esta ejecución
+    fallidos = tuple(f"{archivo}:" for archivo in errores)
+    for doc_id in ids_existentes - hashes.keys():
+        if doc_id.startswith(fallidos) and doc_id in manifiesto.hashes:
+            hashes[doc_id] = manifiesto.hashes[doc_id]
+
+    eliminados = sorted(ids_existentes - hashes.keys())
+    if eliminados:
+        print(f"🗑️  Eliminando {len(eliminados)} documentos que ya no están en las fuentes...")
+        vectorstore.delete(ids=eliminados)
+    resumen["eliminados"] = len(eliminados)
+
+    manifiesto.guardar(hashes)
+    return resumen
@@ -1,5 +1,6 @@
 """
-Punto de entrada de la aplicación
+Punto de entrada de la aplicación (desarrollo: un proceso con recarga automática)
+En producción: gunicorn app.main:app -c gunicorn.conf.py
 """
 import uvicorn
 from app.main import app
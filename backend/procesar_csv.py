@@ -3,24 +3,46 @@ Procesador para archivos CSV con información de asignaturas (horarios, profesor
 Extrae información de horarios, profesores y salones por grupo
 """
 import csv
+import codecs
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
-import chardet
+from typing import List, Dict, Any, Tuple, Iterator
 
+# Bytes del inicio del archivo que se usan para detectar el encoding y el delimitador
+_BYTES_MUESTRA = 64 * 1024
 
-def detectar_encoding(archivo_path: str) -> str:
-    """Detecta el encoding del archivo CSV"""
+# Columnas que se leen de cada fila (nombres ya normalizados)
+_COLUMNAS = ('Código', 'Nombre Asignatura', 'Profesor', 'Grupo', 'Horario Completo', 'Salón')
+
+
+def _respaldo_latin1(error: UnicodeDecodeError):
+    """Los bytes que no son UTF-8 válido se leen como latin-1 en lugar de abortar la lectura"""
+    return error.object[error.start:error.end].decode('latin-1'), error.end
+
+
+codecs.register_error('respaldo_latin1', _respaldo_latin1)
+
+
+def detectar_encoding(archivo_path: str, max_bytes: int = _BYTES_MUESTRA) -> str:
+    """
+    Detecta el encoding del archivo CSV a partir de sus primeros `max_bytes`:
+    UTF-8 (con o sin BOM) si la muestra es UTF-8 válido, si no latin-1.
+    """
     with open(archivo_path, 'rb') as f:
-        raw_data = f.read()
-        resultado = chardet.detect(raw_data)
-        encoding = resultado['encoding']
-        print(f"🔍 Encoding detectado: {encoding} (confianza: {resultado['confidence']:.2%})")
-        return encoding or 'utf-8'
+        muestra = f.read(max_bytes)
+    try:
+        # final=False: un carácter multibyte cortado al final de la muestra no es un error
+        codecs.getincrementaldecoder('utf-8')().decode(muestra, final=False)
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        encoding = 'latin-1'
+    print(f"🔍 Encoding detectado: {encoding} (muestra de {len(muestra)} bytes)")
+    return encoding
 
 
 def corregir_encoding_texto(texto: str) -> str:
     """Intenta corregir problemas de encoding en el texto"""
-    if not texto:
+    if not texto or texto.isascii():
         return texto
     
     # Intentar corregir encoding doble: texto que fue UTF-8 pero se leyó como latin-1
@@ -87,111 +109,120 @@ def procesar_csv_horarios(csv_path: str) -> Tuple[List[str], List[Dict[str, Any]
         - textos: Lista de textos estructurados, uno por grupo de materia
         - metadatas: Lista de diccionarios con metadata de cada grupo
     """
+    textos = []
+    metadatas = []
+    for texto, metadata in iterar_csv_horarios(csv_path):
+        textos.append(texto)
+        metadatas.append(metadata)
+    return textos, metadatas
+
+
+def iterar_csv_horarios(csv_path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Igual que procesar_csv_horarios, pero produce un (texto, metadata) por grupo"""
     csv_file = Path(csv_path)
     
     if not csv_file.exists():
         raise FileNotFoundError(f"Archivo no encontrado: {csv_path}")
     
-    # Detectar encoding
+    # Detectar encoding y delimitador con una muestra acotada del inicio del archivo
     encoding = detectar_encoding(csv_path)
     
-    # Leer CSV con diferentes encodings si es necesario
-    filas = []
-    columnas_originales = []
-    encoding_usado = None
-    delimiter_usado = None
-    
-    # Intentar diferentes encodings, priorizando los más comunes para CSV en español
-    encodings_intentados = ['utf-8-sig', 'utf-8', 'latin-1', 'cp1252', 'iso-8859-1', encoding]
-    
-    for enc in encodings_intentados:
+    with open(csv_file, 'r', encoding=encoding, errors='respaldo_latin1', newline='') as f:
         try:
-            with open(csv_file, 'r', encoding=enc, newline='') as f:
-                # Detectar delimitador
-                sample = f.read(1024)
-                f.seek(0)
-                sniffer = csv.Sniffer()
-                delimiter = sniffer.sniff(sample).delimiter
-                
-                reader = csv.DictReader(f, delimiter=delimiter)
-                filas = list(reader)
-                if filas:
-                    columnas_originales = list(filas[0].keys())
-                    encoding_usado = enc
-                    delimiter_usado = delimiter
-                    print(f"✅ CSV leído exitosamente con encoding: {enc}, delimitador: '{delimiter}'")
-                    break
-        except (UnicodeDecodeError, csv.Error) as e:
-            print(f"⚠️  Error con encoding {enc}: {e}")
-            continue
-    
-    if not filas:
-        raise ValueError(f"No se pudo leer el CSV con ningún encoding: {encodings_intentados}")
-    
-    # Normalizar nombres de columnas
-    columnas_normalizadas = {col: normalizar_nombre_columna(col) for col in columnas_originales}
-    print(f"📋 Columnas originales: {columnas_originales}")
-    print(f"📋 Columnas normalizadas: {list(columnas_normalizadas.values())}")
-    
-    # Agrupar por código y grupo (puede haber múltiples horarios/salones por grupo)
-    grupos_agrupados: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
-    
-    for idx, fila in enumerate(filas):
-        # Normalizar nombres de columnas en la fila
-        fila_normalizada = {columnas_normalizadas.get(k, k): v for k, v in fila.items()}
-        
-        codigo = fila_normalizada.get('Código', '').strip()
-        nombre = fila_normalizada.get('Nombre Asignatura', '').strip()
-        profesor = fila_normalizada.get('Profesor', '').strip()
-        grupo = fila_normalizada.get('Grupo', '').strip()
-        horario = fila_normalizada.get('Horario Completo', '').strip()
-        salon = fila_normalizada.get('Salón', '').strip()
-        
-        # Intentar corregir problemas de encoding en los valores
-        codigo = corregir_encoding_texto(codigo)
-        nombre = corregir_encoding_texto(nombre)
-        profesor = corregir_encoding_texto(profesor)
-        salon = corregir_encoding_texto(salon)
+            delimiter = csv.Sniffer().sniff(f.read(1024)).delimiter
+        except csv.Error as e:
+            raise ValueError(f"No se pudo leer el CSV {csv_path}: {e}")
+        f.seek(0)
+        reader = csv.reader(f, delimiter=delimiter)
         
-        # Debug: mostrar primera fila procesada
-        if idx == 0:
-            print(f"🔍 Primera fila procesada:")
-            print(f"   Columnas normalizadas disponibles: {list(fila_normalizada.keys())}")
-            print(f"   Código: '{codigo}' | Nombre: '{nombre}' | Grupo: '{grupo}'")
+        # Encabezado (la primera fila no vacía), normalizado una sola vez
+        columnas_originales = next((fila for fila in reader if fila), [])
+        columnas_normalizadas = [normalizar_nombre_columna(col) for col in columnas_originales]
+        print(f"✅ CSV leído con encoding: {encoding}, delimitador: '{delimiter}'")
+        print(f"📋 Columnas originales: {columnas_originales}")
+        print(f"📋 Columnas normalizadas: {columnas_normalizadas}")
         
-        # Limpiar valores vacíos o inválidos
-        if not codigo or not nombre:
-            continue
+        # Posición de cada columna esperada (si una aparece repetida, vale la última)
+        posiciones = {nombre: i for i, nombre in enumerate(columnas_normalizadas)}
+        indices = [posiciones.get(nombre) for nombre in _COLUMNAS]
         
-        # Limpiar caracteres extraños del profesor (si hay caracteres de control)
-        if profesor:
-            profesor = ''.join(char for char in profesor if ord(char) >= 32 or char in '\n\r\t').strip()
+        # Agrupar por código y grupo (puede haber múltiples horarios/salones por grupo).
+        # Profesores, horarios y salones se acumulan en dicts (conjuntos que conservan el
+        # orden de aparición): la memoria crece con el número de grupos, no de filas
+        grupos_agrupados: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        filas = 0
         
-        # Clave única: código + nombre + grupo
-        clave = (codigo, nombre, grupo)
+        # Los valores se repiten mucho entre filas (códigos, profesores, salones): la
+        # corrección de encoding se calcula una vez por valor distinto
+        corregidos: Dict[str, str] = {}
         
-        if clave not in grupos_agrupados:
-            grupos_agrupados[clave] = {
-                'codigo': codigo,
-                'nombre': nombre,
-                'grupo': grupo,
-                'profesores': [],
-                'horarios': [],
-                'salones': []
-            }
+        def corregir(texto: str) -> str:
+            resultado = corregidos.get(texto)
+            if resultado is None:
+                resultado = corregidos[texto] = corregir_encoding_texto(texto)
+            return resultado
         
-        # Agregar información si no está vacía
-        if profesor and profesor not in grupos_agrupados[clave]['profesores']:
-            grupos_agrupados[clave]['profesores'].append(profesor)
+        # Camino rápido cuando están todas las columnas esperadas
+        extraer = itemgetter(*indices) if None not in indices else None
+        largo_minimo = max(indices) + 1 if extraer else 0
         
-        if horario and horario not in grupos_agrupados[clave]['horarios']:
-            grupos_agrupados[clave]['horarios'].append(horario)
-        
-        if salon and salon not in grupos_agrupados[clave]['salones']:
-            grupos_agrupados[clave]['salones'].append(salon)
+        for fila in reader:
+            if not fila:
+                continue
+            if extraer and len(fila) >= largo_minimo:
+                codigo, nombre, profesor, grupo, horario, salon = extraer(fila)
+            else:
+                # Faltan columnas en el encabezado o en la fila: se toman como vacías
+                codigo, nombre, profesor, grupo, horario, salon = (
+                    fila[i] if i is not None and i < len(fila) else '' for i in indices
+                )
+            grupo = grupo.strip()
+            horario = horario.strip()
+            
+            # Intentar corregir problemas de encoding en los valores
+            codigo = corregir(codigo.strip())
+            nombre = corregir(nombre.strip())
+            profesor = corregir(profesor.strip())
+            salon = corregir(salon.strip())
+            
+            # Debug: mostrar primera fila procesada
+            if filas == 0:
+                print(f"🔍 Primera fila procesada:")
+                print(f"   Columnas normalizadas disponibles: {list(dict.fromkeys(columnas_normalizadas))}")
+                print(f"   Código: '{codigo}' | Nombre: '{nombre}' | Grupo: '{grupo}'")
+            filas += 1
+            
+            # Limpiar valores vacíos o inválidos
+            if not codigo or not nombre:
+                continue
+            
+            # Limpiar caracteres extraños del profesor (si hay caracteres de control)
+            if profesor and not profesor.isprintable():
+                profesor = ''.join(char for char in profesor if ord(char) >= 32 or char in '\n\r\t').strip()
+            
+            # Clave única: código + nombre + grupo
+            clave = (codigo, nombre, grupo)
+            info = grupos_agrupados.get(clave)
+            if info is None:
+                info = grupos_agrupados[clave] = {
+                    'codigo': codigo,
+                    'nombre': nombre,
+                    'grupo': grupo,
+                    'profesores': {},
+                    'horarios': {},
+                    'salones': {}
+                }
+            
+            # Agregar información si no está vacía
+            if profesor:
+                info['profesores'][profesor] = None
+            if horario:
+                info['horarios'][horario] = None
+            if salon:
+                info['salones'][salon] = None
     
-    textos = []
-    metadatas = []
+    if not filas:
+        raise ValueError(f"El CSV no tiene filas de datos: {csv_path}")
     
     for (codigo, nombre, grupo), info in grupos_agrupados.items():
         # Crear texto estructurado
@@ -211,7 +242,6 @@ Grupo: {info['grupo']}"""
             salones_str = '; '.join(info['salones'])
             texto += f"\nSalón(es): {salones_str}"
         
-        textos.append(texto)
         
         # Crear metadata
         metadata = {
@@ -235,9 +265,7 @@ Grupo: {info['grupo']}"""
         if info['salones']:
             metadata['salones'] = '; '.join(info['salones'])
         
-        metadatas.append(metadata)
-    
-    return textos, metadatas
+        yield texto, metadata
 
 
 if __name__ == "__main__":
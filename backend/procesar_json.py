@@ -4,7 +4,7 @@ Convierte JSON a texto estructurado para RAG
 """
 import json
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Iterator
 
 
 def procesar_malla_curricular(json_path: str) -> Tuple[List[str], List[Dict[str, Any]]]:
@@ -19,6 +19,16 @@ def procesar_malla_curricular(json_path: str) -> Tuple[List[str], List[Dict[str,
         - textos: Lista de textos estructurados, uno por materia
         - metadatas: Lista de diccionarios con metadata de cada materia
     """
+    textos = []
+    metadatas = []
+    for texto, metadata in iterar_malla_curricular(json_path):
+        textos.append(texto)
+        metadatas.append(metadata)
+    return textos, metadatas
+
+
+def iterar_malla_curricular(json_path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Igual que procesar_malla_curricular, pero produce un (texto, metadata) por materia"""
     json_file = Path(json_path)
     
     if not json_file.exists():
@@ -27,9 +37,6 @@ def procesar_malla_curricular(json_path: str) -> Tuple[List[str], List[Dict[str,
     with open(json_file, 'r', encoding='utf-8') as f:
         materias = json.load(f)
     
-    textos = []
-    metadatas = []
-    
     for materia in materias:
         # Manejar prerrequisitos: puede ser string o array
         prerequisitos = materia.get('prerequisitos', 'Ninguna')
@@ -56,7 +63,6 @@ Créditos: {materia['creditos']}
 Tipología: {materia['tipologia']}
 Prerrequisitos: {prerequisitos_str}
 """
-        textos.append(texto)
         
         # Crear metadata estructurada
         metadata = {
@@ -67,12 +73,11 @@ Prerrequisitos: {prerequisitos_str}
             'tipologia': materia['tipologia'],
             'tipologia_tipo': _extraer_tipo_tipologia(materia['tipologia']),
             'tipologia_categoria': _extraer_categoria_tipologia(materia['tipologia']),
+            'prerequisitos': prerequisitos_str,
             'tiene_prerequisitos': tiene_prerequisitos,
             'num_prerequisitos': num_prerequisitos
         }
-        metadatas.append(metadata)
-    
-    return textos, metadatas
+        yield texto, metadata
 
 
 def _extraer_tipo_tipologia(tipologia: str) -> str:
@@ -1,14 +1,37 @@
 """
 Procesador para documentos PDF de materias
 Extrae información estructurada (código, nombre, descripción, contenido) de cada materia
+
+El texto extraído de cada página se guarda en una caché en disco (cache_paginas.py) con
+clave hash del archivo + número de página: un PDF que no cambió se vuelve a procesar sin
+abrir pypdf. Con paralelo=True (la carga de documentos, ver ingesta.py) las páginas que
+faltan de un PDF nuevo o modificado se extraen en un pool de procesos; la app (índice
+curricular) las extrae en su propio proceso, sin crear procesos desde el servidor.
+
+Configuración por variables de entorno:
+    PDF_PROCESOS         Procesos para extraer páginas con paralelo=True (número de CPUs)
 """
+import os
 import re
+import sqlite3
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
-from pypdf import PdfReader
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple, Iterator, Iterable, Optional
+
+from cache_paginas import obtener_cache_paginas
+
+# pypdf se importa al abrir el primer PDF: con todas las páginas en caché no se carga
+if TYPE_CHECKING:
+    from pypdf import PdfReader
+
+# Páginas por tarea al extraer en paralelo, y mínimo de páginas para que valga la pena
+# arrancar procesos
+_PAGINAS_POR_TAREA = 16
+_MIN_PAGINAS_PARALELO = 32
 
 
-def procesar_pdf_materias(pdf_path: str) -> Tuple[List[str], List[Dict[str, Any]]]:
+def procesar_pdf_materias(pdf_path: str, paralelo: bool = False) -> Tuple[List[str], List[Dict[str, Any]]]:
     """
     Procesa un archivo PDF que contiene información de materias y lo convierte en textos estructurados y metadata.
     
@@ -20,30 +43,33 @@ def procesar_pdf_materias(pdf_path: str) -> Tuple[List[str], List[Dict[str, Any]
     
     Args:
         pdf_path: Ruta al archivo PDF
+        paralelo: Extraer en un pool de procesos las páginas que no están en la caché
         
     Returns:
         Tupla con (textos, metadatas) donde:
         - textos: Lista de textos estructurados, uno por materia
         - metadatas: Lista de diccionarios con metadata de cada materia
     """
+    textos = []
+    metadatas = []
+    for texto, metadata in iterar_pdf_materias(pdf_path, paralelo):
+        textos.append(texto)
+        metadatas.append(metadata)
+    return textos, metadatas
+
+
+def iterar_pdf_materias(pdf_path: str, paralelo: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Igual que procesar_pdf_materias, pero produce un (texto, metadata) por materia"""
     pdf_file = Path(pdf_path)
     
     if not pdf_file.exists():
         raise FileNotFoundError(f"Archivo no encontrado: {pdf_path}")
     
-    # Leer el PDF
-    reader = PdfReader(pdf_file)
-    texto_completo = ""
+    # Leer el PDF página por página (sin armar el texto completo en memoria)
+    paginas = _iterar_paginas(pdf_file, paralelo)
     
-    print(f"📄 Leyendo PDF: {len(reader.pages)} páginas...")
-    for page in reader.pages:
-        texto_completo += page.extract_text() + "\n"
-    
-    # Extraer materias del texto
-    materias = _extraer_materias_del_texto(texto_completo)
-    
-    textos = []
-    metadatas = []
+    # Extraer materias a medida que se leen las páginas
+    materias = _iterar_materias(paginas)
     
     for materia in materias:
         # Crear texto estructurado con toda la información disponible
@@ -59,7 +85,6 @@ Código: {materia['codigo']}"""
         if materia.get('contenido'):
             texto += f"\nContenido: {materia['contenido']}"
         
-        textos.append(texto)
         
         # Crear metadata
         metadata = {
@@ -79,102 +104,301 @@ Código: {materia['codigo']}"""
             if semestre:
                 metadata['semestre'] = str(semestre)
         
-        metadatas.append(metadata)
+        yield texto, metadata
+
+
+def hash_archivo(ruta: Path) -> str:
+    """sha256 del contenido del archivo (leído por bloques)"""
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _abrir_pdf(ruta) -> "PdfReader":
+    from pypdf import PdfReader
+    return PdfReader(ruta)
+
+
+def _extraer_rango(pdf_path: str, paginas: List[int]) -> List[str]:
+    """Texto de las páginas indicadas (se ejecuta en un proceso del pool)"""
+    reader = _abrir_pdf(pdf_path)
+    return [reader.pages[i].extract_text() for i in paginas]
+
+
+def _extraer_paginas(pdf_file: Path, reader: "PdfReader", faltantes: List[int],
+                     paralelo: bool) -> Iterator[Tuple[int, str]]:
+    """(número, texto) de las páginas faltantes, en orden; en paralelo si se pidió y son muchas"""
+    procesos = (int(os.getenv("PDF_PROCESOS", "0")) or os.cpu_count() or 1) if paralelo else 1
+    if procesos == 1 or len(faltantes) < _MIN_PAGINAS_PARALELO:
+        for i in faltantes:
+            yield i, reader.pages[i].extract_text()
+        return
     
-    return textos, metadatas
+    tareas = [faltantes[i:i + _PAGINAS_POR_TAREA] for i in range(0, len(faltantes), _PAGINAS_POR_TAREA)]
+    with ProcessPoolExecutor(max_workers=min(procesos, len(tareas))) as pool:
+        # map conserva el orden de las tareas, así el parser recibe las páginas en orden
+        for paginas, textos in zip(tareas, pool.map(_extraer_rango, [str(pdf_file)] * len(tareas), tareas)):
+            yield from zip(paginas, textos)
+
+
+def _iterar_paginas(pdf_file: Path, paralelo: bool = False) -> Iterator[str]:
+    """
+    Texto de cada página en orden. Las páginas que están en la caché (mismo hash de archivo)
+    no pasan por pypdf; si están todas, el PDF ni siquiera se abre.
+    """
+    cache = obtener_cache_paginas()
+    if cache is None:
+        reader = _abrir_pdf(pdf_file)
+        print(f"📄 Leyendo PDF: {len(reader.pages)} páginas...")
+        for page in reader.pages:
+            yield page.extract_text()
+        return
+    
+    hash_pdf = hash_archivo(pdf_file)
+    try:
+        total, en_cache = cache.leer(hash_pdf)
+    except sqlite3.Error as e:
+        print(f"⚠️  Error leyendo la caché de páginas: {e}")
+        total, en_cache = None, {}
+    
+    reader = None
+    if total is None:
+        reader = _abrir_pdf(pdf_file)
+        total = len(reader.pages)
+    faltantes = [i for i in range(total) if i not in en_cache]
+    print(f"📄 Leyendo PDF: {total} páginas ({total - len(faltantes)} desde caché)...")
+    
+    if not faltantes:
+        for i in range(total):
+            yield en_cache[i]
+        return
+    
+    reader = reader or _abrir_pdf(pdf_file)
+    nuevas: List[Tuple[int, str]] = []
+    extraidas = _extraer_paginas(pdf_file, reader, faltantes, paralelo)
+    for i in range(total):
+        if i in en_cache:
+            texto = en_cache[i]
+        else:
+            _, texto = next(extraidas)
+            nuevas.append((i, texto))
+        yield texto
+    
+    try:
+        cache.guardar(hash_pdf, total, nuevas)
+    except sqlite3.Error as e:
+        print(f"⚠️  Error guardando la caché de páginas: {e}")
+
+
+# Texto de semestre -> número
+SEMESTRES_TEXTO = {
+    "primer": 1, "primero": 1, "1er": 1, "1ro": 1,
+    "segundo": 2, "segunda": 2, "2do": 2, "2da": 2,
+    "tercer": 3, "tercero": 3, "3er": 3, "3ro": 3,
+    "cuarto": 4, "4to": 4,
+    "quinto": 5, "5to": 5,
+    "sexto": 6, "6to": 6,
+    "séptimo": 7, "septimo": 7, "7mo": 7,
+    "octavo": 8, "8vo": 8,
+    "noveno": 9, "9no": 9,
+    "décimo": 10, "decimo": 10, "10mo": 10
+}
+
+# Encabezado de semestre: "Primer semestre." (puede estar en medio de una línea)
+PATRON_SEMESTRE = re.compile(
+    r'(Primer|Segundo|Tercer|Cuarto|Quinto|Sexto|Séptimo|Septimo|Octavo|Noveno|Décimo|Decimo|Primero|Segunda|Tercero|Cuarta|Quinta|Sexta|Séptima|Septima|Octava|Novena|Décima|Decima|1er|1ro|2do|2da|3er|3ro|4to|5to|6to|7mo|8vo|9no|10mo)\s+semestre\.',
+    re.IGNORECASE
+)
+# Filtro rápido: PATRON_SEMESTRE prueba muchas alternativas en cada posición, así que solo
+# se aplica a las páginas que contienen "semestre."
+_HAY_SEMESTRE = re.compile(r'semestre\.', re.IGNORECASE)
+
+# Caracteres válidos en un código de materia (puede ocupar varias líneas)
+_CARACTERES_CODIGO = re.compile(r'[A-Z0-9\s\-]*', re.IGNORECASE)
+
+# Estados del parser
+_FUERA, _CODIGO, _NOMBRE, _DESCRIPCION, _CONTENIDO = range(5)
+
 
+def _empieza_con(linea: str, etiqueta: str) -> bool:
+    """La línea empieza con la etiqueta (sin distinguir mayúsculas)"""
+    return linea[:len(etiqueta)].lower() == etiqueta
 
-def _extraer_materias_del_texto(texto: str) -> List[Dict[str, Any]]:
+
+def _resto_etiqueta(linea: str, etiqueta: str) -> str:
+    """Texto después de 'Etiqueta', los espacios y los dos puntos opcionales"""
+    resto = linea[len(etiqueta):].lstrip()
+    if resto.startswith(':'):
+        resto = resto[1:]
+    return resto.lstrip()
+
+
+class _ParserMaterias:
     """
-    Extrae información de materias del texto del PDF.
+    Máquina de estados línea por línea para el formato del PDF:
     
-    Formato esperado:
-    Primer semestre.
-    Código:4200910
-    Nombre: Fundamentos de Programación
-    Descripción: [texto multilínea]
-    Contenido: [texto multilínea]
+        Primer semestre.
+        Código:4200910
+        Nombre: Fundamentos de Programación
+        Descripción: [texto multilínea]
+        Contenido: [texto multilínea]
+    
+    Cada línea se examina una sola vez con comparaciones de prefijo, así que el tiempo es
+    lineal en el tamaño del texto. Reglas (las mismas del parser anterior basado en regex):
+    - Las materias solo se buscan después de un encabezado de semestre; cada encabezado
+      cierra el bloque anterior
+    - 'Código' inicia una materia si el resto son caracteres de código (puede seguir en las
+      líneas siguientes) y la línea siguiente empieza con 'Nombre'
+    - El nombre sigue hasta una línea que empieza con 'Descripción'
+    - La descripción sigue hasta una línea que (sin espacios iniciales) empieza con 'Contenido'
+    - El contenido sigue hasta una línea que (sin espacios iniciales) empieza con 'Código' o
+      hasta el fin del bloque
+    - Una materia incompleta al final del bloque se descarta
     """
-    materias = []
     
-    # Diccionario para convertir texto de semestre a número
-    semestres_texto = {
-        "primer": 1, "primero": 1, "1er": 1, "1ro": 1,
-        "segundo": 2, "segunda": 2, "2do": 2, "2da": 2,
-        "tercer": 3, "tercero": 3, "3er": 3, "3ro": 3,
-        "cuarto": 4, "4to": 4,
-        "quinto": 5, "5to": 5,
-        "sexto": 6, "6to": 6,
-        "séptimo": 7, "septimo": 7, "7mo": 7,
-        "octavo": 8, "8vo": 8,
-        "noveno": 9, "9no": 9,
-        "décimo": 10, "decimo": 10, "10mo": 10
-    }
+    def __init__(self):
+        self.en_bloque = False
+        self.semestre: Optional[int] = None
+        self.estado = _FUERA
+        self.campos: Dict[str, List[str]] = {}
+        self.actual: List[str] = []
     
-    # Patrón para encontrar bloques de semestre seguidos de materias
-    # Busca: "Primer semestre." seguido de materias hasta el siguiente semestre
-    patron_semestre = re.compile(
-        r'(Primer|Segundo|Tercer|Cuarto|Quinto|Sexto|Séptimo|Septimo|Octavo|Noveno|Décimo|Decimo|Primero|Segunda|Tercero|Cuarta|Quinta|Sexta|Séptima|Septima|Octava|Novena|Décima|Decima|1er|1ro|2do|2da|3er|3ro|4to|5to|6to|7mo|8vo|9no|10mo)\s+semestre\.',
-        re.IGNORECASE
-    )
+    def _iniciar_campo(self, nombre: str, primera_linea: str):
+        self.actual = [primera_linea]
+        self.campos[nombre] = self.actual
     
-    # Encontrar todas las posiciones de semestres
-    posiciones_semestres = []
-    for match in patron_semestre.finditer(texto):
-        semestre_texto = match.group(1).lower()
-        semestre_num = semestres_texto.get(semestre_texto, None)
-        posiciones_semestres.append((match.start(), match.end(), semestre_num))
+    def _materia(self) -> Optional[Dict[str, Any]]:
+        """Materia con los campos acumulados (None si le falta código o nombre)"""
+        valores = {campo: "\n".join(lineas).strip() for campo, lineas in self.campos.items()}
+        if not valores.get('codigo') or not valores.get('nombre'):
+            return None
+        return {
+            'codigo': valores['codigo'],
+            'nombre': valores['nombre'],
+            'descripcion': valores.get('descripcion', ''),
+            'contenido': valores.get('contenido', ''),
+            'semestre': self.semestre
+        }
     
-    # Si no se encontraron semestres, intentar método alternativo
-    if not posiciones_semestres:
-        return _extraer_materias_alternativo(texto)
+    def _cerrar_materia(self) -> Optional[Dict[str, Any]]:
+        materia = self._materia() if self.estado == _CONTENIDO else None
+        self.estado = _FUERA
+        self.campos = {}
+        self.actual = []
+        return materia
     
-    # Procesar cada bloque de semestre
-    for i, (inicio_semestre, fin_semestre, semestre_num) in enumerate(posiciones_semestres):
-        # Determinar el final del bloque (siguiente semestre o fin del texto)
-        if i + 1 < len(posiciones_semestres):
-            fin_bloque = posiciones_semestres[i + 1][0]
-        else:
-            fin_bloque = len(texto)
+    def nuevo_bloque(self, semestre: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Encabezado de semestre: cierra el bloque actual y empieza otro"""
+        materia = self._cerrar_materia()
+        self.en_bloque = True
+        self.semestre = semestre
+        return materia
+    
+    def cerrar(self) -> Optional[Dict[str, Any]]:
+        """Fin del documento"""
+        return self._cerrar_materia()
+    
+    def linea(self, linea: str) -> Optional[Dict[str, Any]]:
+        """Procesa una línea; retorna la materia que se completó con ella, si hay una"""
+        if not self.en_bloque:
+            return None
         
-        bloque_texto = texto[fin_semestre:fin_bloque]
+        completada = None
+        if self.estado == _CONTENIDO:
+            if not _empieza_con(linea.lstrip(), 'código'):
+                self.actual.append(linea)
+                return None
+            completada = self._cerrar_materia()
         
-        # Buscar todas las materias en este bloque
-        # Patrón: Código:XXXXX seguido de Nombre, Descripción y Contenido
-        # El contenido puede estar en la misma línea o en líneas siguientes
-        # Nota: re.IGNORECASE hace que funcione con mayúsculas, minúsculas o cualquier combinación
-        # Los dos puntos (:) son opcionales - funciona con "Código:4200910" o "Código 4200910"
-        patron_materia = re.compile(
-            r'Código\s*:?\s*([A-Z0-9\s\-]+?)\n'
-            r'Nombre\s*:?\s*(.+?)\n'
-            r'Descripción\s*:?\s*(.+?)(?=\n\s*Contenido\s*:?)'
-            r'\n\s*Contenido\s*:?\s*(.*?)(?=\n\s*Código\s*:?|$)',
-            re.IGNORECASE | re.DOTALL
-        )
+        elif self.estado == _CODIGO:
+            if _empieza_con(linea, 'nombre') and "".join(self.actual).strip():
+                self._iniciar_campo('nombre', _resto_etiqueta(linea, 'nombre'))
+                self.estado = _NOMBRE
+                return None
+            if _CARACTERES_CODIGO.fullmatch(linea):
+                self.actual.append(linea)
+                return None
+            # No es una materia: se vuelve a examinar la línea desde afuera
+            self._cerrar_materia()
         
-        matches = patron_materia.finditer(bloque_texto)
+        elif self.estado == _NOMBRE:
+            if _empieza_con(linea, 'descripción'):
+                self._iniciar_campo('descripcion', _resto_etiqueta(linea, 'descripción'))
+                self.estado = _DESCRIPCION
+            else:
+                self.actual.append(linea)
+            return None
         
-        for match in matches:
-            codigo = match.group(1).strip()
-            nombre = match.group(2).strip() if match.group(2) else ""
-            descripcion = match.group(3).strip() if match.group(3) else ""
-            contenido = match.group(4).strip() if match.group(4) else ""
-            
-            if codigo and nombre:
-                materia = {
-                    'codigo': codigo,
-                    'nombre': nombre,
-                    'descripcion': descripcion,
-                    'contenido': contenido,
-                    'semestre': semestre_num
-                }
-                materias.append(materia)
+        elif self.estado == _DESCRIPCION:
+            sin_espacios = linea.lstrip()
+            if _empieza_con(sin_espacios, 'contenido'):
+                self._iniciar_campo('contenido', _resto_etiqueta(sin_espacios, 'contenido'))
+                self.estado = _CONTENIDO
+            else:
+                self.actual.append(linea)
+            return None
+        
+        # Fuera de una materia: buscar "Código: XXXX"
+        sin_espacios = linea.lstrip()
+        if _empieza_con(sin_espacios, 'código'):
+            resto = _resto_etiqueta(sin_espacios, 'código')
+            if _CARACTERES_CODIGO.fullmatch(resto):
+                self._iniciar_campo('codigo', resto)
+                self.estado = _CODIGO
+        return completada
+
+
+def _iterar_materias(paginas: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Extrae las materias a partir del texto de cada página, a medida que llegan.
+    Si el documento no tiene el formato esperado (ninguna materia encontrada), se usa el
+    método alternativo sobre el texto completo; para eso se conserva el texto solo mientras
+    no se haya encontrado ninguna materia.
+    """
+    parser = _ParserMaterias()
+    encontradas = 0
+    texto_pendiente: Optional[List[str]] = []
     
-    # Si no se encontraron materias, intentar método alternativo
-    if not materias:
-        materias = _extraer_materias_alternativo(texto)
+    def procesar(segmento: str):
+        for linea in segmento.split('\n'):
+            materia = parser.linea(linea)
+            if materia is not None:
+                yield materia
     
-    return materias
+    for texto_pagina in paginas:
+        if texto_pendiente is not None:
+            texto_pendiente.append(texto_pagina + "\n")
+        
+        inicio = 0
+        encabezados = PATRON_SEMESTRE.finditer(texto_pagina) if _HAY_SEMESTRE.search(texto_pagina) else ()
+        for match in encabezados:
+            # El texto antes del encabezado (aunque sea media línea) pertenece al bloque anterior
+            for materia in procesar(texto_pagina[inicio:match.start()]):
+                encontradas += 1
+                yield materia
+            materia = parser.nuevo_bloque(SEMESTRES_TEXTO.get(match.group(1).lower()))
+            if materia is not None:
+                encontradas += 1
+                yield materia
+            inicio = match.end()
+        
+        for materia in procesar(texto_pagina[inicio:]):
+            encontradas += 1
+            yield materia
+        
+        if encontradas:
+            texto_pendiente = None
+    
+    materia = parser.cerrar()
+    if materia is not None:
+        encontradas += 1
+        yield materia
+    
+    # Si no se encontraron materias, intentar método alternativo
+    if not encontradas:
+        yield from _extraer_materias_alternativo("".join(texto_pendiente or []))
 
 
 def _extraer_materias_alternativo(texto: str) -> List[Dict[str, Any]]:
@@ -0,0 +1,95 @@
+"""
+Pruebas de ingesta.py: la ingesta termina aunque quien consume los registros falle o los
+deje a medias (los procesos del pool no quedan bloqueados en la cola llena)
+
+Uso (desde backend/):
+    python -m pytest tests
+"""
+import json
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# Segundos antes de dar la ingesta por colgada
+LIMITE = 60
+
+
+def _documentos(directorio: Path, archivos: int = 4, materias: int = 2000) -> Path:
+    """Archivos JSON de malla con suficientes materias para llenar la cola entre procesos"""
+    for n in range(archivos):
+        (directorio / f"malla_{n}.json").write_text(json.dumps([
+            {"codigo": f"{n}{i:06d}", "nombre": f"Materia {i} " + "x" * 200, "semestre": 1,
+             "creditos": 3, "prerequisitos": [], "tipologia": "FUND. OBLIGATORIA"}
+            for i in range(materias)
+        ]), encoding="utf-8")
+    return directorio
+
+
+def _ejecutar(codigo: str) -> subprocess.CompletedProcess:
+    """Ejecuta `codigo` en un intérprete nuevo: si la ingesta se cuelga, vence el límite"""
+    return subprocess.run([sys.executable, "-c", textwrap.dedent(codigo)], cwd=BACKEND,
+                          capture_output=True, text=True, timeout=LIMITE)
+
+
+def test_falla_del_consumidor_no_cuelga_la_ingesta(tmp_path):
+    directorio = _documentos(tmp_path)
+    proceso = _ejecutar(f"""
+        from pathlib import Path
+        from ingesta import ingerir, ManifiestoIngesta
+
+        class Vectorstore:
+            def get(self, include=None):
+                return {{"ids": []}}
+
+            def add_texts(self, texts, metadatas, ids):
+                raise RuntimeError("embeddings no disponibles")
+
+        manifiesto = ManifiestoIngesta(Path({str(tmp_path / "manifiesto.json")!r}))
+        ingerir({str(directorio)!r}, Vectorstore(), manifiesto, procesos=2, lote_upsert=5)
+    """)
+    assert proceso.returncode == 1
+    assert "RuntimeError: embeddings no disponibles" in proceso.stderr
+    assert not (tmp_path / "manifiesto.json").exists()
+
+
+def test_cerrar_el_generador_a_mitad_detiene_los_procesos(tmp_path):
+    directorio = _documentos(tmp_path)
+    proceso = _ejecutar(f"""
+        from ingesta import descubrir_archivos, iterar_registros
+
+        registros = iterar_registros(descubrir_archivos({str(directorio)!r}), procesos=2)
+        leidos = [next(registros) for _ in range(5)]
+        registros.close()
+        print(len(leidos))
+    """)
+    assert proceso.returncode == 0, proceso.stderr
+    assert proceso.stdout.split()[-1] == "5"
+
+
+def test_archivos_con_el_mismo_nombre_en_subdirectorios_no_comparten_ids(tmp_path):
+    sys.path.insert(0, str(BACKEND))
+    from ingesta import ingerir, ManifiestoIngesta
+
+    for subdirectorio in ("pregrado", "posgrado"):
+        (tmp_path / subdirectorio).mkdir()
+        _documentos(tmp_path / subdirectorio, archivos=1, materias=3)
+
+    class Vectorstore:
+        def __init__(self):
+            self.ids = []
+
+        def get(self, include=None):
+            return {"ids": []}
+
+        def add_texts(self, texts, metadatas, ids):
+            self.ids.extend(ids)
+
+    vectorstore = Vectorstore()
+    resumen = ingerir(str(tmp_path), vectorstore, ManifiestoIngesta(tmp_path / "manifiesto.json"), procesos=2)
+    assert resumen["documentos"] == 6
+    assert sorted(vectorstore.ids) == sorted(
+        f"{subdirectorio}/malla_0.json:0{i:06d}" for subdirectorio in ("pregrado", "posgrado") for i in range(3)
+    )